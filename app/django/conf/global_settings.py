@@ -155,6 +155,14 @@ TEMPLATE_LOADERS = (
 #     'django.template.loaders.eggs.load_template_source',
 )
 
+# Whether get_template() keeps compiled templates for the lifetime of the
+# process, and whether it recompiles them when their files change.
+TEMPLATE_CACHE = False
+TEMPLATE_CACHE_CHECK_MTIME = False
+
+# Templates compiled by django.template.loader.warm_template_cache().
+TEMPLATE_CACHE_WARMUP = ()
+
 # List of processors used by RequestContext to populate the context.
 # Each one should be a callable that takes the request object as its
 # only parameter and returns a dictionary to add to the context.
@@ -13,6 +13,7 @@ class Context(object):
         dict_ = dict_ or {}
         self.dicts = [dict_]
         self.autoescape = autoescape
+        self.render_context = RenderContext()
 
     def __repr__(self):
         return repr(self.dicts)
@@ -67,6 +68,33 @@ class Context(object):
         self.dicts = [other_dict] + self.dicts
         return other_dict
 
+class RenderContext(Context):
+    """
+    A stack container for storing Template state.
+
+    Nodes store their per-render state here instead of on themselves, so
+    that a compiled Template can be rendered any number of times. Lookups
+    only consider the innermost dict, which Template.render() pushes, so
+    every rendered template sees only its own state.
+    """
+    def __init__(self, dict_=None):
+        self.dicts = [dict_ or {}]
+
+    def __iter__(self):
+        for d in self.dicts[0]:
+            yield d
+
+    def has_key(self, key):
+        return key in self.dicts[0]
+
+    __contains__ = has_key
+
+    def __getitem__(self, key):
+        return self.dicts[0][key]
+
+    def get(self, key, otherwise=None):
+        return self.dicts[0].get(key, otherwise)
+
 # This is a function rather than module-level procedural code because we only
 # want it to execute if somebody uses RequestContext.
 def get_standard_processors():
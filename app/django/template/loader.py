@@ -20,12 +20,18 @@
 # Python eggs) sets is_usable to False if the "pkg_resources" module isn't
 # installed, because pkg_resources is necessary to read eggs.
 
+import os
+
 from django.core.exceptions import ImproperlyConfigured
 from django.template import Origin, Template, Context, TemplateDoesNotExist, add_to_builtins
 from django.conf import settings
 
 template_source_loaders = None
 
+# Compiled templates by name, as (template, path, mtime) tuples, used by
+# get_template() when settings.TEMPLATE_CACHE is set.
+template_cache = {}
+
 class LoaderOrigin(Origin):
     def __init__(self, display_name, loader, name, dirs):
         super(LoaderOrigin, self).__init__(display_name)
@@ -41,6 +47,14 @@ def make_origin(display_name, loader, name, dirs):
         return None
 
 def find_template_source(name, dirs=None):
+    source, display_name, loader = find_template_loader(name, dirs)
+    return (source, make_origin(display_name, loader, name, dirs))
+
+def find_template_loader(name, dirs=None):
+    """
+    Returns a tuple with the source of the template, the name it was
+    loaded from and the loader that found it.
+    """
     # Calculate template_source_loaders the first time the function is executed
     # because putting this logic in the module-level namespace may cause
     # circular import errors. See Django ticket #1292.
@@ -67,7 +81,7 @@ def find_template_source(name, dirs=None):
     for loader in template_source_loaders:
         try:
             source, display_name = loader(name, dirs)
-            return (source, make_origin(display_name, loader, name, dirs))
+            return (source, display_name, loader)
         except TemplateDoesNotExist:
             pass
     raise TemplateDoesNotExist, name
@@ -76,11 +90,54 @@ def get_template(template_name):
     """
     Returns a compiled Template object for the given template name,
     handling template inheritance recursively.
+
+    If settings.TEMPLATE_CACHE is set the compiled template is kept for the
+    lifetime of the process. With settings.TEMPLATE_CACHE_CHECK_MTIME it is
+    compiled again when the modification time of its file changes.
     """
-    source, origin = find_template_source(template_name)
+    if not settings.TEMPLATE_CACHE:
+        source, origin = find_template_source(template_name)
+        return get_template_from_string(source, origin, template_name)
+
+    cached = template_cache.get(template_name)
+    if cached is not None:
+        template, path, mtime = cached
+        if not settings.TEMPLATE_CACHE_CHECK_MTIME or get_mtime(path) == mtime:
+            return template
+
+    source, display_name, loader = find_template_loader(template_name)
+    origin = make_origin(display_name, loader, template_name, None)
     template = get_template_from_string(source, origin, template_name)
+    template_cache[template_name] = (template, display_name, get_mtime(display_name))
     return template
 
+def get_mtime(path):
+    "Returns the modification time of path, or None if it is not a file."
+    try:
+        return os.path.getmtime(path)
+    except (OSError, TypeError):
+        return None
+
+def reset_template_cache():
+    "Drops all compiled templates kept by get_template()."
+    template_cache.clear()
+
+def warm_template_cache(template_names=None):
+    """
+    Compiles the given templates, settings.TEMPLATE_CACHE_WARMUP if not
+    specified, so that the first request does not have to. Templates that
+    do not exist are skipped.
+    """
+    if not settings.TEMPLATE_CACHE:
+        return
+    if template_names is None:
+        template_names = settings.TEMPLATE_CACHE_WARMUP
+    for template_name in template_names:
+        try:
+            get_template(template_name)
+        except TemplateDoesNotExist:
+            pass
+
 def get_template_from_string(source, origin=None, name=None):
     """
     Returns a compiled Template object for the given template code,
@@ -87,16 +87,30 @@ def real_main():
   # Create a Django application for WSGI.
   application = django.core.handlers.wsgi.WSGIHandler()
 
+  from soc.cache import request_scope
   from soc.modules import callback
   from soc.modules import core
 
+  # drop everything that was cached during the previous request
+  request_scope.flush()
+
   callback.registerCore(core.Core())
   callback.getCore().registerModuleCallbacks()
 
   # Run the WSGI CGI handler with that application.
   util.run_wsgi_app(application)
 
+def warm_up():
+  """Prepares a newly started instance for its first request.
+  """
+  from django.template import loader
+
+  loader.warm_template_cache()
+
+
 main = real_main
 
+warm_up()
+
 if __name__ == '__main__':
   main()
@@ -546,6 +546,29 @@ class Ranker(object):
     return [self.__FindRank(node_ids_with_children, nodes_dict) for
             node_ids_with_children in node_ids_with_children_list]
 
+  def FindRanksForNames(self, names):
+    """Finds the 0-based ranks of the scores stored for a number of names.
+
+    The score entities are fetched with a single batch Get, after which the
+    ranks are computed as in FindRanks.
+
+    Args:
+      names: A list of names as passed to SetScore(s).
+
+    Returns:
+      A dict mapping each name to its rank, or to None if there is no score
+      stored for that name.
+    """
+    score_entities = datastore.Get([self.__KeyForScore(name)
+                                    for name in names])
+    ranked = [(name, score_ent["value"]) for (name, score_ent)
+              in zip(names, score_entities) if score_ent]
+    ranks = dict.fromkeys(names)
+    if ranked:
+      found = self.FindRanks([score for (_, score) in ranked])
+      ranks.update(zip([name for (name, _) in ranked], found))
+    return ranks
+
   def __FindScore(self, node_id, rank, score_range, approximate):
     """To be run in a transaction.  Finds the score ranked 'rank' in the subtree
     defined by node 'nodekey.'
@@ -16,10 +16,9 @@
 # 
 """Simple property for storing ordered lists of Model objects.
 
-It should be noted that larger lists are going to be VERY inefficient
-to load (one get per object).
-
-Currently I have no idea where that upper bound might lie, though.
+The referenced Models are not loaded together with the holder, but with
+a single batch get the first time the list is accessed. Use resolve() to
+load the lists of many holders with one batch get.
  
 A quick usage example:
         class Bit(db.Model):
@@ -74,7 +73,49 @@ Obtained from:
 
 from google.appengine.ext import db
 
- 
+
+class _KeyList(list):
+  """The keys of a list of Models that have not been retrieved yet.
+  """
+
+  pass
+
+
+def resolve(holders, names=None):
+  """Retrieves the Models of the reference lists of all holders at once.
+
+  Args:
+    holders: Model instances that have ReferenceListProperties
+    names: names of the properties to resolve, defaults to all of them
+  """
+
+  pending = []
+  keys = set()
+
+  for holder in holders:
+    for prop in holder.properties().itervalues():
+      if not isinstance(prop, ReferenceListProperty):
+        continue
+
+      if names and prop.name not in names:
+        continue
+
+      value = getattr(holder, prop._attr_name(), None)
+
+      if isinstance(value, _KeyList):
+        pending.append((holder, prop, value))
+        keys.update(value)
+
+  if not keys:
+    return
+
+  keys = list(keys)
+  models = dict(zip(keys, db.get(keys)))
+
+  for holder, prop, value in pending:
+    setattr(holder, prop._attr_name(), [models[k] for k in value])
+
+
 class ReferenceListProperty(db.Property):
   """A property that stores a list of models.
   
@@ -115,6 +156,9 @@ class ReferenceListProperty(db.Property):
       instances of the item_type given to the constructor.
     """
     value = super(ReferenceListProperty, self).validate(value)
+    if isinstance(value, _KeyList):
+      # not retrieved yet, the keys were read from the datastore
+      return value
     if value is not None:
       if not isinstance(value, list):
         raise db.BadValueError('Property %s must be a list' %
@@ -150,6 +194,18 @@ class ReferenceListProperty(db.Property):
     """ 
     return list(super(ReferenceListProperty, self).default_value())
  
+  def __get__(self, model_instance, model_class):
+    """Retrieves the referenced Models on first access.
+    """
+    value = super(ReferenceListProperty, self).__get__(model_instance,
+                                                       model_class)
+    if model_instance is None or not isinstance(value, _KeyList):
+      return value
+
+    value = list(db.get(list(value))) if value else []
+    setattr(model_instance, self._attr_name(), value)
+    return value
+
   def get_value_for_datastore(self, model_instance):
     """A list of key values is stored.
 
@@ -162,6 +218,10 @@ class ReferenceListProperty(db.Property):
     Returns:
       A list of the keys for all Models in the value list.
     """
+    value = getattr(model_instance, self._attr_name(), None)
+    if isinstance(value, _KeyList):
+      # the Models were never retrieved, so the keys did not change
+      return list(value)
     value = self.__get__(model_instance, model_instance.__class__)
     self.validate(value)
     if value is None:
@@ -170,15 +230,16 @@ class ReferenceListProperty(db.Property):
       return [v.key() for v in value]
  
   def make_value_from_datastore(self, value):
-    """Recreates the list of Models from the list of keys.
+    """Keeps the list of keys until the Models are accessed.
  
     Args:
       value: value retrieved from the datastore entity.
 
     Returns:
-      None or a list of Models.
+      None or a list of keys that is replaced by the list of Models
+      on first access.
     """ 
     if value is None:
       return None
     else:
-      return [db.get(v) for v in value]
+      return _KeyList(value)
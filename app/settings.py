@@ -85,6 +85,18 @@ TEMPLATE_LOADERS = (
 #     'django.template.loaders.eggs.load_template_source',
 )
 
+# Keep compiled templates for the lifetime of the instance, on the
+# development server recompile them when their file changes
+TEMPLATE_CACHE = True
+TEMPLATE_CACHE_CHECK_MTIME = DEBUG
+
+# Templates that are compiled when an instance starts
+TEMPLATE_CACHE_WARMUP = (
+    'soc/base.html',
+    'soc/models/edit.html',
+    'soc/models/list.html',
+    )
+
 MIDDLEWARE_CLASSES = (
 #    'django.middleware.common.CommonMiddleware',
 #    'django.contrib.sessions.middleware.SessionMiddleware',
@@ -110,5 +122,9 @@ INSTALLED_APPS = (
 #    'django.contrib.sites',
 )
 
+# the PubSubHubbub hub that is pinged when a news feed is updated,
+# point this to a local stand-in when testing
+NEWS_FEED_HUB_URL = 'http://pubsubhubbub.appspot.com/'
+
 MODULE_FMT = 'soc.modules.%s.callback'
 MODULES = ['ghop']
@@ -0,0 +1,167 @@
+#!/usr/bin/python2.5
+#
+# Copyright 2009 the Melange authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Module contains the instance and memcache cache for entities by key name.
+
+Entities are kept in a size bounded dictionary that lives as long as the
+instance, with memcache as a second tier shared by all instances. Both
+tiers are dropped when an entity is written through its Logic on this
+instance, other instances may serve the old entity until its local
+retention expires.
+
+Entities are only added to memcache if it holds nothing for them yet, and
+a flush leaves a marker in memcache for DEF_FLUSH_LOCK seconds, so that a
+reader that retrieved the entity before it was written can not store it
+again.
+
+The entities are stored pickled, so that every request works on its own
+copy and can not change the cached one.
+"""
+
+__authors__ = [
+    '"Sverre Rabbelier" <sverre@rabbelier.nl>',
+  ]
+
+
+import cPickle
+import time
+
+from google.appengine.api import memcache
+
+
+#: the maximum amount of entities kept by an instance
+DEF_MAX_ENTRIES = 500
+
+#: the amount of seconds entities are kept in memcache
+DEF_MEMCACHE_RETENTION = 10*60
+
+#: the amount of seconds an entity can not be added to memcache after it
+#: has been flushed, longer than a request may take
+DEF_FLUSH_LOCK = 30
+
+#: the memcache value of a flushed entity, pickled entities never equal it
+DEF_FLUSHED = 'flushed'
+
+#: the instance local cache, maps keys to (expiry time, pickled entity)
+_cache = {}
+
+
+def key(model, key_name):
+  """Returns the cache key for the entity of model with key_name.
+  """
+
+  return 'entity_for_%s_%s' % (model.kind(), key_name)
+
+
+def _evict():
+  """Makes room for a new entry in the instance local cache.
+
+  Expired entries are dropped first, if there are none the entry that
+  expires soonest is dropped.
+  """
+
+  now = time.time()
+
+  for cache_key, (expires, _) in _cache.items():
+    if expires <= now:
+      del _cache[cache_key]
+
+  if len(_cache) >= DEF_MAX_ENTRIES:
+    soonest = min(_cache, key=lambda i: _cache[i][0])
+    del _cache[soonest]
+
+
+def _store(cache_key, data, retention):
+  """Stores pickled data in the instance local cache.
+  """
+
+  if cache_key not in _cache and len(_cache) >= DEF_MAX_ENTRIES:
+    _evict()
+
+  _cache[cache_key] = (time.time() + retention, data)
+
+
+def get(model, key_name, retention):
+  """Returns the cached entity of model with key_name, or None.
+
+  Args:
+    model: the model of the entity
+    key_name: the key name of the entity
+    retention: seconds an entity found in memcache is kept locally
+  """
+
+  cache_key = key(model, key_name)
+  cached = _cache.get(cache_key)
+
+  if cached:
+    expires, data = cached
+
+    if expires > time.time():
+      return cPickle.loads(data)
+
+    del _cache[cache_key]
+
+  # pylint: disable-msg=E1101
+  data = memcache.get(cache_key)
+
+  if data is None or data == DEF_FLUSHED:
+    return None
+
+  _store(cache_key, data, retention)
+
+  return cPickle.loads(data)
+
+
+def put(model, key_name, entity, retention):
+  """Stores entity in both tiers, unless memcache already has an entry.
+
+  Nothing is stored if the entity was flushed within DEF_FLUSH_LOCK
+  seconds, as it may have been retrieved before it was written.
+
+  Args:
+    model: the model of the entity
+    key_name: the key name of the entity
+    entity: the entity, must not be None
+    retention: seconds the entity is kept locally
+  """
+
+  cache_key = key(model, key_name)
+  data = cPickle.dumps(entity, cPickle.HIGHEST_PROTOCOL)
+
+  # pylint: disable-msg=E1101
+  if memcache.add(cache_key, data, DEF_MEMCACHE_RETENTION):
+    _store(cache_key, data, retention)
+
+
+def flush(model, key_name):
+  """Drops the entity of model with key_name from both tiers.
+
+  The entity is replaced by DEF_FLUSHED in memcache, see put().
+  """
+
+  cache_key = key(model, key_name)
+
+  _cache.pop(cache_key, None)
+
+  # pylint: disable-msg=E1101
+  memcache.set(cache_key, DEF_FLUSHED, DEF_FLUSH_LOCK)
+
+
+def flushAll():
+  """Empties the instance local cache.
+  """
+
+  _cache.clear()
@@ -22,14 +22,53 @@ __authors__ = [
   ]
 
 
+import time
+
 from google.appengine.api import memcache
 from google.appengine.ext import db
 
 import soc.cache.base
 
 
+#: the amount of seconds a query result is cached for, to force a refresh
+#: every so often after writes that bypass Logic
+DEF_RETENTION = 15*60
+
+
+def generationKey(model):
+  """Returns the memcache key for the generation counter of model's kind.
+  """
+
+  return 'query_generation_for_%s' % model.kind()
+
+
+def getGeneration(model):
+  """Returns the current generation of model's kind.
+
+  A missing counter is started at the current time in milliseconds, so
+  that a counter that was evicted from memcache does not start over at
+  a value that cached query results may still be stored under.
+  """
+
+  memcache_key = generationKey(model)
+  # pylint: disable-msg=E1101
+  generation = memcache.get(memcache_key)
+
+  if generation is None:
+    generation = int(time.time() * 1000)
+    # pylint: disable-msg=E1101
+    if not memcache.add(memcache_key, generation):
+      # someone else started the counter in the mean time
+      generation = memcache.get(memcache_key) or generation
+
+  return generation
+
+
 def key(model, filter, order):
   """Returns the memcache key for this query.
+
+  The key includes the current generation of model's kind, so all keys
+  change as soon as an entity of that kind is written, see flush().
   """
 
   new_filter = {}
@@ -41,8 +80,9 @@ def key(model, filter, order):
       new_value = value
     new_filter[filter_key] = new_value
 
-  return 'query_for_%(kind)s_%(filter)s_%(order)s' % {
+  return 'query_for_%(kind)s_%(generation)d_%(filter)s_%(order)s' % {
       'kind': repr(model.kind()),
+      'generation': getGeneration(model),
       'filter': repr(new_filter),
       'order': repr(order),
       }
@@ -64,19 +104,25 @@ def put(data, memcache_key, *args, **kwargs):
     data: the data to be cached
   """
 
-  # Store data for fifteen minutes to force a refresh every so often
-  retention = 15*60
   # pylint: disable-msg=E1101
-  memcache.add(memcache_key, data, retention)
+  memcache.add(memcache_key, data, DEF_RETENTION)
+
 
+def flush(model, filter=None):
+  """Invalidates all cached query results for model's kind.
 
-def flush(model, filter):
-  """Removes the data for the current user from the memcache.
+  This increments the generation of the kind atomically, the old results
+  are left to expire from memcache.
+
+  Args:
+    model: the model whose kind was written
+    filter: unused, all results for the kind are invalidated
   """
 
-  memcache_key = key(model, filter)
   # pylint: disable-msg=E1101
-  memcache.delete(memcache_key)
+  if memcache.incr(generationKey(model)) is None:
+    # there was no counter, start a new one
+    getGeneration(model)
 
 
 # define the cache function
@@ -0,0 +1,76 @@
+#!/usr/bin/python2.5
+#
+# Copyright 2009 the Melange authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Module contains Ranker memcaching functions.
+"""
+
+__authors__ = [
+    '"Sverre Rabbelier" <sverre@rabbelier.nl>',
+  ]
+
+
+import logging
+
+from google.appengine.api import memcache
+
+import soc.cache.base
+
+
+def key(scope_path, link_id):
+  """Returns the memcache key for the Ranker of a RankerRoot.
+  """
+
+  return 'ranker_for_%s/%s' % (scope_path, link_id)
+
+
+def get(self, scope_path, link_id):
+  """Retrieves the Ranker for the specified RankerRoot from the memcache.
+  """
+
+  memcache_key = key(scope_path, link_id)
+  logging.info("Retrieving %s" % memcache_key)
+  # pylint: disable-msg=E1101
+  return memcache.get(memcache_key), memcache_key
+
+
+def put(result, memcache_key, *args, **kwargs):
+  """Sets the Ranker for the specified RankerRoot in the memcache.
+
+  Args:
+    result: the Ranker to be cached
+  """
+
+  # there is no RankerRoot to cache the Ranker for
+  if not result:
+    return
+
+  logging.info("Setting %s" % memcache_key)
+  # pylint: disable-msg=E1101
+  memcache.add(memcache_key, result)
+
+
+def flush(scope_path, link_id):
+  """Removes the Ranker for the specified RankerRoot from the memcache.
+  """
+
+  memcache_key = key(scope_path, link_id)
+  logging.info("Flushing %s" % memcache_key)
+  # pylint: disable-msg=E1101
+  memcache.delete(memcache_key)
+
+
+# define the cache function
+cache = soc.cache.base.getCacher(get, put)
@@ -0,0 +1,75 @@
+#!/usr/bin/python2.5
+#
+# Copyright 2009 the Melange authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Module contains request scoped in-memory caching functions.
+
+Unlike the other cache modules this does not use memcache, the data is
+kept in the memory of the running instance. It is flushed at the start
+of every request (see main.real_main), so nothing stored here outlives
+the request that stored it.
+"""
+
+__authors__ = [
+    '"Sverre Rabbelier" <sverre@rabbelier.nl>',
+  ]
+
+
+# pylint: disable-msg=C0103
+_cache = {}
+
+
+def getNamespace(namespace):
+  """Returns the dict that holds the data for the specified namespace.
+
+  The returned dict can be modified in place, changes are visible to all
+  other callers during the current request.
+  """
+
+  return _cache.setdefault(namespace, {})
+
+
+def get(namespace, key):
+  """Retrieves the value for key in the specified namespace, or None.
+  """
+
+  return _cache.get(namespace, {}).get(key)
+
+
+def put(namespace, key, value):
+  """Sets the value for key in the specified namespace.
+  """
+
+  getNamespace(namespace)[key] = value
+
+
+def delete(namespace, key):
+  """Removes key from the specified namespace if it is present.
+  """
+
+  _cache.get(namespace, {}).pop(key, None)
+
+
+def flush(namespace=None):
+  """Removes all data for the specified namespace.
+
+  Args:
+    namespace: if not set all namespaces are flushed
+  """
+
+  if namespace:
+    _cache.pop(namespace, None)
+  else:
+    _cache.clear()
@@ -22,38 +22,114 @@ __authors__ = [
   ]
 
 
+import hashlib
+import time
+
 from google.appengine.api import memcache
 
 
-RIGHTS = [
-    'checkCanCreateFromRequest',
-    'checkCanEditTimeline',
-    'checkCanMakeRequestToGroup',
-    'checkCanProcessRequest',
-    'checkHasPickGetArgs',
-    'checkHasActiveRoleForScope',
-    'checkHasUserEntity',
-    'checkIsActive',
-    'checkIsAllowedToManageRole',
-    'checkIsApplicationAccepted',
-    'checkIsDeveloper',
-    'checkIsDocumentReadable',
-    'checkIsDocumentWritable',
-    'checkIsHostForProgram',
-    'checkIsLoggedIn',
-    'checkIsMyEntity',
-    'checkIsMyGroupAcceptedRequest',
-    'checkIsUnusedAccount',
-    'checkIsUser',
-    'checkIsUserSelf',
-    'checkNotLoggedIn',
-    ]
+# seconds the result of an access check is kept, changes to roles and
+# scopes invalidate it earlier through the generation counters
+DEF_RETENTION = 10*60
+
+# status codes stored instead of the results of access checks
+ALLOWED = 0
+DENIED = 1
+LOGIN_REQUIRED = 2
+ERROR = 3
+
+# hits and misses of this instance, see getStats()
+STATS = {'hits': 0, 'misses': 0}
+
+
+def generationKey(scope):
+  """Returns the memcache key for the generation counter of a scope.
+  """
+
+  return 'rights_generation_%s' % scope
+
+
+def accountScope(id):
+  """Returns the scope used for the generation counter of an account.
+  """
+
+  return 'account:%s' % id
+
+
+def getGenerations(scopes):
+  """Returns the generation counters for the specified scopes.
+
+  Counters that are not in memcache are started at the current time in
+  milliseconds, so that an evicted counter does not return to a value
+  that results were cached for before.
+  """
+
+  keys = [generationKey(i) for i in scopes]
+  # pylint: disable-msg=E1101
+  generations = memcache.get_multi(keys)
+
+  missing = [i for i in keys if i not in generations]
+
+  if missing:
+    now = int(time.time() * 1000)
+    # pylint: disable-msg=E1101
+    memcache.add_multi(dict((i, now) for i in missing))
+    generations.update(memcache.get_multi(missing))
+
+  return [generations.get(i, 0) for i in keys]
+
+
+def bumpGeneration(scope):
+  """Invalidates all cached results that depend on the specified scope.
+  """
+
+  # pylint: disable-msg=E1101
+  memcache.incr(generationKey(scope))
+
+
+def key(values):
+  """Returns the memcache key for an access check.
+
+  Args:
+    values: a list with everything the result of the check depends on,
+        including the generations of the relevant scopes
+  """
+
+  return 'rights_%s' % hashlib.md5(repr(values)).hexdigest()
+
+
+def get(memcache_key):
+  """Retrieves the (status code, message) of a cached access check or None.
+  """
+
+  # pylint: disable-msg=E1101
+  result = memcache.get(memcache_key)
+
+  if result is None:
+    STATS['misses'] += 1
+  else:
+    STATS['hits'] += 1
+
+  return result
+
+
+def put(memcache_key, code, message_fmt=None):
+  """Caches the status code and message of an access check.
+  """
+
+  # pylint: disable-msg=E1101
+  memcache.set(memcache_key, (code, message_fmt), DEF_RETENTION)
+
+
+def getStats():
+  """Returns the hits and misses of the rights cache on this instance.
+  """
+
+  return STATS.copy()
 
 
 def flush(id):
   """Flushes all ACL's for the specified account.
   """
 
-  key_prefix = '%s.' % id
-  # pylint: disable-msg=E1101
-  memcache.delete_multi(RIGHTS, key_prefix=key_prefix)
+  bumpGeneration(accountScope(id))
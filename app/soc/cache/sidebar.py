@@ -22,6 +22,9 @@ __authors__ = [
   ]
 
 
+import hashlib
+import os
+
 from google.appengine.api import memcache
 
 import soc.cache.base
@@ -29,6 +32,15 @@ import soc.cache.rights
 import soc.logic.accounts
 
 
+# seconds the rights bitmap of a user is kept, the same as the sidebar
+# itself, so that rights that changed elsewhere show up every so often
+DEF_RIGHTS_RETENTION = 3*60
+
+# seconds the sidebar skeleton is kept, it only changes with a new version
+# of the application so it may be kept around for a long time
+DEF_SKELETON_RETENTION = 24*60*60
+
+
 def key(id):
   """Returns the memcache key for the user's sidebar.
   """
@@ -36,6 +48,23 @@ def key(id):
   return 'sidebar_for_%s' % repr(id)
 
 
+def rightsKey(id):
+  """Returns the memcache key for the user's sidebar rights bitmap.
+  """
+
+  return 'sidebar_rights_for_%s' % repr(id)
+
+
+def skeletonKey(entries):
+  """Returns the memcache key for the skeleton of the sidebar entries.
+  """
+
+  version = os.environ.get('CURRENT_VERSION_ID', '')
+  digest = hashlib.md5(repr(entries)).hexdigest()
+
+  return 'sidebar_skeleton_for_%s_%s' % (version, digest)
+
+
 def get(id, *args, **kwargs):
   """Retrieves the sidebar for the specified user from the memcache.
   """
@@ -58,8 +87,84 @@ def put(sidebar, memcache_key, *args, **kwargs):
   memcache.add(memcache_key, sidebar, retention)
 
 
+def getRights(id, version):
+  """Retrieves the sidebar rights bitmap for the specified user.
+
+  Args:
+    id: the account of the user
+    version: the version of the sidebar skeleton the bitmap belongs to
+
+  Returns:
+    The bitmap, or None if no bitmap for this version is cached.
+  """
+
+  # pylint: disable-msg=E1101
+  cached = memcache.get(rightsKey(id))
+
+  if not cached:
+    return None
+
+  cached_version, bitmap = cached
+
+  if cached_version != version:
+    return None
+
+  return bitmap
+
+
+def putRights(id, version, bitmap):
+  """Sets the sidebar rights bitmap for the specified user.
+
+  Args:
+    id: the account of the user
+    version: the version of the sidebar skeleton the bitmap belongs to
+    bitmap: the bitmap to be cached
+  """
+
+  # pylint: disable-msg=E1101
+  memcache.set(rightsKey(id), (version, bitmap), DEF_RIGHTS_RETENTION)
+
+
+def getSkeleton(entries):
+  """Retrieves the sidebar skeleton for the specified entries.
+
+  Returns:
+    A (skeleton, version) tuple, where the menus of the skeleton have no
+    'rights' value, or None if it is not cached.
+  """
+
+  # pylint: disable-msg=E1101
+  return memcache.get(skeletonKey(entries))
+
+
+def putSkeleton(entries, skeleton, version):
+  """Sets the sidebar skeleton for the specified entries.
+
+  The Checkers in the 'rights' value of the menus are not stored, they
+  belong to the views that built the skeleton.
+
+  Args:
+    entries: the sidebar entries the skeleton was built from
+    skeleton: the skeleton, as returned by Core.getSidebarSkeleton
+    version: the version of the skeleton
+  """
+
+  stripped = []
+
+  for menus in skeleton:
+    if menus is not None:
+      menus = [dict((k, v) for k, v in menu.iteritems() if k != 'rights')
+               for menu in menus]
+    stripped.append(menus)
+
+  # pylint: disable-msg=E1101
+  memcache.set(skeletonKey(entries), (stripped, version),
+               DEF_SKELETON_RETENTION)
+
+
 def flush(id=None):
-  """Removes the sidebar for the current user from the memcache.
+  """Removes the sidebar and sidebar rights for the current user from the
+  memcache.
 
   Also calls soc.cache.rights.flush for the specified user.
 
@@ -72,7 +177,7 @@ def flush(id=None):
 
   memcache_key = key(id)
   # pylint: disable-msg=E1101
-  memcache.delete(memcache_key)
+  memcache.delete_multi([memcache_key, rightsKey(id)])
   soc.cache.rights.flush(id)
 
 
@@ -0,0 +1,83 @@
+var duplicateSlots = new function() {
+  // milliseconds between two checks whether the calculation has finished
+  var POLL_INTERVAL = 3000;
+
+  // public function to start the calculation on the server and reload
+  // the page once it has finished
+  this.showDuplicatesInit = function() {
+
+    $("#id_button_duplicate_slots").fadeOut("slow",
+      function() {
+        $("#description_done").html("");
+        $("#description_progressbar").html(" Calculating duplicates...");
+        $.ajax({
+          cache: false,
+          type: "POST",
+          url: location.href,
+          data: {calculate: "true"},
+          dataType: "json",
+          success: function (data, textStatus) {
+            pollCalculation(calculated_on);
+          },
+          error: function(XMLHttpRequest, textStatus, errorThrown) {
+            showError();
+          }
+        });
+      }
+    );
+  }
+
+  // private function that checks whether a calculation that finished
+  // after previous_calculation is available
+  function pollCalculation(previous_calculation) {
+    setTimeout(function() {
+      $.ajax({
+        cache: false,
+        type: "GET",
+        url: location.href,
+        data: {poll: "true"},
+        dataType: "json",
+        success: function (data, textStatus) {
+          if (data.calculated_on && data.calculated_on != previous_calculation
+              && !data.in_progress) {
+            $("#description_done").html("<strong> Done!</strong>");
+            location.reload();
+          }
+          else {
+            pollCalculation(previous_calculation);
+          }
+        },
+        error: function(XMLHttpRequest, textStatus, errorThrown) {
+          showError();
+        }
+      });
+    }, POLL_INTERVAL);
+  }
+
+  // private function to return the button and leave a try again message
+  function showError() {
+    $("#description_progressbar").html("");
+    $("#id_button_duplicate_slots").fadeIn("slow", function() {
+      $("#description_done").html("<strong class='error'> Error encountered, try again</strong>");
+    });
+  }
+
+  // public function to output actual HTML out of the data (cached or not)
+  this.showDuplicatesHtml = function(orgs_details,student,student_key,proposals) {
+    if (html_string == '') {
+      $("#div_duplicate_slots").html('');
+      html_string='<ul>';
+    }
+    html_string+= '<li>Student: <strong><a href="/student/show/'+student_key+'">'+student.name+'</a></strong> (<a href="mailto:'+student.contact+'">'+student.contact+'</a>)';
+    html_string+='<ul>';
+    $(proposals).each(
+      function (intIndex, proposal) {
+        html_string+='<li>Organization: <a href="/org/show/'+proposal.org_key+'">'+orgs_details[proposal.org_key].name+'</a>, admin: '+orgs_details[proposal.org_key].admin_name+' (<a href="mailto:'+orgs_details[proposal.org_key].admin_email+'">'+orgs_details[proposal.org_key].admin_email+'</a>)</li>';
+        html_string+='<ul><li>Proposal: <a href="/student_proposal/show/'+proposal.proposal_key+'">'+proposal.proposal_title+'</a></li></ul>';
+      }
+    );
+    html_string+='</ul></li>';
+    html_string+='</ul>';
+    $("#div_duplicate_slots").html(html_string);
+  }
+}
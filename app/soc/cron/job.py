@@ -23,8 +23,11 @@ __authors__ = [
   ]
 
 
+import datetime
 import logging
+import time
 
+from google.appengine.api.labs import taskqueue
 from google.appengine.ext import db
 from google.appengine.runtime import DeadlineExceededError
 
@@ -33,6 +36,19 @@ from soc.cron import unique_user_id_adder
 from soc.models.job import Job
 
 
+# time a worker has to finish a job before it may be claimed again
+DEF_LEASE_TIME = datetime.timedelta(minutes=2)
+
+# the queue that dispatched jobs run on, its rate and bucket size in
+# queue.yaml determine how many jobs run in parallel
+DEF_DISPATCH_QUEUE = 'jobs'
+
+# seconds during which a job is dispatched at most once
+DEF_DISPATCH_WINDOW = 5 * 60
+
+DEF_RUN_TASK_URL = '/tasks/job/run'
+
+
 class Error(Exception):
   """Base class for all exceptions raised by this module.
   """
@@ -77,15 +93,17 @@ class Handler(object):
   def claimJob(self, job_key):
     """A transaction to claim a job.
 
-    The transaction is rolled back if the status is not 'waiting'.
+    The transaction is rolled back if the job does not exist or its status
+    is not 'waiting'. The claimed job is leased for DEF_LEASE_TIME.
     """
 
-    job = Job.get_by_id(job_key)
+    job = Job.get(job_key)
 
-    if job.status != 'waiting':
+    if not job or job.status != 'waiting':
       raise db.Rollback()
 
     job.status = 'started'
+    job.lease_expires = datetime.datetime.now() + DEF_LEASE_TIME
 
     # pylint: disable-msg=E1103
     if job.put():
@@ -93,6 +111,31 @@ class Handler(object):
     else:
       return None
 
+  def reclaimJob(self, job_key):
+    """A transaction to reclaim a job of which the lease has expired.
+
+    The worker that claimed the job is assumed to have died, which counts
+    as a timeout. The transaction is rolled back if the job is not started
+    or its lease has not expired yet. Jobs that were started before leases
+    were introduced have none, their lease is taken to have started when
+    they were last modified.
+    """
+
+    job = Job.get(job_key)
+
+    if not job or job.status != 'started':
+      raise db.Rollback()
+
+    lease_expires = job.lease_expires or \
+        (job.last_modified_on + DEF_LEASE_TIME)
+
+    if lease_expires > datetime.datetime.now():
+      raise db.Rollback()
+
+    self.timeoutJob(job)
+
+    return job
+
   def timeoutJob(self, job):
     """Timeout a job.
 
@@ -100,6 +143,7 @@ class Handler(object):
     """
 
     job.timeouts += 1
+    job.lease_expires = None
 
     if job.timeouts > 50:
       job.status = 'aborted'
@@ -108,8 +152,8 @@ class Handler(object):
 
     job.put()
 
-    job_id = job.key().id()
-    logging.debug("job %d now timeout %d time(s)" % (job_id, job.timeouts))
+    job_id = job.key().id_or_name()
+    logging.debug("job %s now timeout %d time(s)" % (job_id, job.timeouts))
 
   def failJob(self, job):
     """Fail a job.
@@ -118,6 +162,7 @@ class Handler(object):
     """
 
     job.errors += 1
+    job.lease_expires = None
 
     if job.errors > 5:
       job.status = 'aborted'
@@ -126,14 +171,15 @@ class Handler(object):
 
     job.put()
 
-    job_id = job.key().id()
-    logging.warning("job %d now failed %d time(s)" % (job_id, job.errors))
+    job_id = job.key().id_or_name()
+    logging.warning("job %s now failed %d time(s)" % (job_id, job.errors))
 
   def finishJob(self, job):
     """Finish a job.
     """
 
     job.status = 'finished'
+    job.lease_expires = None
     job.put()
 
   def abortJob(self, job):
@@ -141,6 +187,7 @@ class Handler(object):
     """
 
     job.status = 'aborted'
+    job.lease_expires = None
     job.put()
 
   def handle(self, job_key):
@@ -165,7 +212,7 @@ class Handler(object):
 
       if job.task_name not in self.tasks:
         logging.error("Unknown job %s" % job.task_name)
-        db.run_in_transaction(self.abortJob, job_key)
+        self.abortJob(job)
         return self.ABORTED
 
       task = self.tasks[job.task_name]
@@ -190,13 +237,83 @@ class Handler(object):
         self.failJob(job)
       return self.ERRORED
 
-  def iterate(self, jobs, retry_jobs):
-    """Trivial iterator that iterates over jobs then retry_jobs
+  def dispatch(self, job):
+    """Adds a task to the jobs queue that handles the job.
+
+    The task is named after the job, its number of attempts and the current
+    DEF_DISPATCH_WINDOW, so each attempt is dispatched at most once per
+    window. Should a job be dispatched twice regardless, only one of the
+    tasks can claim it.
+
+    Returns: True iff a new task was added.
     """
 
-    for job in jobs:
-      yield job
-    while retry_jobs:
-      yield retry_jobs[0]
+    attempts = job.errors + job.timeouts
+    window = int(time.time() / DEF_DISPATCH_WINDOW)
+    task_name = 'job-%s-%d-%d' % (job.key(), attempts, window)
+    task_params = {'job_key': str(job.key())}
+
+    task = taskqueue.Task(name=task_name, params=task_params,
+                          url=DEF_RUN_TASK_URL)
+
+    try:
+      task.add(queue_name=DEF_DISPATCH_QUEUE)
+    except (taskqueue.TaskAlreadyExistsError, taskqueue.TombstonedTaskError):
+      return False
+
+    return True
+
+  def dispatchWaiting(self, priority_group, amount):
+    """Dispatches up to amount waiting jobs of the PriorityGroup.
+
+    The waiting jobs are gone through in key order, past the ones that were
+    already dispatched in the current window, until amount jobs have been
+    dispatched or no waiting jobs are left.
+
+    Returns: the amount of jobs that were dispatched.
+    """
+
+    dispatched = 0
+    start_key = None
+
+    while amount > 0:
+      query = Job.all()
+      query.filter('priority_group', priority_group)
+      query.filter('status', 'waiting')
+
+      if start_key:
+        query.filter('__key__ >', start_key)
+
+      query.order('__key__')
+
+      jobs = query.fetch(amount * 2)
+
+      for job in jobs:
+        if self.dispatch(job):
+          dispatched += 1
+
+          if dispatched >= amount:
+            return dispatched
+
+      if len(jobs) < amount * 2:
+        return dispatched
+
+      start_key = jobs[-1].key()
+
+    return dispatched
+
+  def reclaimExpired(self, job_keys):
+    """Reclaims the jobs with the given keys of which the lease has expired.
+
+    Returns: the amount of jobs that were reclaimed.
+    """
+
+    reclaimed = 0
+
+    for job_key in job_keys:
+      if db.run_in_transaction(self.reclaimJob, job_key):
+        reclaimed += 1
+
+    return reclaimed
 
 handler = Handler()
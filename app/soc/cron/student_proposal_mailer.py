@@ -31,7 +31,7 @@ from soc.logic.models.student_proposal import logic as proposal_logic
 
 
 # amount of students to create jobs for before updating
-DEF_STUDENT_STEP_SIZE = 10
+DEF_STUDENT_STEP_SIZE = 100
 
 # template for the accepted proposal mail
 DEF_ACCEPTED_MAIL_TEMPLATE = \
@@ -76,23 +76,12 @@ def setupStudentProposalMailing(job_entity):
 
   # set the default fields for the jobs we are going to create
   priority_group = priority_logic.getGroup(priority_logic.EMAIL)
-  job_fields = {
-      'priority_group': priority_group,
-      'task_name': 'sendStudentProposalMail'}
-
-  job_query_fields = job_fields.copy()
+  task_name = 'sendStudentProposalMail'
 
   while students:
-    # for each student create a mailing job
-    for student in students:
-
-      job_query_fields['key_data'] = student.key()
-      mail_job = job_logic.getForFields(job_query_fields, unique=True)
-
-      if not mail_job:
-        # this student did not receive mail yet
-        job_fields['key_data'] = [student.key()]
-        job_logic.updateOrCreateFromFields(job_fields)
+    # create a mailing job for each student that has none yet
+    key_data_list = [[student.key()] for student in students]
+    job_logic.createJobs(priority_group, task_name, key_data_list)
 
     # update our own job
     last_student_key = students[-1].key()
@@ -30,7 +30,7 @@ from soc.logic.models.user import logic as user_logic
 
 
 # amount of users to create jobs for before updating
-DEF_USER_STEP_SIZE = 10
+DEF_USER_STEP_SIZE = 100
 
 
 class TempUserWithUniqueId(db.Model):
@@ -70,23 +70,12 @@ def setupUniqueUserIdAdder(job_entity):
 
   # set the default fields for the jobs we are going to create
   priority_group = priority_logic.getGroup(priority_logic.CONVERT)
-  job_fields = {
-      'priority_group': priority_group,
-      'task_name': 'addUniqueUserIds'}
-
-  job_query_fields = job_fields.copy()
+  task_name = 'addUniqueUserIds'
 
   while m_users:
-    # for each user create a adder job
-    for user in m_users:
-
-      job_query_fields['key_data'] = user.key()
-      adder_job = job_logic.getForFields(job_query_fields, unique=True)
-
-      if not adder_job:
-        # this user doesn't have unique id yet
-        job_fields['key_data'] = [user.key()]
-        job_logic.updateOrCreateFromFields(job_fields)
+    # create an adder job for each user that has none yet
+    key_data_list = [[user.key()] for user in m_users]
+    job_logic.createJobs(priority_group, task_name, key_data_list)
 
     # update our own job
     last_user_key = m_users[-1].key()
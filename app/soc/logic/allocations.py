@@ -22,6 +22,7 @@ __authors__ = [
   ]
 
 
+import heapq
 import math
 
 
@@ -97,6 +98,9 @@ class Allocator(object):
     if self.algorithm == 2:
       return self.reliableAlgorithm()
 
+    if self.algorithm == 3:
+      return self.largestRemainderAllocation()
+
     return self.iterativeAllocation()
 
   def buildSets(self):
@@ -139,6 +143,15 @@ class Allocator(object):
 
     return slots
 
+  def maxSlots(self, org):
+    """Returns the most slots rangeSlots allows for the org.
+    """
+
+    slots = max(self.max_slots_per_org, self.min_slots_per_org)
+    slots = min(slots, self.max[org])
+
+    return slots
+
   def iterativeAllocation(self):
     """A simple iterative algorithm.
     """
@@ -320,3 +333,84 @@ class Allocator(object):
         allocations[org] = slots
 
     return allocations
+
+  def largestRemainderAllocation(self):
+    """A largest remainder algorithm that calculates the slots assignments.
+
+    Each unlocked org gets its exact quota rounded down and brought within
+    bounds. The slots that are left over are spread evenly over the orgs
+    that are not at their maximum yet, and the last few go to the orgs with
+    the largest remainders. Runs in O(orgs log orgs).
+    """
+
+    locked_orgs = self.locked_orgs
+    locked_slots = self.locked_slots
+    unlocked_orgs = self.unlocked_orgs
+
+    available_slots = self.slots
+    allocations = {}
+
+    # take out the easy ones
+    for org in locked_orgs:
+      slots = self.rangeSlots(locked_slots[org], org)
+      available_slots -= slots
+      allocations[org] = slots
+
+    total_popularity = sum([self.popularity[org] for org in unlocked_orgs])
+
+    # all orgs have been locked, nothing to do
+    if total_popularity <= 0:
+      return allocations
+
+    remainders = {}
+    headroom = []
+
+    for org in unlocked_orgs:
+      quota, remainder = divmod(self.popularity[org] * available_slots,
+                                total_popularity)
+      slots = self.rangeSlots(quota, org)
+      room = self.maxSlots(org) - slots
+
+      if room > 0:
+        headroom.append((room, org))
+        remainders[org] = remainder
+
+      allocations[org] = slots
+
+    slots_left = self.slots - sum(allocations.values())
+
+    if slots_left <= 0 or not headroom:
+      return allocations
+
+    # raise all orgs with room to the same number of extra slots, as far
+    # as that fits within the slots that are left
+    headroom.sort()
+    level = 0
+    used = 0
+
+    for i, (room, _) in enumerate(headroom):
+      raising = len(headroom) - i
+      cost = (room - level) * raising
+
+      if used + cost > slots_left:
+        extra = (slots_left - used) // raising
+        used += extra * raising
+        level += extra
+        break
+
+      used += cost
+      level = room
+
+    for room, org in headroom:
+      allocations[org] += min(room, level)
+
+    slots_left -= used
+
+    # the rest is fewer than the orgs that still have room
+    candidates = [(remainders[org], org) for room, org in headroom
+                  if room > level]
+
+    for _, org in heapq.nlargest(slots_left, candidates):
+      allocations[org] += 1
+
+    return allocations
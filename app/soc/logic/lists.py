@@ -24,9 +24,15 @@ __authors__ = [
 
 class Lists(object):
   """List array suitable for enumerating over with just 'for in'.
+
+  The lists and their rows are advanced with index cursors, so rendering
+  a list is linear in the amount of rows.
   """
 
-  DEF_PASSTHROUGH_FIELDS = [
+  __slots__ = ['_contents', '_content', '_lists', '_list_idx',
+               '_list_data', '_rows', '_row_idx', '_row_data']
+
+  DEF_PASSTHROUGH_FIELDS = frozenset([
       'pagination',
       'pagination_form',
       'description',
@@ -40,7 +46,7 @@ class Lists(object):
       'first',
       'last',
       'idx',
-      ]
+      ])
 
   def __init__(self, contents):
     """Constructs a new Lists object with the specified contents.
@@ -51,11 +57,13 @@ class Lists(object):
     self._content = {}
 
     # For iterating over all the lists
-    self._lists = range(len(contents))
+    self._lists = xrange(len(contents))
+    self._list_idx = 0
     self._list_data = []
 
     # For iterating over the rows
-    self._rows = []
+    self._rows = xrange(0)
+    self._row_idx = 0
     self._row_data = []
 
   def __getattr__(self, attr):
@@ -81,18 +89,19 @@ class Lists(object):
     return self._content[item]
 
   def nextList(self):
-    """Shifts out the current list content.
+    """Advances to the next list.
 
     The main content of the next list is returned for further processing.
     """
 
     # Advance the list data once
-    self._content = self._contents[0]
-    self._contents = self._contents[1:]
+    self._content = self._contents[self._list_idx]
+    self._list_idx += 1
 
     # Update internal 'iterators'
     self._list_data = self.get('data')
-    self._rows = range(len(self._list_data))
+    self._rows = xrange(len(self._list_data))
+    self._row_idx = 0
 
     return self.get('main')
 
@@ -102,11 +111,9 @@ class Lists(object):
     Before calling this method, nextList should be called at least once.
     """
 
-    # Update internal 'iterators'
-    self._row_data =  self._list_data[0]
-
     # Advance the row data once
-    self._list_data = self._list_data[1:]
+    self._row_data = self._list_data[self._row_idx]
+    self._row_idx += 1
 
     return self.get('row')
 
@@ -117,7 +124,7 @@ class Lists(object):
     return not self._lists
 
   def lists(self):
-    """Returns a list of numbers the size of the amount of lists.
+    """Returns a sequence of numbers the size of the amount of lists.
 
     This method can be used to iterate over all lists with shift,
     without using a while loop.
@@ -126,7 +133,7 @@ class Lists(object):
     return self._lists
 
   def rows(self):
-    """Returns a list of numbers the size of the amount of items.
+    """Returns a sequence of numbers the size of the amount of items.
 
     This method can be used to iterate over all items with next for
     the current list, without using a while loop.
@@ -65,13 +65,10 @@ __authors__ = [
   ]
 
 import logging
-import time
-  
+
 from django.template import loader
 
 from google.appengine.api import mail
-from google.appengine.api import memcache
-from google.appengine.api.labs import taskqueue
 
 from soc.logic import dicts
 
@@ -94,31 +91,55 @@ def sendMailFromTemplate(template, context):
       http://code.google.com/appengine/docs/mail/exceptions.html
   """
 
-  # render the template and put in context with 'html' as key
-  context['html'] = loader.render_to_string(template, dictionary=context)
+  sendMailsFromTemplate(template, [context])
+
+
+def sendMailsFromTemplate(template, contexts):
+  """Sends out an email for each context using a Django template.
+
+  Like sendMailFromTemplate, but all emails are queued at once.
+
+  Args:
+    template: the template (or search list of templates) to use
+    contexts: a list of contexts as passed to sendMailFromTemplate
+  """
+
+  messages = []
+
+  for context in contexts:
+    # render the template and put in context with 'html' as key
+    context['html'] = loader.render_to_string(template, dictionary=context)
+
+    # filter out the unneeded values in context to keep sendMail happy
+    messages.append(dicts.filter(context, mail.EmailMessage.PROPERTIES))
 
-  # filter out the unneeded values in context to keep sendMail happy
-  sendMail(dicts.filter(context, mail.EmailMessage.PROPERTIES))
+  sendMails(messages)
 
 
 def sendMail(context):
-  """Creates new tasks.mail.sendMail task.
-  
-  Because context may contain non-string args, it is stored in the memcache
-  and the memcache key is passed to the sendMail task.
-  
+  """Queues an email in the outbox.
+
   Args:
     context:  The context supplied to the template and email (dictionary)
-  
   """
-  # the key can be anything, as long as it is unique
-  memcache_key = str(time.time())
-  # save mail dict to the memcache
-  memcache.set(memcache_key, context, namespace='mail')
-  params = {'memcache_key': memcache_key}
-  task = taskqueue.Task(params=params, url='/tasks/mail/sendmail')
-  task.add(queue_name='mail')
-  
+
+  sendMails([context])
+
+
+def sendMails(contexts):
+  """Queues the emails in the outbox, from which tasks.mail sends them.
+
+  Because a context may contain non-string args, it is stored pickled in
+  an OutboxMessage entity.
+
+  Args:
+    contexts: a list of contexts as passed to sendMail
+  """
+
+  from soc.logic.models.outbox_message import logic as outbox_logic
+
+  outbox_logic.queueMessages(contexts)
+
 
 def getDefaultMailSender():
   """Returns the sender that currently can be used to send emails.
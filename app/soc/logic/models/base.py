@@ -27,14 +27,19 @@ __authors__ = [
 
 import logging
 
+from google.appengine.api import datastore
 from google.appengine.ext import db
 
 from django.utils.translation import ugettext
 
+from soc.cache import request_scope
 from soc.cache import sidebar
 from soc.logic import dicts
 from soc.views import out_of_band
 
+import soc.cache.entity
+import soc.cache.logic
+
 
 class Error(Exception):
   """Base class for all exceptions raised by this module.
@@ -66,6 +71,11 @@ class Logic(object):
   on arguments passed to __init__.
   """
 
+  #: if set, getFromKeyName keeps entities in the instance and memcache
+  #: entity cache for this many seconds; only for entities that are read
+  #: far more often than they are written, see soc.cache.entity
+  ENTITY_CACHE_RETENTION = None
+
   def __init__(self, model, base_model=None, scope_logic=None,
                name=None, skip_properties=None, id_based=False):
     """Defines the name, key_name and model for this entity.
@@ -201,6 +211,8 @@ class Logic(object):
   def getFromKeyName(self, key_name):
     """"Returns entity for key_name or None if not found.
 
+    Within a transaction the entity is always retrieved from the datastore.
+
     Args:
       key_name: key name of entity
     """
@@ -211,7 +223,59 @@ class Logic(object):
     if not key_name:
       raise InvalidArgumentError
 
-    return self._model.get_by_key_name(key_name)
+    if datastore._CurrentTransactionKey():
+      # a transaction has to read the entity itself, from its entity group
+      return self._model.get_by_key_name(key_name)
+
+    entity = self._getIdentityMap().get(key_name)
+
+    if entity:
+      return entity
+
+    retention = self.ENTITY_CACHE_RETENTION
+
+    if retention:
+      entity = soc.cache.entity.get(self._model, key_name, retention)
+
+    if not entity:
+      entity = self._model.get_by_key_name(key_name)
+
+      if entity and retention:
+        soc.cache.entity.put(self._model, key_name, entity, retention)
+
+    self._remember(entity)
+
+    return entity
+
+  def prefetch(self, key_names):
+    """Retrieves the entities for all key_names in a single batch get.
+
+    Entities that were already retrieved during this request are not
+    fetched again. Afterwards getFromKeyName is served from memory for
+    all of the specified key_names.
+
+    Args:
+      key_names: a list of key names
+
+    Returns:
+      A list with the entity (or None if not found) for each key name,
+      in the same order as key_names.
+    """
+
+    if self._id_based:
+      raise Error("prefetch called on an id based logic")
+
+    identity_map = self._getIdentityMap()
+
+    missing = []
+    for key_name in key_names:
+      if key_name not in identity_map and key_name not in missing:
+        missing.append(key_name)
+
+    if missing:
+      self._remember(*self._model.get_by_key_name(missing))
+
+    return [identity_map.get(i) for i in key_names]
 
   def getFromID(self, id):
     """Returns entity for id or None if not found.
@@ -310,7 +374,7 @@ class Logic(object):
     raise out_of_band.Error(msg, status=404)
 
   def getForFields(self, filter=None, unique=False,
-                   limit=1000, offset=0, order=None):
+                   limit=1000, offset=0, order=None, start_key=None):
     """Returns all entities that have the specified properties.
 
     Args:
@@ -319,10 +383,23 @@ class Logic(object):
       limit: the amount of entities to fetch at most
       offset: the position to start at
       order: a list with the sort order
+      start_key: if set, only entities with a key greater than start_key
+        are returned, in key order; can not be combined with order
     """
 
+    if start_key:
+      if order:
+        raise InvalidArgumentError("start_key can not be used with an order")
+
+      filter = dicts.merge({'__key__ >': start_key}, filter or {})
+
     if unique:
       limit = 1
+      memo_key = self._getUniqueQueryKey(filter, order, offset)
+      entity = self._getUniqueQueryMemo().get(memo_key)
+
+      if entity:
+        return entity
 
     query = self.getQueryForFields(filter=filter, order=order)
 
@@ -334,8 +411,14 @@ class Logic(object):
                         (exception, self._model, filter, order))
       # TODO: send email
 
+    self._remember(*result)
+
     if unique:
-      return result[0] if result else None
+      if not result:
+        return None
+
+      self._getUniqueQueryMemo()[memo_key] = result[0]
+      return result[0]
 
     return result
 
@@ -407,6 +490,8 @@ class Logic(object):
         prop.__set__(entity, value)
 
     entity.put()
+    self._forget(entity)
+    self._remember(entity)
 
     # call the _onUpdate method
     if not silent:
@@ -437,6 +522,8 @@ class Logic(object):
 
       # entity did not exist, so create one in a transaction
       entity = self._model.get_or_insert(key_name, **properties)
+      self._forget(entity)
+      self._remember(entity)
     else:
       # If someone else already created the entity (due to a race), we
       # should not update the propties (as they 'won' the race).
@@ -469,6 +556,9 @@ class Logic(object):
       key_name = self.getKeyNameFromFields(properties)
       entity = self._model.get_or_insert(key_name, **properties)
 
+    self._forget(entity)
+    self._remember(entity)
+
     if not silent:
       self._onCreate(entity)
 
@@ -490,6 +580,8 @@ class Logic(object):
       entity: an existing entity in datastore
     """
 
+    # the key is no longer available once the entity has been deleted
+    self._forget(entity)
     entity.delete()
     # entity has been deleted call _onDelete
     self._onDelete(entity)
@@ -546,6 +638,82 @@ class Logic(object):
       else:
         key = results[-1].key()
 
+  def _getIdentityMap(self):
+    """Returns the request scoped identity map for this logic's model.
+
+    The identity map is a dict from key name to entity, it is shared by
+    all logics for the same kind and flushed at the start of each request.
+    """
+
+    return request_scope.getNamespace(
+        'identity_map_for_%s' % self._model.kind())
+
+  def _getUniqueQueryMemo(self):
+    """Returns the request scoped memo for unique getForFields queries.
+
+    The memo maps a normalized (filter, order, offset) key to the entity
+    that the query returned, only queries with a result are stored.
+    """
+
+    return request_scope.getNamespace(
+        'unique_query_for_%s' % self._model.kind())
+
+  def _getUniqueQueryKey(self, filter, order, offset):
+    """Returns the memo key for a unique getForFields query.
+    """
+
+    new_filter = []
+
+    for filter_key, value in (filter or {}).iteritems():
+      if isinstance(value, db.Model):
+        value = str(value.key())
+      elif isinstance(value, list):
+        value = tuple([str(i.key()) if isinstance(i, db.Model) else i
+                       for i in value])
+      new_filter.append((filter_key, value))
+
+    return repr((sorted(new_filter), order, offset))
+
+  def _remember(self, *entities):
+    """Stores the specified entities in the identity map.
+
+    Entities that do not exist or that have no key name are skipped.
+    """
+
+    identity_map = self._getIdentityMap()
+
+    for entity in entities:
+      if not entity:
+        continue
+
+      key_name = entity.key().name()
+
+      if key_name:
+        identity_map[key_name] = entity
+
+  def _forget(self, entity):
+    """Removes entity from the identity map after it has been written.
+
+    Any memoized unique query for the kind is dropped as well, since the
+    write may have changed which entity such a query should return. For
+    the same reason the cached query results for the kind are invalidated.
+    If this logic uses the entity cache the entity is dropped from it.
+
+    This is called from every write method rather than from the _onCreate,
+    _onUpdate and _onDelete hooks, as those can be skipped or overridden.
+    """
+
+    key_name = entity.key().name()
+
+    if key_name:
+      self._getIdentityMap().pop(key_name, None)
+
+      if self.ENTITY_CACHE_RETENTION:
+        soc.cache.entity.flush(self._model, key_name)
+
+    request_scope.flush('unique_query_for_%s' % self._model.kind())
+    soc.cache.logic.flush(self._model)
+
   def _createField(self, entity_properties, name):
     """Hook called when a field is created.
 
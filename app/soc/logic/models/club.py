@@ -82,12 +82,18 @@ class Logic(group.Logic):
     receivers = [entity]
     newsfeed_logic.addToFeed(entity, receivers, "created")
 
+    super(Logic, self)._onCreate(entity)
+
   def _onUpdate(self, entity):
     receivers = [entity]
     newsfeed_logic.addToFeed(entity, receivers, "updated")
 
+    super(Logic, self)._onUpdate(entity)
+
   def _onDelete(self, entity):
     receivers = [entity]
     newsfeed_logic.addToFeed(entity, receivers, "deleted")
+
+    super(Logic, self)._onDelete(entity)
     
 logic = Logic()
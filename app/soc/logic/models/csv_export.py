@@ -0,0 +1,268 @@
+#!/usr/bin/python2.5
+#
+# Copyright 2009 the Melange authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""CSVExport (Model) query functions.
+"""
+
+__authors__ = [
+  '"Sverre Rabbelier" <sverre@rabbelier.nl>',
+  ]
+
+
+import csv
+import datetime
+import hashlib
+import pickle
+import StringIO
+
+from google.appengine.api.labs import taskqueue
+from google.appengine.ext import db
+
+from soc.logic import dicts
+from soc.logic.models import base
+
+import soc.models.csv_export
+
+
+# amount of entities that are exported in one batch
+DEF_BATCH_SIZE = 100
+
+# amount of CSVExportChunks that are retrieved in one datastore call
+DEF_CHUNK_BATCH_SIZE = 10
+
+# time after which a completed export is built again when requested
+DEF_EXPORT_RETENTION = datetime.timedelta(hours=1)
+
+# time without progress after which a running export is considered failed,
+# the build task stores a batch every few seconds while it runs
+DEF_EXPORT_TIMEOUT = datetime.timedelta(minutes=30)
+
+DEF_BUILD_TASK_URL = '/tasks/csv_export/build'
+
+
+class Logic(base.Logic):
+  """Logic methods for the CSVExport model.
+  """
+
+  def __init__(self, model=soc.models.csv_export.CSVExport,
+               base_model=None, scope_logic=None):
+    """Defines the name, key_name and model for this entity.
+    """
+
+    super(Logic, self).__init__(model=model, base_model=base_model,
+                                scope_logic=scope_logic)
+
+  def getKeyNameForList(self, account, path, idx):
+    """Returns the key name of the export for a list on a page.
+
+    Args:
+      account: the account that requests the export
+      path: the path of the page that contains the list
+      idx: the index of the list on that page
+    """
+
+    digest = hashlib.md5('%s|%s|%d' % (account, path, idx)).hexdigest()
+    return 'export_%s' % digest
+
+  def generateRows(self, data, key_order, header=True):
+    """Yields the csv formatted line for each row in data.
+
+    Only a single row is kept in memory at any time, so this can be used
+    to stream an export of any size.
+
+    Args:
+      data: an iterable of dicts
+      key_order: the keys that are exported, in column order
+      header: iff True the first line contains the column names
+    """
+
+    file_handler = StringIO.StringIO()
+    writer = csv.DictWriter(file_handler, key_order, dialect='excel')
+
+    if header:
+      writer.writerow(dicts.identity(key_order))
+
+    for row_dict in data:
+      # encode the data to UTF-8 to ensure compatibiliy
+      for key in row_dict.keys():
+        value = row_dict[key]
+        if isinstance(value, basestring):
+          row_dict[key] = value.encode("utf-8")
+        else:
+          row_dict[key] = str(value)
+
+      writer.writerow(row_dict)
+
+      yield file_handler.getvalue()
+
+      file_handler.seek(0)
+      file_handler.truncate()
+
+    # yields the header if there were no rows
+    if file_handler.getvalue():
+      yield file_handler.getvalue()
+
+  def startExport(self, key_name, logic, filter, key_order, filename):
+    """Returns the export for key_name, and starts building it if needed.
+
+    A running export, or one that was completed less than
+    DEF_EXPORT_RETENTION ago, is returned as is. A running export that
+    has not stored a batch for DEF_EXPORT_TIMEOUT is assumed to have
+    failed and, like an expired one, is replaced by a new export with a
+    task to build it.
+
+    Args:
+      key_name: the key name of the export, see getKeyNameForList
+      logic: the logic for the entities that should be exported
+      filter: the filter that the exported entities should satisfy
+      key_order: the fields that are exported, in column order
+      filename: the name of the file that is offered for download
+    """
+
+    entity = self.getFromKeyName(key_name)
+
+    if entity:
+      now = datetime.datetime.now()
+
+      if entity.status == 'running':
+        if entity.last_modified_on > now - DEF_EXPORT_TIMEOUT:
+          return entity
+      elif entity.created_on > now - DEF_EXPORT_RETENTION:
+        return entity
+
+      self.delete(entity)
+
+    # entities can not be pickled reliably, their keys can
+    new_filter = {}
+    for key, value in (filter or {}).iteritems():
+      if isinstance(value, db.Model):
+        value = value.key()
+      elif isinstance(value, list):
+        value = [i.key() if isinstance(i, db.Model) else i for i in value]
+      new_filter[key] = value
+
+    properties = {
+        'filename': filename,
+        'logic_module': logic.__module__,
+        'filter': pickle.dumps(new_filter),
+        'key_order': key_order,
+        }
+
+    entity = self.updateOrCreateFromKeyName(properties, key_name)
+
+    task_params = {'export_key': key_name}
+    new_task = taskqueue.Task(params=task_params, url=DEF_BUILD_TASK_URL)
+    new_task.add()
+
+    return entity
+
+  def buildBatch(self, key_name):
+    """Exports the next DEF_BATCH_SIZE entities for the specified export.
+
+    The entities are exported in key order, the csv data is stored in
+    a new CSVExportChunk in the same transaction that records progress.
+    That transaction reads the export again and stores nothing if another
+    task stored this batch, or the export was restarted, in the meantime.
+
+    Args:
+      key_name: the key name of the export
+
+    Returns:
+      True iff there are more entities to export
+    """
+
+    model = soc.models.csv_export.CSVExport
+
+    # the export changes with every batch, do not use the request cache
+    entity = model.get_by_key_name(key_name)
+
+    if not entity or entity.status != 'running':
+      return False
+
+    module = __import__(entity.logic_module, fromlist=[''])
+    filter = pickle.loads(entity.filter)
+
+    if entity.last_key:
+      filter['__key__ >'] = db.Key(entity.last_key)
+
+    # do not use getForFields, there is no need to remember the entities
+    query = module.logic.getQueryForFields(filter=filter)
+    entities = query.fetch(DEF_BATCH_SIZE)
+
+    rows = (i.toDict(entity.key_order) for i in entities)
+    data = ''.join(self.generateRows(rows, entity.key_order,
+                                     header=(entity.chunks == 0)))
+
+    more = len(entities) == DEF_BATCH_SIZE
+    last_key = str(entities[-1].key()) if entities else entity.last_key
+
+    def store_batch_txn():
+      current = model.get(entity.key())
+
+      if not current or current.status != 'running' or \
+          (current.chunks, current.last_key) != (entity.chunks,
+                                                 entity.last_key):
+        return False
+
+      # the chunk is in the entity group of the export
+      chunk = soc.models.csv_export.CSVExportChunk(
+          parent=current, key_name='chunk_%d' % current.chunks,
+          data=db.Text(data, encoding='utf-8'))
+
+      current.chunks += 1
+      current.last_key = last_key
+      if not more:
+        current.status = 'completed'
+
+      db.put([chunk, current])
+      return True
+
+    stored = db.run_in_transaction(store_batch_txn)
+
+    return stored and more
+
+  def iterateChunks(self, entity):
+    """Yields the csv data of the specified export, one chunk at a time.
+    """
+
+    model = soc.models.csv_export.CSVExportChunk
+    kind = model.kind()
+
+    keys = [db.Key.from_path(kind, 'chunk_%d' % i, parent=entity.key())
+            for i in range(entity.chunks)]
+
+    for i in range(0, len(keys), DEF_CHUNK_BATCH_SIZE):
+      for chunk in model.get(keys[i:i+DEF_CHUNK_BATCH_SIZE]):
+        if chunk:
+          yield chunk.data.encode('utf-8')
+
+  def delete(self, entity):
+    """Deletes all CSVExportChunks before deleting the entity.
+
+    Args:
+      entity: an existing entity in datastore
+    """
+
+    kind = soc.models.csv_export.CSVExportChunk.kind()
+
+    keys = [db.Key.from_path(kind, 'chunk_%d' % i, parent=entity.key())
+            for i in range(entity.chunks)]
+    db.delete(keys)
+
+    super(Logic, self).delete(entity)
+
+
+logic = Logic()
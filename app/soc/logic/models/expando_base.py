@@ -69,6 +69,8 @@ class Logic(base.Logic):
         setattr(entity, name, value)
 
     entity.put()
+    self._forget(entity)
+    self._remember(entity)
 
     # call the _onUpdate method
     if not silent:
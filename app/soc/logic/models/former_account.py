@@ -0,0 +1,185 @@
+#!/usr/bin/python2.5
+#
+# Copyright 2009 the Melange authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""FormerAccount (Model) query functions.
+"""
+
+__authors__ = [
+  '"Sverre Rabbelier" <sverre@rabbelier.nl>',
+  ]
+
+
+import time
+
+from google.appengine.api.labs import taskqueue
+from google.appengine.ext import db
+
+from soc.logic import accounts
+from soc.logic.models import base
+
+import soc.models.former_account
+import soc.models.user
+
+
+# amount of Users scanned per batch when building the index
+DEF_BATCH_SIZE = 100
+
+# the maximum amount of Users with former accounts that are scanned while
+# the index is being built
+DEF_SCAN_LIMIT = 1000
+
+# seconds during which the indexing is started at most once
+DEF_INDEX_WINDOW = 60 * 60
+
+# key name of the FormerAccountIndex that marks the index as complete
+DEF_INDEX_KEY_NAME = 'former_accounts'
+
+DEF_INDEX_TASK_URL = '/tasks/former_account/index'
+
+
+class Logic(base.Logic):
+  """Logic methods for the FormerAccount model.
+  """
+
+  def __init__(self, model=soc.models.former_account.FormerAccount,
+               base_model=None, scope_logic=None):
+    """Defines the name, key_name and model for this entity.
+    """
+
+    super(Logic, self).__init__(model=model, base_model=base_model,
+                                scope_logic=scope_logic)
+
+    self._indexed = False
+
+  def getKeyNameForAccount(self, account):
+    """Returns the key name of the FormerAccount for the given account.
+    """
+
+    return accounts.normalizeAccount(account).email()
+
+  def isFormerAccount(self, account):
+    """Returns True if account is a former account of some User.
+
+    Until all Users have been indexed, accounts that are not in the index
+    are looked for among the former accounts of up to DEF_SCAN_LIMIT
+    Users, and the indexing is started if it is not running yet.
+    """
+
+    key_name = self.getKeyNameForAccount(account)
+
+    if self.getFromKeyName(key_name):
+      return True
+
+    if self.isIndexed():
+      return False
+
+    self.startIndexing()
+
+    users_with_former_accounts = soc.models.user.User.gql(
+        'WHERE former_accounts != :1', None).fetch(DEF_SCAN_LIMIT)
+
+    for former_account_user in users_with_former_accounts:
+      for former_account in former_account_user.former_accounts:
+        if str(account) == str(former_account):
+          return True
+
+    return False
+
+  def isIndexed(self):
+    """Returns True if the FormerAccounts of all Users have been stored.
+    """
+
+    if not self._indexed:
+      index = soc.models.former_account.FormerAccountIndex.get_by_key_name(
+          DEF_INDEX_KEY_NAME)
+      self._indexed = index is not None
+
+    return self._indexed
+
+  def _newEntities(self, user_entity, former_accounts):
+    """Returns new, not yet stored, FormerAccounts of a User.
+    """
+
+    entities = []
+
+    for account in former_accounts:
+      account = accounts.normalizeAccount(account)
+      entities.append(self._model(key_name=account.email(), account=account,
+                                  user=user_entity))
+
+    return entities
+
+  def addFormerAccount(self, user_entity, account):
+    """Records that account was a former account of the given User.
+    """
+
+    entity, = self._newEntities(user_entity, [account])
+    entity.put()
+
+    self._forget(entity)
+
+  def indexBatch(self, start_key=None):
+    """Stores the FormerAccounts of the next DEF_BATCH_SIZE Users.
+
+    Args:
+      start_key: key of the last User of the previous batch
+
+    Returns:
+      The key of the last User in this batch, or None if all Users have
+      been indexed.
+    """
+
+    from soc.logic.models.user import logic as user_logic
+
+    users = user_logic.getForFields(limit=DEF_BATCH_SIZE,
+                                    start_key=start_key)
+
+    entities = []
+    for user in users:
+      entities.extend(self._newEntities(user, user.former_accounts))
+
+    if entities:
+      db.put(entities)
+
+      for entity in entities:
+        self._forget(entity)
+
+    if len(users) < DEF_BATCH_SIZE:
+      soc.models.former_account.FormerAccountIndex(
+          key_name=DEF_INDEX_KEY_NAME).put()
+      return None
+
+    return users[-1].key()
+
+  def startIndexing(self):
+    """Starts a task storing the FormerAccounts of all existing Users.
+
+    The task is named after the current DEF_INDEX_WINDOW, so it is started
+    at most once per window.
+    """
+
+    window = int(time.time() / DEF_INDEX_WINDOW)
+    task_name = 'former-account-index-%d' % window
+
+    new_task = taskqueue.Task(name=task_name, url=DEF_INDEX_TASK_URL)
+
+    try:
+      new_task.add()
+    except (taskqueue.TaskAlreadyExistsError, taskqueue.TombstonedTaskError):
+      pass
+
+
+logic = Logic()
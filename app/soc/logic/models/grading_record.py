@@ -31,6 +31,10 @@ from soc.logic.models.survey_record import project_logic
 import soc.models.grading_record
 
 
+# the maximum number of values the datastore accepts in an IN filter
+DEF_MAX_IN_VALUES = 30
+
+
 class Logic(base.Logic):
   """Logic methods for the GradingRecord model.
   """
@@ -46,6 +50,9 @@ class Logic(base.Logic):
   def updateOrCreateRecordsFor(self, survey_group, project_entities):
     """Updates or creates a GradingRecord in a batch.
 
+    The existing GradingRecords and the SurveyRecords they refer to are
+    retrieved for all projects at once and joined in memory.
+
     Args:
       survey_group: GradingSurveyGroup entity
       project_entities: list of project_entities which to process
@@ -53,19 +60,37 @@ class Logic(base.Logic):
 
     records_to_store = []
 
+    project_keys = [i.key() for i in project_entities]
+
+    # retrieve the two Surveys, student_survey might be None
+    grading_survey = survey_group.grading_survey
+    student_survey = survey_group.student_survey
+
     query_fields = {'grading_survey_group': survey_group}
+    records = self._getRecordsByProject(self, query_fields, project_keys)
+
+    query_fields = {'survey': grading_survey}
+    grading_survey_records = self._getRecordsByProject(
+        grading_logic, query_fields, project_keys)
+
+    if student_survey:
+      query_fields = {'survey': student_survey}
+      project_survey_records = self._getRecordsByProject(
+          project_logic, query_fields, project_keys)
+    else:
+      project_survey_records = {}
 
     for project_entity in project_entities:
-      # set a new project to query for
-      query_fields['project'] = project_entity
+      project_key = project_entity.key()
 
-      # try to retrieve an existing record
-      record_entity = self.getForFields(query_fields, unique=True)
+      # try to use an existing record
+      record_entity = records.get(project_key)
 
-      # retrieve the fields that should be set
-      record_fields = self.getFieldsForGradingRecord(project_entity,
-                                                     survey_group,
-                                                     record_entity)
+      # determine the fields that should be set
+      record_fields = self._getFieldsForRecords(
+          project_entity, survey_group,
+          grading_survey_records.get(project_key),
+          project_survey_records.get(project_key), record_entity)
 
       if record_entity:
         # update existing GradingRecord
@@ -81,6 +106,34 @@ class Logic(base.Logic):
     # batch put and return the entities
     return db.put(records_to_store)
 
+  def _getRecordsByProject(self, logic, fields, project_keys):
+    """Returns the entities for the given projects mapped by project key.
+
+    The projects are queried in chunks of DEF_MAX_IN_VALUES to stay
+    within the limits of an IN filter, so only the entities for the given
+    projects are read.
+
+    Args:
+      logic: the logic for the entities to retrieve
+      fields: the filter that all entities should match
+      project_keys: the keys of the projects to retrieve entities for
+    """
+
+    model = logic.getModel()
+    result = {}
+
+    for i in range(0, len(project_keys), DEF_MAX_IN_VALUES):
+      chunk = project_keys[i:i+DEF_MAX_IN_VALUES]
+
+      query_fields = fields.copy()
+      query_fields['project'] = chunk
+
+      for entity in logic.getForFields(query_fields):
+        project_key = model.project.get_value_for_datastore(entity)
+        result[project_key] = entity
+
+    return result
+
   def getFieldsForGradingRecord(self, project, survey_group,
                                 record_entity=None):
     """Returns the fields for a GradingRecord.
@@ -116,6 +169,24 @@ class Logic(base.Logic):
     else:
       project_survey_record = None
 
+    return self._getFieldsForRecords(project, survey_group,
+                                     grading_survey_record,
+                                     project_survey_record, record_entity)
+
+  def _getFieldsForRecords(self, project, survey_group, grading_survey_record,
+                           project_survey_record, record_entity):
+    """Returns the fields for a GradingRecord given its SurveyRecords.
+
+    Args:
+      project: Project entity
+      survey_group: a GradingSurveyGroup entity
+      grading_survey_record: the GradingProjectSurveyRecord or None
+      project_survey_record: the ProjectSurveyRecord or None
+      record_entity: the existing GradingRecord entity or None
+    """
+
+    student_survey = survey_group.student_survey
+
     # set the necessary fields
     fields = {'grading_survey_group': survey_group,
               'project': project,
@@ -22,6 +22,7 @@ __authors__ = [
   ]
 
 
+from soc.cache import rights as rights_cache
 from soc.logic.models import base
 
 import soc.models.group
@@ -39,6 +40,30 @@ class Logic(base.Logic):
     super(Logic, self).__init__(model, base_model=base_model,
                                 scope_logic=scope_logic)
 
+  def _onCreate(self, entity):
+    """Invalidates the cached access checks for the new Group.
+    """
+
+    rights_cache.bumpGeneration(entity.key().id_or_name())
+
+    super(Logic, self)._onCreate(entity)
+
+  def _onUpdate(self, entity):
+    """Invalidates the cached access checks for the updated Group.
+    """
+
+    rights_cache.bumpGeneration(entity.key().id_or_name())
+
+    super(Logic, self)._onUpdate(entity)
+
+  def _onDelete(self, entity):
+    """Invalidates the cached access checks for the deleted Group.
+    """
+
+    rights_cache.bumpGeneration(entity.key().id_or_name())
+
+    super(Logic, self)._onDelete(entity)
+
   def getKeyValuesFromEntity(self, entity):
     """Extracts the key values from entity and returns them.
 
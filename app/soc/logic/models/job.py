@@ -22,11 +22,17 @@ __authors__ = [
   ]
 
 
+from google.appengine.ext import db
+
 from soc.logic.models import base
 
 import soc.models.job
 
 
+# the maximum amount of values in an IN filter
+DEF_MAX_IN_VALUES = 30
+
+
 class Logic(base.Logic):
   """Logic methods for the Job model.
   """
@@ -39,5 +45,75 @@ class Logic(base.Logic):
     super(Logic, self).__init__(model=model, base_model=base_model,
                                 scope_logic=scope_logic, id_based=True)
 
+  def getKeyNameForJob(self, task_name, key_data):
+    """Returns the key name of the job for task_name with key_data.
+    """
+
+    return '/'.join([task_name] + [str(i) for i in key_data])
+
+  def createJobs(self, priority_group, task_name, key_data_list):
+    """Creates a job for task_name for each key_data that has none yet.
+
+    The jobs are stored with a key name based on their task and data, so
+    existing jobs are found with one batch get instead of a query each.
+    Jobs that were created with an id before that are looked up by their
+    key_data for the remaining ones.
+
+    Args:
+      priority_group: the PriorityGroup the jobs belong to
+      task_name: the name of the task as defined in soc.cron.job
+      key_data_list: a list with the key_data for each job
+
+    Returns:
+      The amount of jobs that were created.
+    """
+
+    key_names = [self.getKeyNameForJob(task_name, i) for i in key_data_list]
+    existing = self._model.get_by_key_name(key_names)
+
+    missing = [(key_name, key_data) for key_name, key_data, job
+               in zip(key_names, key_data_list, existing) if not job]
+
+    legacy = self._getLegacyKeyData(priority_group, task_name,
+                                    [i[1] for i in missing])
+
+    jobs = []
+
+    for key_name, key_data in missing:
+      if tuple(key_data) in legacy:
+        continue
+
+      jobs.append(self._model(key_name=key_name,
+                              priority_group=priority_group,
+                              task_name=task_name, key_data=key_data))
+
+    db.put(jobs)
+
+    return len(jobs)
+
+  def _getLegacyKeyData(self, priority_group, task_name, key_data_list):
+    """Returns the key_data of the id based jobs for task_name.
+
+    Only jobs of which the key_data starts with one of the keys that the
+    entries in key_data_list start with are looked up.
+
+    Returns:
+      A set with the key_data of each job found as a tuple.
+    """
+
+    first_keys = [i[0] for i in key_data_list if i]
+    found = set()
+
+    for i in range(0, len(first_keys), DEF_MAX_IN_VALUES):
+      query = self._model.all()
+      query.filter('priority_group', priority_group)
+      query.filter('task_name', task_name)
+      query.filter('key_data IN', first_keys[i:i + DEF_MAX_IN_VALUES])
+
+      for job in query:
+        found.add(tuple(job.key_data))
+
+    return found
+
 
 logic = Logic()
@@ -117,6 +117,16 @@ class Logic(role.Logic):
 
     return super(Logic, self)._updateField(entity, entity_properties, name)
 
+  def _onUpdate(self, entity):
+    """Updates the name and location of the Mentor on the organization map.
+    """
+
+    from soc.logic.models.org_map import logic as org_map_logic
+
+    org_map_logic.updateForRole(entity, 'mentor')
+
+    super(Logic, self)._onUpdate(entity)
+
   def getRoleLogicsToNotifyUponNewRequest(self):
     """Returns a list with OrgAdmin logic which can be used to notify all
     appropriate Organization Admins.
@@ -30,6 +30,10 @@ import soc.models.news_feed
 import soc.models.linkable 
 
 
+# amount of FeedItems that are kept in the timeline of a receiver
+DEF_TIMELINE_SIZE = 50
+
+
 class Logic(base.Logic):
   """Logic methods for the Newsfeed.
   """
@@ -50,12 +54,32 @@ class Logic(base.Logic):
         
   def retrieveFeed(self, entity, count=10, sort_order="-created"):
     """ Retrieves feed for a given entity 
-    
+
+    The newest items are read from the FeedTimeline of the entity, other
+    sort orders fall back to a query. An entity without a timeline gets
+    one, started with the items that were created before it.
+
     Params:
       entity - entity rendering its news feed
       count - number of feed items to retrieve
       sort_order - sorting method 
       
+    """
+    if sort_order == "-created" and count <= DEF_TIMELINE_SIZE:
+      key_name = str(entity.key())
+      timeline = soc.models.news_feed.FeedTimeline.get_by_key_name(key_name)
+      if timeline:
+        return [i for i in db.get(timeline.items[:count]) if i]
+
+      feed_items = self._queryFeed(entity, DEF_TIMELINE_SIZE)
+      soc.models.news_feed.FeedTimeline.get_or_insert(key_name,
+          items=[i.key() for i in feed_items])
+      return feed_items[:count]
+
+    return self._queryFeed(entity, count, sort_order)
+
+  def _queryFeed(self, entity, count, sort_order="-created"):
+    """ Queries the FeedItems that have entity as one of their receivers
     """
     feed_items = soc.models.news_feed.FeedItem.all(
     ).filter('receivers', entity
@@ -63,9 +87,34 @@ class Logic(base.Logic):
     ).fetch(count)
     return feed_items
 
-    
+  def addToTimelines(self, feed_item, receivers):
+    """ Puts a new FeedItem in front of the timeline of each receiver
+
+    The timelines are retrieved with one batch get and stored with one
+    batch put. Receivers without a timeline are skipped, they get one when
+    their feed is first read. A timeline never holds the same FeedItem
+    twice, so that a repeated task is harmless.
+
+    Params:
+      feed_item - the FeedItem that was created
+      receivers - keys of the receivers of the FeedItem
+    """
+    key_names = [str(receiver) for receiver in receivers]
+    timelines = [i for i in soc.models.news_feed.FeedTimeline.get_by_key_name(
+        key_names) if i]
+
+    item_key = feed_item.key()
+
+    for timeline in timelines:
+      if item_key in timeline.items:
+        timeline.items.remove(item_key)
+
+      timeline.items.insert(0, item_key)
+      del timeline.items[DEF_TIMELINE_SIZE:]
+
+    db.put(timelines)
+
 
-    
 logic = Logic()
 
 
@@ -0,0 +1,385 @@
+#!/usr/bin/python2.5
+#
+# Copyright 2009 the Melange authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""OrgMap (Model) query functions.
+"""
+
+__authors__ = [
+  '"Sverre Rabbelier" <sverre@rabbelier.nl>',
+  ]
+
+
+import time
+
+from google.appengine.api.labs import taskqueue
+from google.appengine.ext import db
+
+from django.utils import simplejson
+
+from soc.logic.models import base
+
+import soc.models.org_map
+import soc.models.student_project
+
+
+# StudentProjects with these statuses are shown on the map
+DEF_MAP_STATUSES = ['accepted', 'completed']
+
+# amount of StudentProjects or roles retrieved per datastore call
+DEF_BATCH_SIZE = 100
+
+# amount of Organizations rebuilt per batch by the rebuild task
+DEF_ORG_BATCH_SIZE = 10
+
+# seconds during which the map of an Organization is rebuilt at most once
+# because it was missing
+DEF_REBUILD_WINDOW = 10 * 60
+
+DEF_REBUILD_TASK_URL = '/tasks/org_map/rebuild'
+
+
+class Logic(base.Logic):
+  """Logic methods for the OrgMap model.
+  """
+
+  def __init__(self, model=soc.models.org_map.OrgMap,
+               base_model=None, scope_logic=None):
+    """Defines the name, key_name and model for this entity.
+    """
+
+    super(Logic, self).__init__(model=model, base_model=base_model,
+                                scope_logic=scope_logic)
+
+  def getMapData(self, org_entity):
+    """Returns the map data for the given Organization.
+
+    If the map data has not been built yet, a task is started that builds
+    it and an empty map is returned.
+    """
+
+    entity = self.getFromKeyName(org_entity.key().id_or_name())
+
+    if not entity:
+      self.startRebuildForOrg(org_entity)
+      return {'people': {}, 'projects': {}}
+
+    return simplejson.loads(entity.map_data)
+
+  def _getPersonData(self, role_entity, role_type, project_key_names):
+    """Returns the map data for a Student or Mentor.
+    """
+
+    return {'type': role_type,
+            'name': role_entity.name(),
+            'lat': role_entity.latitude,
+            'long': role_entity.longitude,
+            'projects': project_key_names,
+            }
+
+  def _addProject(self, data, project_entity, student_entity, mentor_entity):
+    """Adds a StudentProject to the map data, replacing its old data.
+
+    Only students and mentors who have agreed to publish their locations
+    will be in the people dictionary.
+    """
+
+    project_key_name = project_entity.key().id_or_name()
+    self._removeProject(data, project_key_name)
+
+    data['projects'][project_key_name] = {
+        'title': project_entity.title,
+        'student_key': student_entity.key().id_or_name(),
+        'student_name': student_entity.name(),
+        'mentor_key': mentor_entity.key().id_or_name(),
+        'mentor_name': mentor_entity.name(),
+        }
+
+    for role_entity, role_type in [(mentor_entity, 'mentor'),
+                                   (student_entity, 'student')]:
+      if not role_entity.publish_location:
+        continue
+
+      role_key_name = role_entity.key().id_or_name()
+
+      if role_key_name not in data['people']:
+        data['people'][role_key_name] = self._getPersonData(
+            role_entity, role_type, [])
+
+      data['people'][role_key_name]['projects'].append(project_key_name)
+
+  def _removeProject(self, data, project_key_name):
+    """Removes a StudentProject from the map data.
+    """
+
+    project = data['projects'].pop(project_key_name, None)
+
+    if not project:
+      return
+
+    for role_key_name in [project['student_key'], project['mentor_key']]:
+      person = data['people'].get(role_key_name)
+
+      if not person or project_key_name not in person['projects']:
+        continue
+
+      person['projects'].remove(project_key_name)
+
+      if not person['projects']:
+        del data['people'][role_key_name]
+
+  def _updateRole(self, data, role_entity, role_type):
+    """Updates the name and location of a Student or Mentor in the map data.
+    """
+
+    role_key_name = role_entity.key().id_or_name()
+    key_field = '%s_key' % role_type
+    name_field = '%s_name' % role_type
+
+    project_key_names = []
+
+    for project_key_name, project in data['projects'].iteritems():
+      if project[key_field] == role_key_name:
+        project[name_field] = role_entity.name()
+        project_key_names.append(project_key_name)
+
+    data['people'].pop(role_key_name, None)
+
+    if project_key_names and role_entity.publish_location:
+      data['people'][role_key_name] = self._getPersonData(
+          role_entity, role_type, sorted(project_key_names))
+
+  def _update(self, org_key_name, update):
+    """Applies update to the stored map data of an Organization.
+
+    Nothing is done if no map data has been built for the Organization,
+    it will be built in full when it is first requested.
+
+    Args:
+      org_key_name: key name of the Organization
+      update: callable that modifies the map data dictionary in place
+    """
+
+    def txn():
+      entity = self._model.get_by_key_name(org_key_name)
+
+      if not entity:
+        return None
+
+      data = simplejson.loads(entity.map_data)
+      update(data)
+      entity.map_data = simplejson.dumps(data)
+      entity.put()
+
+      return entity
+
+    entity = db.run_in_transaction(txn)
+
+    if entity:
+      self._forget(entity)
+
+  def _getRoles(self, project_entities):
+    """Returns a dictionary with the Students and Mentors of the given
+    StudentProjects by key, retrieved in batch gets.
+    """
+
+    model = soc.models.student_project.StudentProject
+
+    keys = set()
+    for project in project_entities:
+      keys.add(model.student.get_value_for_datastore(project))
+      keys.add(model.mentor.get_value_for_datastore(project))
+
+    keys = list(keys)
+    roles = {}
+
+    for i in range(0, len(keys), DEF_BATCH_SIZE):
+      for role in db.get(keys[i:i+DEF_BATCH_SIZE]):
+        if role:
+          roles[role.key()] = role
+
+    return roles
+
+  def _getProjectRoles(self, roles, project_entity):
+    """Returns the Student and Mentor of a StudentProject from roles.
+    """
+
+    model = soc.models.student_project.StudentProject
+
+    student = roles.get(model.student.get_value_for_datastore(project_entity))
+    mentor = roles.get(model.mentor.get_value_for_datastore(project_entity))
+
+    return student, mentor
+
+  def rebuildForOrg(self, org_entity):
+    """Builds the map data for an Organization from its StudentProjects.
+
+    Returns:
+      The stored OrgMap entity.
+    """
+
+    from soc.logic.models.student_project import logic as project_logic
+
+    projects = []
+
+    for status in DEF_MAP_STATUSES:
+      fields = {'scope': org_entity,
+                'status': status}
+      start_key = None
+
+      while True:
+        batch = project_logic.getForFields(fields, limit=DEF_BATCH_SIZE,
+                                           start_key=start_key)
+        projects.extend(batch)
+
+        if len(batch) < DEF_BATCH_SIZE:
+          break
+
+        start_key = batch[-1].key()
+
+    roles = self._getRoles(projects)
+    data = {'people': {}, 'projects': {}}
+
+    for project in projects:
+      student, mentor = self._getProjectRoles(roles, project)
+
+      if student and mentor:
+        self._addProject(data, project, student, mentor)
+
+    entity = self._model(key_name=org_entity.key().id_or_name(),
+                         map_data=simplejson.dumps(data))
+    entity.put()
+
+    self._forget(entity)
+    self._remember(entity)
+
+    return entity
+
+  def updateForProjects(self, project_entities):
+    """Updates the map data for the given, already stored, StudentProjects.
+
+    Projects that no longer have one of the DEF_MAP_STATUSES are removed.
+    """
+
+    roles = self._getRoles(project_entities)
+
+    by_org = {}
+    for project in project_entities:
+      by_org.setdefault(project.scope_path, []).append(project)
+
+    for org_key_name, projects in by_org.iteritems():
+
+      def update(data, projects=projects):
+        for project in projects:
+          student, mentor = self._getProjectRoles(roles, project)
+
+          if project.status in DEF_MAP_STATUSES and student and mentor:
+            self._addProject(data, project, student, mentor)
+          else:
+            self._removeProject(data, project.key().id_or_name())
+
+      self._update(org_key_name, update)
+
+  def removeProject(self, project_entity):
+    """Removes a StudentProject from the map data of its Organization.
+    """
+
+    project_key_name = project_entity.key().id_or_name()
+    self._update(project_entity.scope_path,
+                 lambda data: self._removeProject(data, project_key_name))
+
+  def updateForRole(self, role_entity, role_type):
+    """Updates the name and location of a Student or Mentor on the maps of
+    all Organizations it has a StudentProject with.
+
+    Args:
+      role_entity: the Student or Mentor entity
+      role_type: either 'student' or 'mentor'
+    """
+
+    from soc.logic.models.student_project import logic as project_logic
+
+    if role_type == 'mentor':
+      # mentors only have projects in their own organization
+      org_key_names = [role_entity.scope_path]
+    else:
+      fields = {'student': role_entity}
+      projects = project_logic.getForFields(fields)
+      org_key_names = set(i.scope_path for i in projects)
+
+    for org_key_name in org_key_names:
+      self._update(org_key_name,
+                   lambda data: self._updateRole(data, role_entity, role_type))
+
+  def rebuildBatch(self, program_entity, start_key=None):
+    """Rebuilds the map data for the next DEF_ORG_BATCH_SIZE Organizations
+    of a program.
+
+    Args:
+      program_entity: the Program whose Organizations should be rebuilt
+      start_key: key of the last Organization of the previous batch
+
+    Returns:
+      The key of the last Organization in this batch, or None if all
+      Organizations have been rebuilt.
+    """
+
+    from soc.logic.models.organization import logic as org_logic
+
+    fields = {'scope': program_entity,
+              'status': 'active'}
+
+    orgs = org_logic.getForFields(fields, limit=DEF_ORG_BATCH_SIZE,
+                                  start_key=start_key)
+
+    for org in orgs:
+      self.rebuildForOrg(org)
+
+    if len(orgs) < DEF_ORG_BATCH_SIZE:
+      return None
+
+    return orgs[-1].key()
+
+  def startRebuild(self, program_entity):
+    """Starts a task rebuilding the map data of all Organizations of the
+    given program.
+    """
+
+    task_params = {'program_key': program_entity.key().id_or_name()}
+
+    new_task = taskqueue.Task(params=task_params, url=DEF_REBUILD_TASK_URL)
+    new_task.add()
+
+  def startRebuildForOrg(self, org_entity):
+    """Starts a task building the map data of the given Organization.
+
+    The task is named after the Organization and the current
+    DEF_REBUILD_WINDOW, so it is started at most once per window.
+    """
+
+    window = int(time.time() / DEF_REBUILD_WINDOW)
+    task_name = 'org-map-%s-%d' % (org_entity.key(), window)
+    task_params = {'org_key': org_entity.key().id_or_name()}
+
+    new_task = taskqueue.Task(name=task_name, params=task_params,
+                              url=DEF_REBUILD_TASK_URL)
+
+    try:
+      new_task.add()
+    except (taskqueue.TaskAlreadyExistsError, taskqueue.TombstonedTaskError):
+      pass
+
+
+logic = Logic()
@@ -93,4 +93,17 @@ class Logic(group.Logic):
 
     super(Logic, self)._onCreate(entity)
 
+  def _updateField(self, entity, entity_properties, name):
+    """Refreshes the duplicate assignments when the slots change.
+    """
+
+    from soc.logic.models.proposal_duplicates import logic as duplicates_logic
+
+    if name == 'slots' and entity.slots != entity_properties[name]:
+      duplicates_logic.scheduleRefresh(entity.scope_path,
+                                       entity.key().id_or_name())
+
+    return super(Logic, self)._updateField(entity, entity_properties, name)
+
+
 logic = Logic()
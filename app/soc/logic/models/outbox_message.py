@@ -0,0 +1,297 @@
+#!/usr/bin/python2.5
+#
+# Copyright 2009 the Melange authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""OutboxMessage (Model) query functions.
+"""
+
+__authors__ = [
+  '"Sverre Rabbelier" <sverre@rabbelier.nl>',
+  ]
+
+
+import datetime
+import logging
+import pickle
+import time
+
+from google.appengine.api import mail
+from google.appengine.api import memcache
+from google.appengine.api.labs import taskqueue
+from google.appengine.ext import db
+
+from soc.logic.models import base
+
+import soc.models.outbox_message
+
+
+# amount of messages that are sent by one task
+DEF_BATCH_SIZE = 20
+
+# amount of messages that are stored in one datastore call
+DEF_PUT_BATCH_SIZE = 500
+
+# time for which a worker has exclusive access to a message it sends
+DEF_LEASE = datetime.timedelta(minutes=2)
+
+# the delay before the first retry, it doubles with every failed attempt
+DEF_RETRY_DELAY = 60
+
+# the longest delay between two attempts
+DEF_MAX_RETRY_DELAY = 60 * 60
+
+# the amount of failed attempts after which a message is given up on
+DEF_MAX_ATTEMPTS = 8
+
+# seconds within which all requests to send the outbox share one task
+DEF_SEND_WINDOW = 10
+
+# the upper bound for counting the backlog
+DEF_BACKLOG_LIMIT = 1000
+
+DEF_SEND_TASK_URL = '/tasks/mail/send_outbox'
+
+DEF_COUNTER_NAMESPACE = 'mail_outbox'
+
+DEF_COUNTERS = ['queued', 'sent', 'retried', 'failed']
+
+
+class Logic(base.Logic):
+  """Logic methods for the OutboxMessage model.
+  """
+
+  def __init__(self, model=soc.models.outbox_message.OutboxMessage,
+               base_model=None, scope_logic=None):
+    """Defines the name, key_name and model for this entity.
+    """
+
+    super(Logic, self).__init__(model=model, base_model=base_model,
+                                scope_logic=scope_logic, id_based=True)
+
+  def queueMessages(self, contexts):
+    """Stores the given email contexts and schedules a task to send them.
+
+    Args:
+      contexts: a list of dictionaries with EmailMessage fields
+    """
+
+    if not contexts:
+      return
+
+    entities = [self._model(context=db.Blob(pickle.dumps(i, 2)))
+                for i in contexts]
+
+    for i in range(0, len(entities), DEF_PUT_BATCH_SIZE):
+      db.put(entities[i:i+DEF_PUT_BATCH_SIZE])
+
+    self.incrementCounter('queued', len(entities))
+    self.scheduleSending()
+
+  def scheduleSending(self, countdown=0):
+    """Schedules a task that sends the pending messages.
+
+    The task is named after the DEF_SEND_WINDOW in which it is due and runs
+    at the end of that window, so all requests within one window share a
+    task and there is only ever one chain of tasks sending the outbox.
+
+    Args:
+      countdown: the minimal number of seconds after which the task
+        should run
+    """
+
+    now = time.time()
+    window = int((now + countdown) / DEF_SEND_WINDOW) + 1
+
+    task_name = 'outbox-%d' % window
+
+    task = taskqueue.Task(name=task_name, url=DEF_SEND_TASK_URL,
+                          countdown=window * DEF_SEND_WINDOW - now)
+
+    try:
+      task.add(queue_name='mail')
+    except (taskqueue.TaskAlreadyExistsError, taskqueue.TombstonedTaskError):
+      # another request in this window already scheduled the task
+      pass
+
+  def sendBatch(self, batch_size=DEF_BATCH_SIZE):
+    """Sends a batch of pending messages that are due.
+
+    Every message is leased before it is sent, so that concurrent tasks do
+    not send it twice. Each message is deleted as soon as it is sent,
+    messages that could not be sent are retried with an exponential backoff.
+
+    Args:
+      batch_size: the maximum amount of messages to send
+
+    Returns:
+      A tuple (sent, more, next_delay) with the amount of messages that
+      were sent, whether there may be more messages due, and the seconds
+      after which the next pending message is due or None if there are no
+      pending messages left.
+    """
+
+    now = datetime.datetime.now()
+
+    query = self._model.all(keys_only=True)
+    query.filter('status', 'pending')
+    query.filter('next_attempt <=', now)
+    query.order('next_attempt')
+
+    sent = retried = failed = 0
+
+    keys = query.fetch(batch_size)
+
+    for key in keys:
+      entity = db.run_in_transaction(self._lease, key, now)
+
+      if not entity:
+        # another task is sending this message
+        continue
+
+      error, permanent = self._send(pickle.loads(entity.context))
+
+      if not error:
+        entity.delete()
+        sent += 1
+        continue
+
+      entity.attempts += 1
+      entity.last_error = error
+
+      if permanent or entity.attempts >= DEF_MAX_ATTEMPTS:
+        entity.status = 'failed'
+        failed += 1
+      else:
+        delay = self.getRetryDelay(entity.attempts)
+        entity.next_attempt = now + datetime.timedelta(seconds=delay)
+        retried += 1
+
+      entity.put()
+
+    self.incrementCounter('sent', sent)
+    self.incrementCounter('retried', retried)
+    self.incrementCounter('failed', failed)
+
+    return sent, len(keys) == batch_size, self.getNextDelay()
+
+  def getNextDelay(self):
+    """Returns the seconds until the next pending message is due.
+
+    Leased messages are included, so that the messages of a task that died
+    while sending them are picked up once the lease ends. A live task that
+    holds a lease schedules the same named task once it is done.
+
+    Returns:
+      The seconds to wait, or None if there are no pending messages.
+    """
+
+    query = self._model.all()
+    query.filter('status', 'pending')
+    query.order('next_attempt')
+
+    entity = query.get()
+
+    if not entity:
+      return None
+
+    delta = entity.next_attempt - datetime.datetime.now()
+
+    if delta < datetime.timedelta(0):
+      return 0
+
+    # round up, so that the message is due when the task runs
+    return delta.days * 24 * 60 * 60 + delta.seconds + 1
+
+  def _lease(self, key, now):
+    """Leases the message with the given key if it is still due.
+
+    Should be run in a transaction.
+
+    Returns:
+      The leased OutboxMessage or None if it is not due anymore.
+    """
+
+    entity = db.get(key)
+
+    if not entity or entity.status != 'pending' or entity.next_attempt > now:
+      return None
+
+    entity.next_attempt = now + DEF_LEASE
+    entity.put()
+
+    return entity
+
+  def _send(self, context):
+    """Sends an email constructed from the given context.
+
+    Returns:
+      A tuple (error, permanent) with a description of the error or None if
+      the message was sent, and whether retrying the message is pointless.
+    """
+
+    try:
+      message = mail.EmailMessage(**context)
+      message.check_initialized()
+    except mail.Error, exception:
+      # the message itself is invalid, sending it again will not help
+      logging.exception(exception)
+      return '%s: %s' % (exception.__class__.__name__, exception), True
+
+    try:
+      message.send()
+    except mail.Error, exception:
+      logging.exception(exception)
+      return '%s: %s' % (exception.__class__.__name__, exception), False
+
+    return None, False
+
+  def getRetryDelay(self, attempts):
+    """Returns the seconds to wait after the specified amount of attempts.
+    """
+
+    return min(DEF_RETRY_DELAY * 2 ** (attempts - 1), DEF_MAX_RETRY_DELAY)
+
+  def incrementCounter(self, name, delta):
+    """Increments the counter with the specified name by delta.
+    """
+
+    if not delta:
+      return
+
+    # pylint: disable-msg=E1101
+    if memcache.incr(name, delta, namespace=DEF_COUNTER_NAMESPACE) is None:
+      memcache.add(name, delta, namespace=DEF_COUNTER_NAMESPACE)
+
+  def getStats(self):
+    """Returns the counters and the current backlog of the outbox.
+
+    The counters are kept in memcache and reset when they are evicted, the
+    backlog is counted up to DEF_BACKLOG_LIMIT.
+    """
+
+    # pylint: disable-msg=E1101
+    stats = memcache.get_multi(DEF_COUNTERS, namespace=DEF_COUNTER_NAMESPACE)
+
+    for name in DEF_COUNTERS:
+      stats.setdefault(name, 0)
+
+    query = self._model.all(keys_only=True)
+    query.filter('status', 'pending')
+    stats['backlog'] = query.count(DEF_BACKLOG_LIMIT)
+
+    return stats
+
+
+logic = Logic()
@@ -31,6 +31,8 @@ class Logic(base.Logic):
   """Logic methods for the Priority Group model.
   """
 
+  ENTITY_CACHE_RETENTION = 60
+
   def __init__(self, model=soc.models.priority_group.PriorityGroup,
                base_model=None, scope_logic=None):
     """Defines the name, key_name and model for this entity.
@@ -45,6 +47,14 @@ class Logic(base.Logic):
         self.CONVERT: 'Convert one entity to another type',
         }
 
+    # groups of which the jobs are dispatched to the task queue instead of
+    # being run by the cron poke, mapped to the amount of jobs that are
+    # dispatched at once
+    self.dispatched = {
+        self.EMAIL: 20,
+        self.CONVERT: 10,
+        }
+
     super(Logic, self).__init__(model=model, base_model=base_model,
                                 scope_logic=scope_logic)
 
@@ -23,6 +23,7 @@ __authors__ = [
   ]
 
 
+from soc.cache import rights as rights_cache
 from soc.logic.models import presence_with_tos
 from soc.logic.models import sponsor as sponsor_logic
 
@@ -38,6 +39,8 @@ class Logic(presence_with_tos.Logic):
   TIMELINE_LOGIC = {'gsoc' : gsoc.logic.models.timeline.logic,
                     'ghop' : soc.logic.models.timeline.logic}
 
+  ENTITY_CACHE_RETENTION = 60
+
   def __init__(self, model=soc.models.program.Program, 
                base_model=None, scope_logic=sponsor_logic):
     """Defines the name, key_name and model for this entity.
@@ -46,5 +49,29 @@ class Logic(presence_with_tos.Logic):
     super(Logic, self).__init__(model=model, base_model=base_model,
                                 scope_logic=scope_logic)
 
+  def _onCreate(self, entity):
+    """Invalidates the cached access checks for the new Program.
+    """
+
+    rights_cache.bumpGeneration(entity.key().id_or_name())
+
+    super(Logic, self)._onCreate(entity)
+
+  def _onUpdate(self, entity):
+    """Invalidates the cached access checks for the updated Program.
+    """
+
+    rights_cache.bumpGeneration(entity.key().id_or_name())
+
+    super(Logic, self)._onUpdate(entity)
+
+  def _onDelete(self, entity):
+    """Invalidates the cached access checks for the deleted Program.
+    """
+
+    rights_cache.bumpGeneration(entity.key().id_or_name())
+
+    super(Logic, self)._onDelete(entity)
+
 
 logic = Logic()
@@ -19,17 +19,35 @@
 
 __authors__ = [
   '"Lennard de Rijk" <ljvderijk@gmail.com>',
+  '"Sverre Rabbelier" <sverre@rabbelier.nl>',
   ]
 
 
+import hashlib
+import time
+
+from google.appengine.api.labs import taskqueue
+from google.appengine.ext import db
+
+from django.utils import simplejson
+
 from soc.logic.models import base
 from soc.logic.models import program as program_logic
 
 import soc.models.proposal_duplicates
 
 
+# number of organizations processed per batch when calculating duplicates
+DEF_ORG_BATCH_SIZE = 25
+
+# seconds during which refresh requests for an organization are coalesced
+DEF_REFRESH_DELAY = 30
+
+DEF_CALCULATE_TASK_URL = '/tasks/proposal_duplicates/calculate'
+
+
 class Logic(base.Logic):
-  """Logic methods for the Role model.
+  """Logic methods for the ProposalDuplicates model.
   """
 
   def __init__(self, model=soc.models.proposal_duplicates.ProposalDuplicates,
@@ -40,4 +58,318 @@ class Logic(base.Logic):
     super(Logic, self).__init__(model, base_model=base_model,
                                 scope_logic=scope_logic)
 
+  def getKeyNameForProgram(self, program_key_name, program_link_id=None):
+    """Returns the key name of the ProposalDuplicates for a program.
+
+    Args:
+      program_key_name: key name of the Program
+      program_link_id: link_id of the Program, derived from the key name
+          if not specified
+    """
+
+    if not program_link_id:
+      program_link_id = program_key_name.rsplit('/', 1)[-1]
+
+    return '%s/%s' % (program_key_name, program_link_id)
+
+  def getForProgram(self, program_entity):
+    """Returns the ProposalDuplicates for the given program or None.
+    """
+
+    return self.getFromKeyName(self.getKeyNameForProgram(
+        program_entity.key().id_or_name(), program_entity.link_id))
+
+  def getAssignedProposals(self, program_entity, org_entities,
+                           accepted_counts=None):
+    """Returns the StudentProposals that would be assigned a slot for each of
+    the given organizations.
+
+    The students and organization admins are retrieved in batch gets.
+
+    Args:
+      program_entity: the Program the organizations belong to
+      org_entities: list of Organization entities
+      accepted_counts: dictionary mapping Organization key names to the
+          number of already accepted proposals, see
+          student_proposal.Logic.getAcceptedCountsForProgram(), if not set
+          they are counted per organization
+
+    Returns:
+      Dictionary mapping Organization key names to a dictionary with the
+      organization details in 'org' and the proposals in 'proposals', or to
+      None if the organization has no proposals to accept.
+    """
+
+    from soc.logic.models.org_admin import logic as org_admin_logic
+    from soc.logic.models.student import logic as student_logic
+    from soc.logic.models.student_proposal import logic as proposal_logic
+    from soc.models.organization import Organization
+
+    proposals_by_org = {}
+    student_key_names = []
+
+    for org in org_entities:
+      org_key_name = org.key().id_or_name()
+
+      accepted = None
+      if accepted_counts is not None:
+        accepted = accepted_counts.get(org_key_name, 0)
+
+      proposals = proposal_logic.getProposalsToBeAcceptedForOrg(
+          org, step_size=program_entity.max_slots, accepted=accepted)
+
+      proposals_by_org[org_key_name] = proposals
+      student_key_names.extend(i.scope_path for i in proposals)
+
+    # the founder of an org is expected to be its first admin
+    admin_key_names = []
+    for org in org_entities:
+      founder_key = Organization.founder.get_value_for_datastore(org)
+      if founder_key:
+        admin_key_names.append('%s/%s' % (org.key().id_or_name(),
+                                          founder_key.id_or_name()))
+
+    student_logic.prefetch(student_key_names)
+    org_admins = org_admin_logic.prefetch(admin_key_names)
+    org_admins = dict((i.scope_path, i) for i in org_admins
+                      if i and i.status == 'active')
+
+    assignments = {}
+
+    for org in org_entities:
+      org_key_name = org.key().id_or_name()
+      proposals = proposals_by_org[org_key_name]
+
+      if not proposals:
+        # nothing to accept for this organization
+        assignments[org_key_name] = None
+        continue
+
+      org_data = {'name': org.name}
+
+      org_admin = org_admins.get(org_key_name)
+      if org_admin:
+        org_data['admin_name'] = org_admin.name()
+        org_data['admin_email'] = org_admin.email
+
+      proposals_data = []
+
+      for proposal in proposals:
+        student_entity = student_logic.getFromKeyName(proposal.scope_path)
+
+        proposals_data.append(
+            {'key_name': proposal.key().id_or_name(),
+             'proposal_title': proposal.title,
+             'student_key': proposal.scope_path,
+             'student_name': student_entity.name(),
+             'student_contact': student_entity.email,
+             'org_key': org_key_name,
+             })
+
+      assignments[org_key_name] = {'org': org_data,
+                                   'proposals': proposals_data}
+
+    return assignments
+
+  def buildRepresentation(self, assigned, in_progress=False):
+    """Builds the JSON representation stored in ProposalDuplicates.
+
+    Args:
+      assigned: dictionary mapping Organization key names to their
+          assignments, as returned by getAssignedProposals()
+      in_progress: whether a calculation of all organizations is running
+
+    Returns:
+      Dictionary with the organizations and the students that have more
+      than one proposal assigned in 'data', as used by the duplicates view,
+      the given assignments in 'assigned' and in_progress.
+    """
+
+    orgs = {}
+    students = {}
+
+    for org_key_name, assignment in assigned.iteritems():
+      orgs[org_key_name] = assignment['org']
+
+      for proposal in assignment['proposals']:
+        student = students.setdefault(proposal['student_key'], {
+            'name': proposal['student_name'],
+            'contact': proposal['student_contact'],
+            'proposals': [],
+            })
+
+        student['proposals'].append(
+            {'org_key': org_key_name,
+             'proposal_key': proposal['key_name'],
+             'proposal_title': proposal['proposal_title'],
+             })
+
+    duplicates = dict((k, v) for k, v in students.iteritems()
+                      if len(v['proposals']) > 1)
+
+    return {'data': {'orgs': orgs, 'students': duplicates},
+            'assigned': assigned,
+            'in_progress': in_progress}
+
+  def storeAssignments(self, program_entity, assignments, reset=False,
+                       in_progress=None):
+    """Merges the given assignments into the ProposalDuplicates of a program.
+
+    Args:
+      program_entity: the Program the assignments belong to
+      assignments: dictionary as returned by getAssignedProposals()
+      reset: if True all previously stored assignments are discarded, if
+          False and there is no ProposalDuplicates nothing is stored
+      in_progress: see buildRepresentation(), the stored value is kept
+          if not specified
+    """
+
+    program_key_name = program_entity.key().id_or_name()
+    key_name = self.getKeyNameForProgram(program_key_name,
+                                         program_entity.link_id)
+
+    def txn():
+      entity = self._model.get_by_key_name(key_name)
+
+      if entity and not reset:
+        stored = simplejson.loads(entity.json_representation)
+      elif reset:
+        stored = {}
+      else:
+        # no calculation has been started for this program
+        return None
+
+      assigned = stored.get('assigned', {})
+      running = stored.get('in_progress', False)
+
+      if in_progress is not None:
+        running = in_progress
+
+      for org_key_name, assignment in assignments.iteritems():
+        if assignment:
+          assigned[org_key_name] = assignment
+        else:
+          assigned.pop(org_key_name, None)
+
+      json = simplejson.dumps(self.buildRepresentation(assigned, running))
+
+      if not entity:
+        entity = self._model(key_name=key_name, link_id=program_entity.link_id,
+                             scope=program_entity,
+                             scope_path=program_key_name,
+                             json_representation=json)
+      else:
+        entity.json_representation = json
+
+      entity.put()
+      return entity
+
+    entity = db.run_in_transaction(txn)
+
+    if entity:
+      self._forget(entity)
+
+    return entity
+
+  def calculateBatch(self, program_entity, start_key=None,
+                     accepted_counts=None):
+    """Calculates the assignments for the next DEF_ORG_BATCH_SIZE
+    organizations of a program and stores them.
+
+    Args:
+      program_entity: the Program for which to calculate the assignments
+      start_key: key of the last organization of the previous batch,
+          if not set the calculation starts anew
+      accepted_counts: see getAssignedProposals()
+
+    Returns:
+      The key of the last organization in this batch, or None if all
+      organizations have been processed.
+    """
+
+    from soc.logic.models.organization import logic as org_logic
+
+    fields = {'scope': program_entity,
+              'status': 'active'}
+
+    orgs = org_logic.getForFields(fields, limit=DEF_ORG_BATCH_SIZE,
+                                  start_key=start_key)
+
+    with_slots = [i for i in orgs if i.slots > 0]
+    more = len(orgs) == DEF_ORG_BATCH_SIZE
+
+    assignments = self.getAssignedProposals(program_entity, with_slots,
+                                            accepted_counts=accepted_counts)
+    self.storeAssignments(program_entity, assignments,
+                          reset=not start_key, in_progress=more)
+
+    if not more:
+      return None
+
+    return orgs[-1].key()
+
+  def refreshOrgs(self, program_entity, org_key_names):
+    """Recalculates the assignments of the given organizations.
+
+    Nothing is done if the duplicates have never been calculated for the
+    program.
+
+    Args:
+      program_entity: the Program the organizations belong to
+      org_key_names: list of Organization key names
+    """
+
+    from soc.logic.models.organization import logic as org_logic
+
+    if not self.getForProgram(program_entity):
+      return
+
+    orgs = [i for i in org_logic.prefetch(org_key_names) if i]
+    with_slots = [i for i in orgs if i.status == 'active' and i.slots > 0]
+
+    assignments = dict((i, None) for i in org_key_names)
+    assignments.update(self.getAssignedProposals(program_entity, with_slots))
+
+    self.storeAssignments(program_entity, assignments)
+
+  def startCalculation(self, program_entity):
+    """Starts a task calculating all duplicates for the given program.
+    """
+
+    task_params = {'program_key': program_entity.key().id_or_name()}
+
+    new_task = taskqueue.Task(params=task_params, url=DEF_CALCULATE_TASK_URL)
+    new_task.add()
+
+  def scheduleRefresh(self, program_key_name, org_key_name):
+    """Schedules the recalculation of the assignments of an organization.
+
+    All requests made within one DEF_REFRESH_DELAY window share the same
+    named task, which runs at least DEF_REFRESH_DELAY seconds later so
+    that the change that triggered it has been stored.
+
+    Args:
+      program_key_name: key name of the Program
+      org_key_name: key name of the Organization
+    """
+
+    now = time.time()
+    window = int(now / DEF_REFRESH_DELAY)
+
+    task_name = 'duplicates-%s-%d' % (
+        hashlib.md5(org_key_name).hexdigest(), window)
+    task_params = {'program_key': program_key_name,
+                   'org_key': org_key_name}
+
+    new_task = taskqueue.Task(name=task_name, params=task_params,
+                              url=DEF_CALCULATE_TASK_URL,
+                              countdown=(window + 2) * DEF_REFRESH_DELAY - now)
+
+    try:
+      new_task.add()
+    except (taskqueue.TaskAlreadyExistsError, taskqueue.TombstonedTaskError):
+      # another change in this window already scheduled the task
+      pass
+
+
 logic = Logic()
@@ -21,15 +21,28 @@ __authors__ = [
   '"Lennard de Rijk" <ljvderijk@gmail.com>',
   ]
 
-from google.appengine.api import datastore
+import hashlib
+import logging
+import time
+
+from google.appengine.api.labs import taskqueue
+from google.appengine.ext import db
 
 from ranklist.ranker import Ranker
 
 from soc.logic.models import base
 
+import soc.cache.ranker
 import soc.models.ranker_root
 
 
+# number of PendingScores that are applied in a single SetScores transaction
+DEF_BATCH_SIZE = 100
+
+# seconds during which score changes are collected before they are applied
+DEF_APPLY_DELAY = 10
+
+
 class Logic(base.Logic):
   """Logic methods for the RankerRoot model.
   """
@@ -67,6 +80,8 @@ class Logic(base.Logic):
     key_name = self.getKeyNameFromFields(fields)
     self.updateOrCreateFromKeyName(fields, key_name)
 
+    soc.cache.ranker.flush(fields['scope_path'], name)
+
   def getRootFromEntity(self, entity):
     """Returns a Ranker object created from a RankerRoot entity.
 
@@ -74,7 +89,143 @@ class Logic(base.Logic):
       entity: A RankerRoot entity which the root should be retrieved of
     """
 
-    return Ranker(datastore.Get(entity.key())['root'])
+    root = self._model.root.get_value_for_datastore(entity)
+    return Ranker(root)
+
+  @soc.cache.ranker.cache
+  def getRanker(self, scope_path, link_id):
+    """Returns the Ranker for the RankerRoot with the given key fields.
+
+    The Ranker is cached, a RankerRoot does not change after it is created.
+
+    Args:
+      scope_path: the scope path of the RankerRoot
+      link_id: the link id of the RankerRoot
+
+    Returns:
+      The Ranker or None if there is no such RankerRoot
+    """
+
+    fields = {'scope_path': scope_path,
+              'link_id': link_id}
+
+    key_name = self.getKeyNameFromFields(fields)
+    entity = self.getFromKeyName(key_name)
+
+    if not entity:
+      return None
+
+    return self.getRootFromEntity(entity)
+
+  def bufferScores(self, scope_path, link_id, scores):
+    """Stores score changes to be applied to a Ranker later on.
+
+    The scores are stored as PendingScores and a task is scheduled that
+    applies all scores buffered for the Ranker in one transaction, so
+    that concurrent score changes do not contend on its entity group.
+
+    Args:
+      scope_path: the scope path of the RankerRoot
+      link_id: the link id of the RankerRoot
+      scores: A dict mapping score names to scores (integer lists), a score
+          of None removes it from the Ranker
+    """
+
+    fields = {'scope_path': scope_path,
+              'link_id': link_id}
+
+    ranker_key = self.getKeyNameFromFields(fields)
+
+    pending = []
+
+    for name, value in scores.iteritems():
+      key_name = '%s/%s' % (ranker_key, name)
+      pending.append(soc.models.ranker_root.PendingScore(key_name=key_name,
+          ranker_root=ranker_key, name=name, value=value or []))
+
+    db.put(pending)
+
+    self._scheduleApply(ranker_key)
+
+  def _scheduleApply(self, ranker_key):
+    """Schedules the task applying the PendingScores for a Ranker.
+
+    All changes made within one DEF_APPLY_DELAY window share the same
+    named task which runs after the window has passed.
+
+    Args:
+      ranker_key: the key name of the RankerRoot
+    """
+
+    now = time.time()
+    window = int(now / DEF_APPLY_DELAY) + 1
+
+    task_name = 'ranker-%s-%d' % (
+        hashlib.md5(ranker_key).hexdigest(), window)
+    task_params = {'ranker_key': ranker_key}
+    task_url = '/tasks/ranker/apply'
+
+    new_task = taskqueue.Task(name=task_name, params=task_params,
+                              url=task_url,
+                              countdown=window * DEF_APPLY_DELAY - now)
+
+    try:
+      new_task.add()
+    except (taskqueue.TaskAlreadyExistsError, taskqueue.TombstonedTaskError):
+      # another change in this window already scheduled the task
+      pass
+
+  def applyPendingScores(self, ranker_key):
+    """Applies a batch of PendingScores to the Ranker in one transaction.
+
+    The PendingScores of a RankerRoot that no longer exists are deleted.
+
+    Args:
+      ranker_key: the key name of the RankerRoot
+
+    Returns:
+      True iff there may be PendingScores left to apply
+    """
+
+    entity = self.getFromKeyName(ranker_key)
+
+    if not entity:
+      query = soc.models.ranker_root.PendingScore.all(keys_only=True)
+      query.filter('ranker_root', ranker_key)
+      orphans = query.fetch(DEF_BATCH_SIZE)
+
+      if orphans:
+        logging.warning("Deleting %d PendingScores of missing RankerRoot %s"
+                        % (len(orphans), ranker_key))
+        db.delete(orphans)
+
+      return len(orphans) == DEF_BATCH_SIZE
+
+    ranker = self.getRanker(entity.scope_path, entity.link_id)
+
+    query = soc.models.ranker_root.PendingScore.all()
+    query.filter('ranker_root', ranker_key)
+    pending = query.fetch(DEF_BATCH_SIZE)
+
+    if not pending:
+      return False
+
+    scores = dict((i.name, i.value or None) for i in pending)
+    ranker.SetScores(scores)
+
+    def deleteIfApplied(key, value):
+      """Deletes the PendingScore unless it changed since it was read.
+      """
+
+      pending_score = db.get(key)
+      if pending_score and pending_score.value == value:
+        pending_score.delete()
+
+    for pending_score in pending:
+      db.run_in_transaction(deleteIfApplied, pending_score.key(),
+                            pending_score.value)
+
+    return len(pending) == DEF_BATCH_SIZE
 
 
 logic = Logic()
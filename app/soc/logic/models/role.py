@@ -23,6 +23,8 @@ __authors__ = [
   ]
 
 
+from soc.cache import request_scope
+from soc.cache import rights as rights_cache
 from soc.cache import sidebar
 from soc.logic.models import base
 
@@ -48,6 +50,60 @@ def registerRoleLogic(role_logic):
   ROLE_LOGICS[name] = role_logic
 
 
+def getRoleIndex(user_entity, role_logics=None):
+  """Returns the roles of the specified user, regardless of their status.
+
+  The roles are retrieved with one query per kind of role the first time
+  they are needed and kept for the rest of the request.
+
+  Args:
+    user_entity: the User whose roles should be returned
+    role_logics: Role Logics whose roles should be present, defaults to
+        all registered Role Logics
+
+  Returns:
+    A dictionary mapping the kind of each role model to a list with the
+    roles of that kind, for at least the kinds of role_logics.
+  """
+
+  if role_logics is None:
+    role_logics = [i for i in ROLE_LOGICS.values() if i.role_name]
+
+  key = str(user_entity.key())
+  index = request_scope.get('role_index', key)
+
+  if index is None:
+    index = {}
+    request_scope.put('role_index', key, index)
+
+  for role_logic in role_logics:
+    kind = role_logic.getModel().kind()
+
+    if kind not in index:
+      index[kind] = role_logic.getForFields({'user': user_entity})
+
+  return index
+
+
+def forgetRoleIndex(role_entity):
+  """Drops the role index of the user of the specified role.
+  """
+
+  user_key = role_entity.__class__.user.get_value_for_datastore(role_entity)
+  request_scope.delete('role_index', str(user_key))
+
+
+def flushRights(role_entity):
+  """Invalidates the cached access checks that depend on the specified role.
+
+  These are the checks of its user and the checks for its scope.
+  """
+
+  forgetRoleIndex(role_entity)
+  rights_cache.flush(role_entity.user.account)
+  rights_cache.bumpGeneration(role_entity.scope_path)
+
+
 class Logic(base.Logic):
   """Logic methods for the Role model.
   """
@@ -113,8 +169,28 @@ class Logic(base.Logic):
     if entity.status == 'active':
       sidebar.flush(entity.user.account)
 
+    flushRights(entity)
+
     super(Logic, self)._onCreate(entity)
 
+  def _onUpdate(self, entity):
+    """Invalidates the role index and the cached access checks of the user
+    of the updated role.
+    """
+
+    flushRights(entity)
+
+    super(Logic, self)._onUpdate(entity)
+
+  def _onDelete(self, entity):
+    """Invalidates the role index and the cached access checks of the user
+    of the deleted role.
+    """
+
+    flushRights(entity)
+
+    super(Logic, self)._onDelete(entity)
+
   def canResign(self, entity):
     """Checks if the current entity is allowed to be resigned.
 
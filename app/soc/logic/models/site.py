@@ -34,6 +34,8 @@ class Logic(presence_with_tos.Logic):
 
   DEF_SITE_LINK_ID = 'site'
 
+  ENTITY_CACHE_RETENTION = 5*60
+
   def __init__(self, model=soc.models.site.Site,
                base_model=soc.models.presence_with_tos.PresenceWithToS):
     """Defines the name, key_name and model for this entity.
@@ -44,5 +44,15 @@ class Logic(role.Logic):
                                 role_name=role_name,
                                 disallow_last_resign=disallow_last_resign)
 
+  def _onUpdate(self, entity):
+    """Updates the name and location of the Student on the organization maps.
+    """
+
+    from soc.logic.models.org_map import logic as org_map_logic
+
+    org_map_logic.updateForRole(entity, 'student')
+
+    super(Logic, self)._onUpdate(entity)
+
 
 logic = Logic()
@@ -27,6 +27,7 @@ from google.appengine.ext import db
 from soc.logic.models import base
 from soc.logic.models import organization as org_logic
 from soc.logic.models.news_feed import logic as newsfeed_logic
+from soc.logic.models.org_map import logic as org_map_logic
 
 import soc.models.linkable
 import soc.models.student_project
@@ -106,17 +107,23 @@ class Logic(base.Logic):
     # batch put the StudentProjects that need to be updated
     db.put(projects_to_update)
 
+    # failed projects should no longer appear on the organization maps
+    org_map_logic.updateForProjects(projects_to_update)
+
 
   def _onCreate(self, entity):
     receivers = [entity.scope]
     newsfeed_logic.addToFeed(entity, receivers, "created")
+    org_map_logic.updateForProjects([entity])
 
   def _onUpdate(self, entity):
     receivers = [entity.scope]
     newsfeed_logic.addToFeed(entity, receivers, "updated")
+    org_map_logic.updateForProjects([entity])
 
   def _onDelete(self, entity):
     receivers = [entity.scope]
     newsfeed_logic.addToFeed(entity, receivers, "deleted")
+    org_map_logic.removeProject(entity)
     
 logic = Logic()
@@ -56,15 +56,35 @@ class Logic(base.Logic):
 
     from soc.logic.models.ranker_root import logic as ranker_root_logic
 
-    fields = {'link_id': student_proposal.DEF_RANKER_NAME,
-        'scope': entity.org}
+    return ranker_root_logic.getRanker(self._getOrgKeyName(entity),
+                                       student_proposal.DEF_RANKER_NAME)
 
-    ranker_root = ranker_root_logic.getForFields(fields, unique=True)
-    ranker = ranker_root_logic.getRootFromEntity(ranker_root)
+  def setScoresFor(self, entity, scores):
+    """Buffers score changes for the ranker of the given Student Proposal.
 
-    return ranker
+    The scores are applied to the ranker in a single transaction by a task,
+    together with all other score changes for the same organization.
 
-  def getProposalsToBeAcceptedForOrg(self, org_entity, step_size=25):
+    Args:
+      entity: Student Proposal entity whose ranker should be updated
+      scores: A dict mapping Student Proposal key names to scores, a score
+          of None removes the Student Proposal from the ranker
+    """
+
+    from soc.logic.models.ranker_root import logic as ranker_root_logic
+
+    ranker_root_logic.bufferScores(self._getOrgKeyName(entity),
+                                   student_proposal.DEF_RANKER_NAME, scores)
+
+  def _getOrgKeyName(self, entity):
+    """Returns the key name of the organization of the given Student Proposal
+    without retrieving the organization itself.
+    """
+
+    return self._model.org.get_value_for_datastore(entity).id_or_name()
+
+  def getProposalsToBeAcceptedForOrg(self, org_entity, step_size=25,
+                                     accepted=None):
     """Returns all StudentProposals which will be accepted into the program
     for the given organization.
 
@@ -72,18 +92,22 @@ class Logic(base.Logic):
       org_entity: the Organization for which the proposals should be checked
       step_size: optional parameter to specify the amount of Student Proposals
                 that should be retrieved per roundtrip to the datastore
+      accepted: optional number of proposals already accepted for the
+                organization, counted in the datastore if not specified
 
     returns:
       List with all StudentProposal which will be accepted into the program
     """
 
-    # check if there are already slots taken by this org
-    fields = {'org': org_entity,
-              'status': 'accepted'}
+    if accepted is None:
+      # check if there are already slots taken by this org
+      fields = {'org': org_entity,
+                'status': 'accepted'}
 
-    query = self.getQueryForFields(fields)
+      query = self.getQueryForFields(fields)
+      accepted = query.count()
 
-    slots_left_to_assign = max(0, org_entity.slots - query.count())
+    slots_left_to_assign = max(0, org_entity.slots - accepted)
 
     if slots_left_to_assign == 0:
       # no slots left so return nothing
@@ -97,8 +121,11 @@ class Logic(base.Logic):
     query = self.getQueryForFields(
         fields, order=order)
 
+    # check for a mentor without retrieving the mentor itself
+    has_mentor = self._model.mentor.get_value_for_datastore
+
     proposals = query.fetch(slots_left_to_assign)
-    proposals = [i for i in proposals if i.mentor]
+    proposals = [i for i in proposals if has_mentor(i)]
 
     offset = slots_left_to_assign
 
@@ -111,19 +138,49 @@ class Logic(base.Logic):
         # we ran out of proposals`
         break
 
-      new_proposals = [i for i in new_proposals if i.mentor]
+      new_proposals = [i for i in new_proposals if has_mentor(i)]
       proposals += new_proposals
       offset += step_size
 
     # cut off any superfluous proposals
     return proposals[:slots_left_to_assign]
 
+  def getAcceptedCountsForProgram(self, program_entity, batch_size=100):
+    """Returns the number of accepted StudentProposals per organization.
+
+    params:
+      program_entity: the Program for which the proposals should be counted
+      batch_size: the amount of Student Proposals retrieved per roundtrip
+
+    returns:
+      Dictionary mapping Organization key names to the number of accepted
+      Student Proposals for that organization
+    """
+
+    fields = {'program': program_entity,
+              'status': 'accepted'}
+
+    counts = {}
+    start_key = None
+
+    while True:
+      proposals = self.getForFields(fields, limit=batch_size,
+                                    start_key=start_key)
+
+      for proposal in proposals:
+        org_key_name = self._getOrgKeyName(proposal)
+        counts[org_key_name] = counts.get(org_key_name, 0) + 1
+
+      if len(proposals) < batch_size:
+        return counts
+
+      start_key = proposals[-1].key()
+
   def _onCreate(self, entity):
     """Adds this proposal to the organization ranker entity.
     """
 
-    ranker = self.getRankerFor(entity)
-    ranker.SetScore(entity.key().id_or_name(), [entity.score])
+    self.setScoresFor(entity, {entity.key().id_or_name(): [entity.score]})
 
     super(Logic, self)._onCreate(entity)
 
@@ -144,21 +201,47 @@ class Logic(base.Logic):
       entity_properties[name] = value
 
       # update the ranker
-      ranker = self.getRankerFor(entity)
-      ranker.SetScore(entity.key().id_or_name(), [value])
+      self.setScoresFor(entity, {entity.key().id_or_name(): [value]})
 
     if name == 'status':
 
       if value in ['invalid', 'rejected'] and entity.status != value:
         # the proposal is going into invalid or rejected state
         # remove the score from the ranker
-        ranker = self.getRankerFor(entity)
-
         # entries in the ranker can be removed by setting the score to None
-        ranker.SetScore(entity.key().id_or_name(), None)
+        self.setScoresFor(entity, {entity.key().id_or_name(): None})
+
+    if self._affectsAssignment(entity, name, value):
+      self._scheduleDuplicatesRefresh(entity)
 
     return super(Logic, self)._updateField(entity, entity_properties, name)
 
+  def _affectsAssignment(self, entity, name, value):
+    """Returns True iff setting the field changes which proposals would be
+    assigned a slot for the organization of the given Student Proposal.
+    """
+
+    if name in ['score', 'status']:
+      return getattr(entity, name) != value
+
+    if name == 'mentor':
+      current = self._model.mentor.get_value_for_datastore(entity)
+      new = value and value.key()
+      return current != new
+
+    return False
+
+  def _scheduleDuplicatesRefresh(self, entity):
+    """Schedules the refresh of the duplicate assignments for the
+    organization of the given Student Proposal.
+    """
+
+    from soc.logic.models.proposal_duplicates import logic as duplicates_logic
+
+    program_key = self._model.program.get_value_for_datastore(entity)
+    duplicates_logic.scheduleRefresh(program_key.id_or_name(),
+                                     self._getOrgKeyName(entity))
+
   def delete(self, entity):
     """Removes Ranker entry and all ReviewFollowers before deleting the entity.
 
@@ -169,8 +252,7 @@ class Logic(base.Logic):
     from soc.logic.models.review_follower import logic as review_follower_logic
 
     # entries in the ranker can be removed by setting the score to None
-    ranker = self.getRankerFor(entity)
-    ranker.SetScore(entity.key().id_or_name(), None)
+    self.setScoresFor(entity, {entity.key().id_or_name(): None})
 
     # get all the ReviewFollwers that have this entity as it's scope
     fields = {'scope': entity}
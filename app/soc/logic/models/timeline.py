@@ -22,6 +22,7 @@ __authors__ = [
   ]
 
 
+from soc.cache import rights as rights_cache
 from soc.logic.models import base
 from soc.logic.models import sponsor as sponsor_logic
 
@@ -31,6 +32,8 @@ class Logic(base.Logic):
   """Logic methods for the Timeline model.
   """
 
+  ENTITY_CACHE_RETENTION = 60
+
   def __init__(self, model=soc.models.timeline.Timeline,
                base_model=None, scope_logic=sponsor_logic):
     """Defines the name, key_name and model for this entity.
@@ -39,4 +42,32 @@ class Logic(base.Logic):
     super(Logic, self).__init__(model=model, base_model=base_model,
                                 scope_logic=scope_logic)
 
+  def _onCreate(self, entity):
+    """Invalidates the cached access checks for the Program of the new
+    Timeline, which shares its key name.
+    """
+
+    rights_cache.bumpGeneration(entity.key().id_or_name())
+
+    super(Logic, self)._onCreate(entity)
+
+  def _onUpdate(self, entity):
+    """Invalidates the cached access checks for the Program of the updated
+    Timeline, which shares its key name.
+    """
+
+    rights_cache.bumpGeneration(entity.key().id_or_name())
+
+    super(Logic, self)._onUpdate(entity)
+
+  def _onDelete(self, entity):
+    """Invalidates the cached access checks for the Program of the deleted
+    Timeline, which shares its key name.
+    """
+
+    rights_cache.bumpGeneration(entity.key().id_or_name())
+
+    super(Logic, self)._onDelete(entity)
+
+
 logic = Logic()
@@ -29,6 +29,7 @@ from soc.cache import sidebar
 from soc.logic import accounts
 from soc.logic.helper import notifications
 from soc.logic.models import base
+from soc.logic.models.former_account import logic as former_account_logic
 from soc.logic.models.site import logic as site_logic
 
 import soc.models.user
@@ -49,17 +50,7 @@ class Logic(base.Logic):
     """Returns true if account is a former account of some User.
     """
 
-    # TODO(pawel.solyga): replace 1000 with solution that works for any
-    #   number of queries
-    users_with_former_accounts = soc.models.user.User.gql(
-        'WHERE former_accounts != :1', None).fetch(1000)
-
-    for former_account_user in users_with_former_accounts: 
-      for former_account in former_account_user.former_accounts:
-        if str(account) == str(former_account):
-          return True
-
-    return False
+    return former_account_logic.isFormerAccount(account)
 
   def getForCurrentAccount(self):
     """Retrieves the user entity for the currently logged in account.
@@ -217,7 +208,7 @@ class Logic(base.Logic):
     """Special case logic for account.
 
     When the account is changed, the former_accounts field should be appended
-    with the old account.
+    with the old account, which is also stored in the FormerAccount index.
     Also, if either is_developer or agrees_to_tos change, the user's
     rights have changed, so we need to flush the sidebar.
     Make sure once the user agreed ToS, the ToS fields can't be changed.
@@ -247,6 +238,7 @@ class Logic(base.Logic):
 
       if entity.account != value:
         entity.former_accounts.append(entity.account)
+        former_account_logic.addFormerAccount(entity, entity.account)
 
     return True
   
@@ -0,0 +1,75 @@
+#!/usr/bin/python2.5
+#
+# Copyright 2009 the Melange authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""This module contains the CSVExport Model."""
+
+__authors__ = [
+  '"Sverre Rabbelier" <sverre@rabbelier.nl>',
+]
+
+
+from google.appengine.ext import db
+
+from soc.models import base
+
+
+class CSVExport(base.ModelWithFieldAttributes):
+  """The CSVExport model.
+
+  A CSVExport is built in batches by the tasks in soc.tasks.csv_export,
+  the resulting file is stored in CSVExportChunk entities that have the
+  CSVExport as their parent.
+  """
+
+  #: the name of the file that is offered for download
+  filename = db.StringProperty(required=True)
+
+  #: the name of the module that defines the logic for the exported entities
+  logic_module = db.StringProperty(required=True)
+
+  #: the pickled filter that the exported entities should satisfy
+  filter = db.BlobProperty()
+
+  #: the fields that are exported, in column order
+  key_order = db.StringListProperty(required=True)
+
+  #: field storing the status of this export
+  #: Running means that the export is still being built.
+  #: Completed means that all entities have been exported.
+  status = db.StringProperty(default='running',
+      choices=['running', 'completed'])
+
+  #: the key of the last entity that has been exported
+  last_key = db.StringProperty(default='')
+
+  #: the amount of CSVExportChunks that have been stored
+  chunks = db.IntegerProperty(default=0)
+
+  #: the date this export was created on
+  created_on = db.DateTimeProperty(auto_now_add=True)
+
+  #: the date this export was last modified on
+  last_modified_on = db.DateTimeProperty(auto_now=True)
+
+
+class CSVExportChunk(db.Model):
+  """The CSVExportChunk model.
+
+  Holds a consecutive part of the rows of the parent CSVExport.
+  """
+
+  #: the csv data for this chunk
+  data = db.TextProperty(default='')
@@ -0,0 +1,53 @@
+#!/usr/bin/python2.5
+#
+# Copyright 2009 the Melange authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""This module contains the FormerAccount Model."""
+
+__authors__ = [
+  '"Sverre Rabbelier" <sverre@rabbelier.nl>',
+]
+
+
+from google.appengine.ext import db
+
+import soc.models.user
+
+
+class FormerAccount(db.Model):
+  """A Google Account that was once associated with a User.
+
+  The key name is the normalized email address of the account, so that
+  finding out whether an account is a former account takes a single get.
+  """
+
+  #: the former account, normalized
+  account = db.UserProperty(required=True)
+
+  #: the User that the account used to belong to
+  user = db.ReferenceProperty(reference_class=soc.models.user.User,
+                              required=True,
+                              collection_name='former_account_entries')
+
+
+class FormerAccountIndex(db.Model):
+  """Records that the FormerAccounts of all Users have been stored.
+
+  Until it exists, accounts that were changed before FormerAccounts were
+  introduced may not have been indexed yet.
+  """
+
+  #: the date the indexing completed
+  completed_on = db.DateTimeProperty(auto_now_add=True)
@@ -51,6 +51,10 @@ class Job(base.ModelWithFieldAttributes):
   #: the date this job was last modified on
   last_modified_on = db.DateTimeProperty(auto_now=True)
 
+  #: the date after which a started job is considered abandoned by its
+  #: worker and may be reclaimed
+  lease_expires = db.DateTimeProperty(required=False)
+
   #: the amount of times this job raised an Exception (other than a
   #: DeadlineExceededError).
   errors = db.IntegerProperty(default=0)
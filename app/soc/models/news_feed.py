@@ -56,3 +56,17 @@ class FeedItem(base.ModelWithFieldAttributes):
   #: date when the feed item was created
   created = db.DateTimeProperty(auto_now_add=True)
 
+
+class FeedTimeline(db.Model):
+  """The FeedItems that appear in the feed of one receiver, newest first.
+
+  The key name is the key of the receiver. The timeline is appended to
+  when a FeedItem is created, so that reading a feed does not require a
+  query.
+  """
+
+  #: keys of the most recent FeedItems for the receiver
+  items = db.ListProperty(db.Key)
+
+  #: date when the timeline was last modified
+  modified = db.DateTimeProperty(auto_now=True)
@@ -0,0 +1,40 @@
+#!/usr/bin/python2.5
+#
+# Copyright 2009 the Melange authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""This module contains the OrgMap Model."""
+
+__authors__ = [
+  '"Sverre Rabbelier" <sverre@rabbelier.nl>',
+]
+
+
+from google.appengine.ext import db
+
+
+class OrgMap(db.Model):
+  """The data for the map on the home page of an Organization.
+
+  The key name is the key name of the Organization. The data is updated
+  when the StudentProjects of the Organization or the locations of their
+  Students and Mentors change, so that showing the map does not require
+  any queries.
+  """
+
+  #: JSON representation of the people and projects shown on the map
+  map_data = db.TextProperty(default='{}')
+
+  #: date when the map data was last modified
+  modified = db.DateTimeProperty(auto_now=True)
@@ -0,0 +1,55 @@
+#!/usr/bin/python2.5
+#
+# Copyright 2009 the Melange authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""This module contains the OutboxMessage Model."""
+
+__authors__ = [
+  '"Sverre Rabbelier" <sverre@rabbelier.nl>',
+]
+
+
+from google.appengine.ext import db
+
+from soc.models import base
+
+
+class OutboxMessage(base.ModelWithFieldAttributes):
+  """The OutboxMessage model.
+
+  An OutboxMessage holds an email that has been queued by the
+  mail_dispatcher, it is sent and deleted by the tasks in soc.tasks.mail.
+  """
+
+  #: the pickled context that the EmailMessage is constructed from
+  context = db.BlobProperty(required=True)
+
+  #: field storing the status of this message
+  #: Pending means that the message still has to be sent.
+  #: Failed means that sending the message has been given up on.
+  status = db.StringProperty(default='pending',
+      choices=['pending', 'failed'])
+
+  #: the amount of times sending this message has failed
+  attempts = db.IntegerProperty(default=0)
+
+  #: the date before which this message should not be sent (again)
+  next_attempt = db.DateTimeProperty(auto_now_add=True)
+
+  #: the error of the last failed attempt
+  last_error = db.TextProperty(default='')
+
+  #: the date this message was queued on
+  created_on = db.DateTimeProperty(auto_now_add=True)
@@ -34,3 +34,21 @@ class RankerRoot(soc.models.linkable.Linkable):
 
   #: A required reference property to the root of the RankList tree
   root = db.ReferenceProperty(required=True, collection_name='roots')
+
+
+class PendingScore(db.Model):
+  """A score that has been set but not yet been applied to a Ranker.
+
+  The key name is the key name of the RankerRoot followed by the name of
+  the score, so that repeated changes to one score overwrite each other
+  instead of piling up.
+  """
+
+  #: key name of the RankerRoot the score belongs to
+  ranker_root = db.StringProperty(required=True)
+
+  #: name of the score within the Ranker
+  name = db.StringProperty(required=True)
+
+  #: the new score, an empty list removes the score from the Ranker
+  value = db.ListProperty(int)
@@ -42,6 +42,7 @@ from soc.logic.models.program import logic as program_logic
 from soc.logic.models.organization import logic as org_logic
 from soc.logic.models.student_project import logic as project_logic
 
+from soc.cache import entity as entity_cache
 from soc.logic import accounts
 from soc.logic import dicts
 from soc.models import student_proposal
@@ -71,6 +72,15 @@ class Error(Exception):
   pass
 
 
+def flushEntityCache(entities):
+  """Drops the entities that are written directly from the entity cache.
+  """
+
+  for entity in entities:
+    if isinstance(entity, (Program, Site, Timeline)):
+      entity_cache.flush(entity.__class__, entity.key().name())
+
+
 def ensureUser():
   """Returns the current user account and associated user object.
   """
@@ -609,6 +619,9 @@ def seed(request, *args, **kwargs):
 
   site.home = home_document
   site.put()
+
+  flushEntityCache([site, gsoc2009_timeline, gsoc2009, ghop2009_timeline,
+                    ghop2009])
   # pylint: disable-msg=E1101
   #memcache.flush_all()
 
@@ -1113,6 +1126,7 @@ def clear(*args, **kwargs):
   try:
     for entity in entities:
       entity.delete()
+      flushEntityCache([entity])
   except db.Timeout:
     return http.HttpResponseRedirect('#')
   # pylint: disable-msg=E1101
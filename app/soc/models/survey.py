@@ -27,6 +27,8 @@ __authors__ = [
 ]
 
 
+import compiler
+
 from google.appengine.ext import db
 
 from django.utils.translation import ugettext
@@ -36,6 +38,78 @@ import soc.models.work
 
 COMMENT_PREFIX = 'comment_for_'
 
+#: maximum number of parsed schemas kept in memory by this instance
+DEF_MAX_CACHED_SCHEMAS = 100
+
+#: names that may appear as values in a stored schema
+DEF_SCHEMA_NAMES = {'True': True, 'False': False, 'None': None}
+
+# pylint: disable-msg=C0103
+#: parsed schemas by SurveyContent version, see getParsedSchema
+_schema_cache = {}
+
+
+class SchemaError(Exception):
+  """Raised when a stored schema is not a plain literal.
+  """
+
+  pass
+
+
+def _literalValue(node):
+  """Returns the value of a literal compiler.ast node.
+
+  Raises:
+    SchemaError if the node is not a constant, name from DEF_SCHEMA_NAMES,
+    negated number or a dict/list/tuple of those.
+  """
+
+  if isinstance(node, compiler.ast.Const):
+    return node.value
+  if isinstance(node, compiler.ast.Name) and node.name in DEF_SCHEMA_NAMES:
+    return DEF_SCHEMA_NAMES[node.name]
+  if isinstance(node, compiler.ast.UnarySub):
+    value = _literalValue(node.expr)
+    if isinstance(value, (int, long, float)):
+      return -value
+  if isinstance(node, compiler.ast.Dict):
+    return dict((_literalValue(k), _literalValue(v)) for k, v in node.items)
+  if isinstance(node, compiler.ast.List):
+    return [_literalValue(i) for i in node.nodes]
+  if isinstance(node, compiler.ast.Tuple):
+    return tuple(_literalValue(i) for i in node.nodes)
+
+  raise SchemaError('Unsupported expression in schema: %r' % node)
+
+
+def parseSchema(schema):
+  """Parses the textual representation of a schema without evaluating it.
+
+  Args:
+    schema: the string stored in SurveyContent.schema
+
+  Returns:
+    The schema as a dictionary, empty if no schema is set.
+
+  Raises:
+    SchemaError if the schema is not a dictionary literal.
+  """
+
+  if not schema:
+    return {}
+
+  try:
+    tree = compiler.parse(schema.strip(), 'eval')
+  except SyntaxError, error:
+    raise SchemaError('Invalid schema: %s' % error)
+
+  value = _literalValue(tree.node)
+
+  if not isinstance(value, dict):
+    raise SchemaError('Schema is not a dictionary: %r' % schema)
+
+  return value
+
 
 class SurveyContent(db.Expando):
   """Fields (questions) and schema representation of a Survey.
@@ -58,11 +132,24 @@ class SurveyContent(db.Expando):
   created = db.DateTimeProperty(auto_now_add=True)
   modified = db.DateTimeProperty(auto_now=True)
 
-  def getSurveyOrder(self):
-    """Make survey questions always appear in the same (creation) order.
+  def getParsedSchema(self):
+    """Returns a (schema, survey_order) tuple for this version of the entity.
+
+    The schema is parsed only once per SurveyContent version, identified by
+    its key, modified date and schema text, and shared by everyone using that
+    version. The returned values must therefore not be modified.
     """
+
+    version = None
+    if self.is_saved():
+      version = (str(self.key()), self.modified, hash(self.schema))
+      parsed = _schema_cache.get(version)
+      if parsed:
+        return parsed
+
+    schema = parseSchema(self.schema)
+
     survey_order = {}
-    schema = eval(self.schema)
     for property in self.dynamic_properties():
       # map out the order of the survey fields
       index = schema[property]["index"]
@@ -71,13 +158,33 @@ class SurveyContent(db.Expando):
       else:
         # Handle duplicated indexes
         survey_order[max(survey_order) + 1] = property
-    return survey_order
+
+    parsed = (schema, survey_order)
+
+    if version:
+      if len(_schema_cache) >= DEF_MAX_CACHED_SCHEMAS:
+        _schema_cache.clear()
+      _schema_cache[version] = parsed
+
+    return parsed
+
+  def getSchema(self):
+    """Returns the parsed schema, which must not be modified.
+    """
+
+    return self.getParsedSchema()[0]
+
+  def getSurveyOrder(self):
+    """Make survey questions always appear in the same (creation) order.
+    """
+
+    return self.getParsedSchema()[1].copy()
 
   def orderedProperties(self):
     """Helper for View.get_fields(), keep field order.
     """
     properties = []
-    survey_order = self.getSurveyOrder().items()
+    survey_order = self.getParsedSchema()[1].items()
     for position,key in survey_order:
       properties.insert(position, key)
     return properties
@@ -28,6 +28,7 @@ from google.appengine.ext import db
 
 from django.utils.translation import ugettext
 
+from soc.cache import request_scope
 from soc.models.survey import Survey
 import soc.models.user
 
@@ -49,13 +50,33 @@ class BaseSurveyRecord(db.Expando):
   #: Date when this record was last modified.
   modified = db.DateTimeProperty(auto_now=True)
 
-  def getValues(self):
+  def getSurveyOrder(self):
+    """Returns the survey order of the SurveyContent this record belongs to.
+
+    The order is looked up once per survey per request, so listing many
+    records does not fetch the Survey and SurveyContent for each of them.
+    """
+
+    survey_key = BaseSurveyRecord.survey.get_value_for_datastore(self)
+    survey_order = request_scope.get('survey_order', survey_key)
+
+    if survey_order is None:
+      survey_order = self.survey.survey_content.getSurveyOrder()
+      request_scope.put('survey_order', survey_key, survey_order)
+
+    return survey_order
+
+  def getValues(self, survey_order=None):
     """Method to get dynamic property values for a survey record.
 
     Right now it gets all dynamic values, but it could also be confined to
     the SurveyContent entity linked to the survey entity.
+
+    Args:
+      survey_order: the survey order to use, looked up if not set
     """
-    survey_order = self.survey.survey_content.getSurveyOrder()
+    if survey_order is None:
+      survey_order = self.getSurveyOrder()
     values = []
     for position, property in survey_order.items():
         values.insert(position, getattr(self, property, None))
@@ -21,11 +21,21 @@ __authors__ = [
   ]
 
 
+import re
+
 from django.conf.urls import defaults
+from django.core import urlresolvers
 
 import settings
 import soc.cache.sidebar
 
+from soc.views.sitemap import sidebar as sidebar_helper
+
+
+# sidebar skeletons built by this instance, by registered sidebar entries,
+# the Core itself is created anew for every request
+SIDEBAR_SKELETONS = {}
+
 
 class Error(Exception):
   """Error class for the callback module.
@@ -91,6 +101,84 @@ class NonUniqueService(Error):
     super(NonUniqueService, self).__init__(msg)
 
 
+class LazyView(object):
+  """A method of the view of a view module that is imported on first use.
+
+  Instances compare equal when they name the same method, so that they can
+  be used in the keys of SIDEBAR_SKELETONS across requests.
+  """
+
+  def __init__(self, module_name, method):
+    """Creates a reference to module_name.view.method.
+    """
+
+    self.module_name = module_name
+    self.method = method
+
+  def __call__(self, *args, **kwargs):
+    """Imports the view module and calls the method.
+    """
+
+    module = __import__(self.module_name, fromlist=[''])
+    return getattr(module.view, self.method)(*args, **kwargs)
+
+  def __eq__(self, other):
+    return isinstance(other, LazyView) and \
+        (self.module_name, self.method) == (other.module_name, other.method)
+
+  def __ne__(self, other):
+    return not self == other
+
+  def __hash__(self):
+    return hash((self.module_name, self.method))
+
+  def __repr__(self):
+    return '<LazyView %s.view.%s>' % (self.module_name, self.method)
+
+
+class LazyURLResolver(urlresolvers.RegexURLResolver):
+  """Resolver for the URL patterns of a single view module.
+
+  It only matches paths that start with one of the url names of the view,
+  the module is imported and its patterns are built the first time such
+  a path is resolved.
+  """
+
+  def __init__(self, module_name, url_names):
+    """Creates a resolver for the view of module_name.
+
+    Args:
+      module_name: the module that contains the view
+      url_names: the first path components of all the patterns of the
+        view, the empty string stands for the root of the site
+    """
+
+    prefixes = ['%s(/|$)' % re.escape(i) if i else '$' for i in url_names]
+    regex = '^(?=%s)' % '|'.join(prefixes)
+
+    super(LazyURLResolver, self).__init__(regex, module_name)
+
+    self._patterns = None
+
+  def _getURLConfModule(self):
+    return self
+
+  urlconf_module = property(_getURLConfModule)
+
+  def _getURLPatterns(self):
+    """Returns the patterns of the view, importing it if needed.
+    """
+
+    if self._patterns is None:
+      module = __import__(self.urlconf_name, fromlist=[''])
+      self._patterns = defaults.patterns(
+          None, *module.view.getDjangoURLPatterns())
+
+    return self._patterns
+
+  urlpatterns = property(_getURLPatterns)
+
+
 class Core(object):
   """The core handler that controls the Melange API.
   """
@@ -142,22 +230,84 @@ class Core(object):
     self.callService('registerWithSitemap', True)
     return defaults.patterns(None, *self.sitemap)
 
-  @soc.cache.sidebar.cache
+  def getSidebarSkeleton(self, rights=True):
+    """Returns the sidebar skeleton and its version.
+
+    The skeleton is built only once per instance, it is a list with the
+    menus of each registered sidebar entry, or None for entries that were
+    not registered with registerSidebarSkeletonEntry.
+
+    Args:
+      rights: if False, and this instance did not build the skeleton yet,
+        the skeleton is read from memcache without the 'rights' of its
+        menus, so that none of the views of the entries is imported
+    """
+
+    self.callService('registerWithSidebar', True)
+
+    entries = tuple(self.sidebar)
+
+    if entries in SIDEBAR_SKELETONS:
+      return SIDEBAR_SKELETONS[entries]
+
+    if not rights:
+      cached = soc.cache.sidebar.getSkeleton(entries)
+
+      if cached:
+        return cached
+
+    skeleton = []
+
+    for entry, is_skeleton in self.sidebar:
+      skeleton.append(entry() if is_skeleton else None)
+
+    menus = [j for i in skeleton if i for j in i]
+    version = sidebar_helper.getSkeletonVersion(menus)
+
+    SIDEBAR_SKELETONS[entries] = skeleton, version
+    soc.cache.sidebar.putSkeleton(entries, skeleton, version)
+
+    return skeleton, version
+
   def getSidebar(self, id, user):
     """Constructs a sidebar for the current user.
+
+    The skeleton menus are merged with the rights bitmap of the user, which
+    is only computed if it is not cached, the other entries are called
+    with the current user.
     """
 
-    self.callService('registerWithSidebar', True)
+    sidebar, memcache_key = soc.cache.sidebar.get(id)
+
+    if sidebar:
+      return sidebar
+
+    skeleton, version = self.getSidebarSkeleton(rights=False)
+
+    bitmap = soc.cache.sidebar.getRights(id, version)
+
+    if bitmap is None:
+      skeleton, version = self.getSidebarSkeleton()
+      menus = [j for i in skeleton if i for j in i]
+      bitmap = sidebar_helper.getRightsBitmap(id, user, menus)
+      soc.cache.sidebar.putRights(id, version, bitmap)
 
     sidebar = []
+    index = 0
+
+    for (entry, _), menus in zip(self.sidebar, skeleton):
+      if menus is None:
+        menus = entry(id, user)
+        sidebar.extend(menus if menus else [])
+        continue
 
-    for i in self.sidebar:
-      menus = i(id, user)
+      sidebar.extend(sidebar_helper.mergeSkeleton(menus, bitmap >> index))
+      index += sum(len(i['items']) for i in menus)
 
-      for menu in (menus if menus else []):
-        sidebar.append(menu)
+    sidebar = sorted(sidebar, key=lambda x: x.get('group'))
+    soc.cache.sidebar.put(sidebar, memcache_key)
 
-    return sorted(sidebar, key=lambda x: x.get('group'))
+    return sidebar
 
   def callService(self, service, unique, *args, **kwargs):
     """Calls the specified service on all callbacks.
@@ -244,8 +394,29 @@ class Core(object):
 
     self.sitemap.extend(entries)
 
+  def registerLazySitemapEntry(self, module_name, url_names):
+    """Registers the patterns of the view of module_name with the sitemap.
+
+    The view module is not imported until a path that starts with one of
+    url_names is requested, see LazyURLResolver.
+    """
+
+    self.sitemap.append(LazyURLResolver(module_name, url_names))
+
   def registerSidebarEntry(self, entry):
     """Registers the specified entry with the sidebar.
+
+    The entry is called with the current account and user every time the
+    sidebar is constructed.
+    """
+
+    self.sidebar.append((entry, False))
+
+  def registerSidebarSkeletonEntry(self, entry):
+    """Registers the specified entry with the sidebar skeleton.
+
+    The entry is called without arguments once, its menus are cached and
+    only the access checks for its items are done per user.
     """
 
-    self.sidebar.append(entry)
+    self.sidebar.append((entry, True))
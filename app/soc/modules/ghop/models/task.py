@@ -51,6 +51,14 @@ class TaskTag(Tag):
   def __key_name(cls, scope_path, tag_name):
     return scope_path + '/' + tag_name
 
+  @classmethod
+  def key_name_for(cls, scope, tag_name):
+    return cls.__key_name(scope.key().name(), tag_name)
+
+  @classmethod
+  def new_tag(cls, key_name, scope, tag_name):
+    return cls(key_name=key_name, tag=tag_name, scope=scope, counted=True)
+
   @classmethod
   def get_by_name(cls, tag_name):
     tags = db.Query(cls).filter('tag =', tag_name).fetch(1000)
@@ -64,7 +72,8 @@ class TaskTag(Tag):
     if existing_tag is None:
       # The tag does not yet exist, so create it.
       def create_tag_txn():
-        new_tag = cls(key_name=tag_key_name, tag=tag_name, scope=program)
+        new_tag = cls(key_name=tag_key_name, tag=tag_name, scope=program,
+                      counted=True)
         new_tag.put()
         return new_tag
       existing_tag = db.run_in_transaction(create_tag_txn)
@@ -21,39 +21,24 @@ __authors__ = [
   ]
 
 
+from soc.modules.core import LazyView
+from soc.tasks import csv_export as csv_export_tasks
+from soc.tasks import former_account as former_account_tasks
 from soc.tasks import grading_survey_group as grading_group_tasks
+from soc.tasks import job as job_tasks
 from soc.tasks import mail as mail_tasks
 from soc.tasks import news_feed as news_feed_tasks
+from soc.tasks import org_map as org_map_tasks
+from soc.tasks import proposal_duplicates as proposal_duplicates_tasks
+from soc.tasks import ranker as ranker_tasks
 from soc.tasks import surveys as survey_tasks
-from soc.views.models import club
-from soc.views.models import club_app
-from soc.views.models import club_admin
-from soc.views.models import club_member
-from soc.views.models import cron
-from soc.views.models import document
-from soc.views.models import grading_project_survey as grading_survey
-from soc.views.models import grading_survey_group
-from soc.views.models import host
-from soc.views.models import job
-from soc.views.models import mentor
+from soc.tasks import tags as tag_tasks
 from soc.views.helper import news_feed
-from soc.views.models import notification
-from soc.views.models import organization
-from soc.views.models import org_admin
-from soc.views.models import org_app
-from soc.views.models import priority_group
-from soc.views.models import program
-from soc.views.models import project_survey
-from soc.views.models import request
-from soc.views.models import site
-from soc.views.models import sponsor
-from soc.views.models import student
-from soc.views.models import student_project
-from soc.views.models import student_proposal
-from soc.views.models import survey
-from soc.views.models import timeline
-from soc.views.models import user
-from soc.views.models import user_self
+
+
+# the view modules are only imported once one of their pages is requested
+# or their sidebar menus are needed
+VIEWS = 'soc.views.models.%s'
 
 
 class Callback(object):
@@ -78,45 +63,57 @@ class Callback(object):
     self.core.requireUniqueService('registerWithSitemap')
 
     if self.enable_clubs:
-      self.core.registerSitemapEntry(club.view.getDjangoURLPatterns())
-      self.core.registerSitemapEntry(club_admin.view.getDjangoURLPatterns())
-      self.core.registerSitemapEntry(club_app.view.getDjangoURLPatterns())
-      self.core.registerSitemapEntry(club_member.view.getDjangoURLPatterns())
-
-    self.core.registerSitemapEntry(cron.view.getDjangoURLPatterns())
-    self.core.registerSitemapEntry(document.view.getDjangoURLPatterns())
-    self.core.registerSitemapEntry(grading_survey.view.getDjangoURLPatterns())
-    self.core.registerSitemapEntry(
-        grading_survey_group.view.getDjangoURLPatterns())
-    self.core.registerSitemapEntry(host.view.getDjangoURLPatterns())
-    self.core.registerSitemapEntry(job.view.getDjangoURLPatterns())
-    self.core.registerSitemapEntry(mentor.view.getDjangoURLPatterns())
-    self.core.registerSitemapEntry(notification.view.getDjangoURLPatterns())
-    self.core.registerSitemapEntry(organization.view.getDjangoURLPatterns())
-    self.core.registerSitemapEntry(org_admin.view.getDjangoURLPatterns())
-    self.core.registerSitemapEntry(org_app.view.getDjangoURLPatterns())
-    self.core.registerSitemapEntry(priority_group.view.getDjangoURLPatterns())
-    self.core.registerSitemapEntry(program.view.getDjangoURLPatterns())
-    self.core.registerSitemapEntry(project_survey.view.getDjangoURLPatterns())
-    self.core.registerSitemapEntry(request.view.getDjangoURLPatterns())
-    self.core.registerSitemapEntry(site.view.getDjangoURLPatterns())
-    self.core.registerSitemapEntry(sponsor.view.getDjangoURLPatterns())
-    self.core.registerSitemapEntry(student.view.getDjangoURLPatterns())
-    self.core.registerSitemapEntry(student_project.view.getDjangoURLPatterns())
-    self.core.registerSitemapEntry(student_proposal.view.getDjangoURLPatterns())
-    self.core.registerSitemapEntry(survey.view.getDjangoURLPatterns())
-    self.core.registerSitemapEntry(timeline.view.getDjangoURLPatterns())
-    self.core.registerSitemapEntry(user_self.view.getDjangoURLPatterns())
-    self.core.registerSitemapEntry(user.view.getDjangoURLPatterns())
+      for name in ['club', 'club_admin', 'club_app', 'club_member']:
+        self.core.registerLazySitemapEntry(VIEWS % name, [name])
+
+    lazy = [
+        ('cron', ['cron']),
+        ('document', ['document']),
+        ('grading_project_survey', ['grading_project_survey']),
+        ('grading_survey_group', ['grading_survey_group']),
+        ('host', ['host']),
+        ('job', ['job']),
+        ('mentor', ['mentor']),
+        ('notification', ['notification']),
+        ('organization', ['org']),
+        ('org_admin', ['org_admin']),
+        ('org_app', ['org_app']),
+        ('priority_group', ['priority_group']),
+        ('program', ['program']),
+        ('project_survey', ['project_survey']),
+        ('request', ['request']),
+        ('site', ['', 'site', 'seed_db', 'clear_db', 'reseed_db', 'seed_many',
+                  'new_seed_many']),
+        ('sponsor', ['sponsor']),
+        ('student', ['student']),
+        ('student_project', ['student_project']),
+        ('student_proposal', ['student_proposal']),
+        ('survey', ['survey']),
+        ('timeline', ['timeline']),
+        ('user_self', ['user']),
+        ('user', ['user']),
+        ]
+
+    for name, url_names in lazy:
+      self.core.registerLazySitemapEntry(VIEWS % name, url_names)
 
     # register ajax URLs
     self.core.registerSitemapEntry(news_feed.getDjangoURLPatterns())
     
     # register task URL's
+    self.core.registerSitemapEntry(csv_export_tasks.getDjangoURLPatterns())
+    self.core.registerSitemapEntry(
+        former_account_tasks.getDjangoURLPatterns())
     self.core.registerSitemapEntry(grading_group_tasks.getDjangoURLPatterns())
+    self.core.registerSitemapEntry(job_tasks.getDjangoURLPatterns())
     self.core.registerSitemapEntry(mail_tasks.getDjangoURLPatterns())
     self.core.registerSitemapEntry(news_feed_tasks.getDjangoURLPatterns())
+    self.core.registerSitemapEntry(org_map_tasks.getDjangoURLPatterns())
+    self.core.registerSitemapEntry(
+        proposal_duplicates_tasks.getDjangoURLPatterns())
+    self.core.registerSitemapEntry(ranker_tasks.getDjangoURLPatterns())
     self.core.registerSitemapEntry(survey_tasks.getDjangoURLPatterns())
+    self.core.registerSitemapEntry(tag_tasks.getDjangoURLPatterns())
 
   def registerWithSidebar(self):
     """Called by the server when sidebar entries should be registered.
@@ -124,28 +121,31 @@ class Callback(object):
 
     self.core.requireUniqueService('registerWithSidebar')
 
+    view = lambda name, method: LazyView(VIEWS % name, method)
+    skeleton = lambda name: view(name, 'getSidebarSkeleton')
+
     if self.enable_clubs:
-      self.core.registerSidebarEntry(club.view.getSidebarMenus)
-      self.core.registerSidebarEntry(club.view.getExtraMenus)
-      self.core.registerSidebarEntry(club_admin.view.getSidebarMenus)
-      self.core.registerSidebarEntry(club_member.view.getSidebarMenus)
-      self.core.registerSidebarEntry(club_app.view.getSidebarMenus)
-
-    self.core.registerSidebarEntry(user_self.view.getSidebarMenus)
-    self.core.registerSidebarEntry(site.view.getSidebarMenus)
-    self.core.registerSidebarEntry(user.view.getSidebarMenus)
-    self.core.registerSidebarEntry(sponsor.view.getSidebarMenus)
-    self.core.registerSidebarEntry(sponsor.view.getExtraMenus)
-    self.core.registerSidebarEntry(host.view.getSidebarMenus)
-    self.core.registerSidebarEntry(request.view.getSidebarMenus)
-    self.core.registerSidebarEntry(program.view.getSidebarMenus)
-    self.core.registerSidebarEntry(program.view.getExtraMenus)
-    self.core.registerSidebarEntry(student.view.getSidebarMenus)
-    self.core.registerSidebarEntry(student_project.view.getSidebarMenus)
-    self.core.registerSidebarEntry(student_proposal.view.getSidebarMenus)
-    self.core.registerSidebarEntry(organization.view.getSidebarMenus)
-    self.core.registerSidebarEntry(organization.view.getExtraMenus)
-    self.core.registerSidebarEntry(org_admin.view.getSidebarMenus)
-    self.core.registerSidebarEntry(mentor.view.getSidebarMenus)
-    self.core.registerSidebarEntry(org_app.view.getSidebarMenus)
-    self.core.registerSidebarEntry(grading_survey_group.view.getSidebarMenus)
+      self.core.registerSidebarSkeletonEntry(skeleton('club'))
+      self.core.registerSidebarEntry(view('club', 'getExtraMenus'))
+      self.core.registerSidebarSkeletonEntry(skeleton('club_admin'))
+      self.core.registerSidebarSkeletonEntry(skeleton('club_member'))
+      self.core.registerSidebarSkeletonEntry(skeleton('club_app'))
+
+    self.core.registerSidebarEntry(view('user_self', 'getSidebarMenus'))
+    self.core.registerSidebarEntry(view('site', 'getSidebarMenus'))
+    self.core.registerSidebarSkeletonEntry(skeleton('user'))
+    self.core.registerSidebarSkeletonEntry(skeleton('sponsor'))
+    self.core.registerSidebarEntry(view('sponsor', 'getExtraMenus'))
+    self.core.registerSidebarSkeletonEntry(skeleton('host'))
+    self.core.registerSidebarSkeletonEntry(skeleton('request'))
+    self.core.registerSidebarSkeletonEntry(skeleton('program'))
+    self.core.registerSidebarEntry(view('program', 'getExtraMenus'))
+    self.core.registerSidebarSkeletonEntry(skeleton('student'))
+    self.core.registerSidebarSkeletonEntry(skeleton('student_project'))
+    self.core.registerSidebarSkeletonEntry(skeleton('student_proposal'))
+    self.core.registerSidebarSkeletonEntry(skeleton('organization'))
+    self.core.registerSidebarEntry(view('organization', 'getExtraMenus'))
+    self.core.registerSidebarSkeletonEntry(skeleton('org_admin'))
+    self.core.registerSidebarSkeletonEntry(skeleton('mentor'))
+    self.core.registerSidebarSkeletonEntry(skeleton('org_app'))
+    self.core.registerSidebarSkeletonEntry(skeleton('grading_survey_group'))
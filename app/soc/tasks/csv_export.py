@@ -0,0 +1,97 @@
+#!/usr/bin/python2.5
+#
+# Copyright 2009 the Melange authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tasks related to building CSVExports.
+"""
+
+__authors__ = [
+  '"Sverre Rabbelier" <sverre@rabbelier.nl>',
+  ]
+
+
+import time
+
+from google.appengine.api.labs import taskqueue
+
+from django import http
+
+from soc.tasks.helper import error_handler
+
+
+# seconds a task may spend on building batches before it hands over to
+# a new task, well within the request deadline
+DEF_TIME_BUDGET = 15
+
+
+def getDjangoURLPatterns():
+  """Returns the URL patterns for the tasks in this module.
+  """
+
+  patterns = [(r'tasks/csv_export/build$',
+               'soc.tasks.csv_export.buildExport')]
+
+  return patterns
+
+
+def buildExport(request, *args, **kwargs):
+  """Builds the CSVExport in batches until it is completed.
+
+  When the time budget runs out a new task is spawned that continues
+  where this one stopped.
+
+  Expects the following to be present in the POST dict:
+    export_key: Specifies the CSVExport key name.
+
+  Args:
+    request: Django Request object
+  """
+
+  from soc.logic.models.csv_export import logic as csv_export_logic
+
+  post_dict = request.POST
+
+  export_key = post_dict.get('export_key')
+
+  if not export_key:
+    # invalid task data, log and return OK
+    return error_handler.logErrorAndReturnOK(
+        'Invalid buildExport data: %s' % post_dict)
+
+  export_entity = csv_export_logic.getFromKeyName(export_key)
+
+  if not export_entity:
+    # invalid CSVExport specified, log and return OK
+    return error_handler.logErrorAndReturnOK(
+        'Invalid CSVExport specified: %s' % export_key)
+
+  if export_entity.status == 'completed':
+    # the export has been completed by an earlier run of this task
+    return http.HttpResponse('OK')
+
+  start = time.time()
+
+  while csv_export_logic.buildBatch(export_key):
+    if time.time() - start > DEF_TIME_BUDGET:
+      # spawn new task continuing from the last exported entity
+      task_params = {'export_key': export_key}
+      task_url = '/tasks/csv_export/build'
+
+      new_task = taskqueue.Task(params=task_params, url=task_url)
+      new_task.add()
+      break
+
+  # task completed, return OK
+  return http.HttpResponse('OK')
@@ -0,0 +1,86 @@
+#!/usr/bin/python2.5
+#
+# Copyright 2009 the Melange authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tasks related to the index of former accounts.
+"""
+
+__authors__ = [
+  '"Sverre Rabbelier" <sverre@rabbelier.nl>',
+  ]
+
+
+import time
+
+from google.appengine.api.labs import taskqueue
+from google.appengine.ext import db
+
+from django import http
+
+
+# seconds a task may spend on indexing before it hands over to
+# a new task, well within the request deadline
+DEF_TIME_BUDGET = 15
+
+
+def getDjangoURLPatterns():
+  """Returns the URL patterns for the tasks in this module.
+  """
+
+  patterns = [(r'tasks/former_account/index$',
+               'soc.tasks.former_account.index')]
+
+  return patterns
+
+
+def index(request, *args, **kwargs):
+  """Stores the FormerAccounts of all existing Users in batches.
+
+  This builds the index for Users whose accounts changed before it was
+  maintained by the User logic. When the time budget runs out a new task
+  is spawned that continues where this one stopped.
+
+  Expects the following to be present in the POST dict:
+    start_key: optional, the key of the last User indexed.
+
+  Args:
+    request: Django Request object
+  """
+
+  from soc.logic.models.former_account import logic as former_account_logic
+
+  start_key = request.POST.get('start_key')
+  if start_key:
+    start_key = db.Key(start_key)
+
+  start = time.time()
+
+  while True:
+    start_key = former_account_logic.indexBatch(start_key=start_key)
+
+    if not start_key:
+      break
+
+    if time.time() - start > DEF_TIME_BUDGET:
+      # spawn new task continuing from the last indexed user
+      task_params = {'start_key': str(start_key)}
+      task_url = '/tasks/former_account/index'
+
+      new_task = taskqueue.Task(params=task_params, url=task_url)
+      new_task.add()
+      break
+
+  # task completed, return OK
+  return http.HttpResponse('OK')
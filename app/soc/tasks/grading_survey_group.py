@@ -24,6 +24,7 @@ __authors__ = [
 
 import datetime
 import logging
+import time
 
 from google.appengine.api.labs import taskqueue
 
@@ -35,6 +36,13 @@ from soc.tasks.helper import error_handler
 # batch size to use when going through StudentProjects
 DEF_BATCH_SIZE = 10
 
+# largest batch of StudentProjects to update GradingRecords for at once
+DEF_MAX_RECORDS_BATCH_SIZE = 500
+
+# seconds a task may spend on updating GradingRecords before it hands
+# over to a new task, well within the request deadline
+DEF_TIME_BUDGET = 20
+
 
 def getDjangoURLPatterns():
   """Returns the URL patterns for the tasks in this module.
@@ -106,34 +114,68 @@ def updateOrCreateRecordsForSurveyGroup(request, *args, **kwargs):
 
     fields['__key__ >'] = project_start.key()
 
-  # get the first batch_size number of StudentProjects
-  project_entities = student_project_logic.getForFields(fields,
-                                                        limit=DEF_BATCH_SIZE)
+  start = time.time()
+  batch_size = DEF_BATCH_SIZE
 
-  # update/create and batch put the new GradingRecords
-  grading_record_logic.updateOrCreateRecordsFor(survey_group_entity,
-                                                project_entities)
+  while True:
+    batch_start = time.time()
 
-  if len(project_entities) == DEF_BATCH_SIZE:
-    # spawn new task starting from the last
-    new_project_start = project_entities[DEF_BATCH_SIZE-1].key().id_or_name()
+    # get the next batch_size number of StudentProjects
+    project_entities = student_project_logic.getForFields(fields,
+                                                          limit=batch_size)
 
-    # pass along these params as POST to the new task
-    task_params = {'group_key': group_key,
-                   'project_key': new_project_start}
-    task_url = '/tasks/grading_survey_group/update_records'
+    # update/create and batch put the new GradingRecords
+    grading_record_logic.updateOrCreateRecordsFor(survey_group_entity,
+                                                  project_entities)
 
-    new_task = taskqueue.Task(params=task_params, url=task_url)
-    new_task.add()
-  else:
-    # task completed, update timestamp for last update complete
-    fields = {'last_update_complete': datetime.datetime.now()}
-    survey_group_logic.updateEntityProperties(survey_group_entity, fields)
+    if len(project_entities) < batch_size:
+      # task completed, update timestamp for last update complete
+      fields = {'last_update_complete': datetime.datetime.now()}
+      survey_group_logic.updateEntityProperties(survey_group_entity, fields)
+      break
+
+    fields['__key__ >'] = project_entities[-1].key()
+
+    # size the next batch to what fits within the remaining time budget
+    now = time.time()
+    per_project = (now - batch_start) / len(project_entities)
+    batch_size = getBatchSizeFor(DEF_TIME_BUDGET - (now - start), per_project)
+
+    if batch_size < DEF_BATCH_SIZE:
+      # spawn new task starting from the last
+      new_project_start = project_entities[-1].key().id_or_name()
+
+      # pass along these params as POST to the new task
+      task_params = {'group_key': group_key,
+                     'project_key': new_project_start}
+      task_url = '/tasks/grading_survey_group/update_records'
+
+      new_task = taskqueue.Task(params=task_params, url=task_url)
+      new_task.add()
+      break
 
   # task completed, return OK
   return http.HttpResponse('OK')
 
 
+def getBatchSizeFor(seconds_left, seconds_per_project):
+  """Returns how many StudentProjects can be processed in seconds_left.
+
+  Args:
+    seconds_left: the time left in the budget of the task
+    seconds_per_project: the time it took to process one StudentProject
+  """
+
+  if seconds_left <= 0:
+    return 0
+
+  if seconds_per_project <= 0:
+    return DEF_MAX_RECORDS_BATCH_SIZE
+
+  return min(int(seconds_left / seconds_per_project),
+             DEF_MAX_RECORDS_BATCH_SIZE)
+
+
 def updateProjectsForSurveyGroup(request, *args, **kwargs):
   """Updates each StudentProject for which a GradingRecord is found.
 
@@ -0,0 +1,75 @@
+#!/usr/bin/python2.5
+#
+# Copyright 2009 the Melange authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tasks related to running dispatched cron jobs.
+"""
+
+__authors__ = [
+  '"Sverre Rabbelier" <sverre@rabbelier.nl>',
+  ]
+
+
+from django import http
+
+from soc.tasks.helper import error_handler
+
+
+def getDjangoURLPatterns():
+  """Returns the URL patterns for the tasks in this module.
+  """
+
+  patterns = [(r'tasks/job/run$',
+               'soc.tasks.job.runJob')]
+
+  return patterns
+
+
+def runJob(request, *args, **kwargs):
+  """Handles a job that was dispatched by soc.cron.job.Handler.
+
+  When the job is done, the next waiting job of its PriorityGroup is
+  dispatched, so that each task keeps one chain of jobs going.
+
+  Expects the following to be present in the POST dict:
+    job_key: Specifies the key of the Job.
+
+  Args:
+    request: Django Request object
+  """
+
+  from soc.cron.job import handler
+  from soc.models.job import Job
+
+  post_dict = request.POST
+
+  job_key = post_dict.get('job_key')
+
+  if not job_key:
+    # invalid task data, log and return OK
+    return error_handler.logErrorAndReturnOK(
+        'Invalid runJob data: %s' % post_dict)
+
+  status = handler.handle(job_key)
+
+  job = Job.get(job_key)
+
+  if job and status is not handler.ALREADY_CLAIMED:
+    # keep this chain going with the next waiting job
+    priority_group = Job.priority_group.get_value_for_datastore(job)
+    handler.dispatchWaiting(priority_group, 1)
+
+  # task completed, return OK
+  return http.HttpResponse('OK')
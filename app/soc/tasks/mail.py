@@ -21,6 +21,7 @@ __authors__ = [
   ]
 
 import logging
+import time
 
 from django import http
 
@@ -30,20 +31,68 @@ from google.appengine.api.labs import taskqueue
 
 from soc.tasks.helper import error_handler
 
+
+# seconds a task may spend on sending batches before it hands over to
+# the next task, well within the request deadline
+DEF_TIME_BUDGET = 15
+
+
 def getDjangoURLPatterns():
   """Returns the URL patterns for the tasks in this module.
   """
 
   patterns = [(
       r'tasks/mail/sendmail$',
-      'soc.tasks.mail.sendMail')]
+      'soc.tasks.mail.sendMail'),
+              (
+      r'tasks/mail/send_outbox$',
+      'soc.tasks.mail.sendOutbox')]
 
   return patterns
 
 
+def sendOutbox(request, *args, **kwargs):
+  """Sends out batches of the messages in the outbox.
+
+  Batches are sent until none are due anymore or the time budget runs
+  out. The next task is scheduled right away in the latter case, otherwise
+  when the next pending message is due, which is after its backoff delay
+  or after the lease of a message that is being sent ends.
+
+  Args:
+    request: Django Request object
+  """
+
+  from soc.logic.models.outbox_message import logic as outbox_logic
+
+  start = time.time()
+
+  sent = 0
+  more = True
+
+  while more and time.time() - start < DEF_TIME_BUDGET:
+    batch_sent, more, next_delay = outbox_logic.sendBatch()
+    sent += batch_sent
+
+  elapsed = time.time() - start
+  logging.info('sent %d messages in %.2fs, outbox stats: %s' % (
+      sent, elapsed, outbox_logic.getStats()))
+
+  if more:
+    outbox_logic.scheduleSending()
+  elif next_delay is not None:
+    outbox_logic.scheduleSending(countdown=next_delay)
+
+  # task completed, return OK
+  return http.HttpResponse()
+
+
 def sendMail(request, *args, **kwargs):
   """Sends out an email using context to supply the needed information.
 
+  Only handles tasks that were queued before mail_dispatcher switched to
+  the outbox, new mail is sent by sendOutbox.
+
   Args:
     memcache_key (via request.POST):
         memcache key used to fetch context for the email message 
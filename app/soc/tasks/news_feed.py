@@ -26,6 +26,7 @@ import time
 import urllib
 
 from django import http
+from django.conf import settings
 
 from google.appengine.api import urlfetch
 from google.appengine.api.labs import taskqueue
@@ -46,6 +47,8 @@ from soc.views.helper.news_feed import NewsFeed, news_feed
 
 TASK_FEED_URL = 'tasks/news_feed/addtofeed'
 HUB_URL = 'http://pubsubhubbub.appspot.com/'
+# amount of feed URLs that are sent to the hub in one publish request
+HUB_URLS_PER_REQUEST = 100
 
 def getDjangoURLPatterns():
   """Returns the URL patterns for the tasks in this module.
@@ -145,47 +148,59 @@ def AddToFeedTask(request, *args, **kwargs):
   new_feed_item = news_feed_logic.updateOrCreateFromKeyName(
   feed_item_properties, feed_item_key)
 
+  # put the new item in front of each receiver's timeline
+  news_feed_logic.addToTimelines(new_feed_item, receivers)
 
   sender = db.get(sender_key)
   sendFeedItemEmailNotifications(sender, acting_user,
                                  update_type, payload, **kwargs)
 
-  # send update ping for each receiver's feed
-  receiver_entities = db.get(receivers)
-  for receiver in receiver_entities:
-    sendHubNotification(receiver)                  
+  # send one update ping for all receivers' feeds
+  receiver_entities = [i for i in db.get(receivers) if i]
+  sendHubNotifications(receiver_entities)
   # task completed, return OK
   return http.HttpResponse('OK')
 
 
-def sendHubNotification(receiver):
+def getHubUrl():
   """
-  Sends PubSubHubbub Ping to Third-Party Hub
+  Returns the URL of the PubSubHubbub hub, NEWS_FEED_HUB_URL in the
+  settings overrides the public hub, for example to use a local stand-in.
+  """
+  return getattr(settings, 'NEWS_FEED_HUB_URL', HUB_URL)
+
+
+def sendHubNotifications(receivers):
+  """
+  Sends PubSubHubbub Pings to Third-Party Hub
   
-  TODO (james): Since this method may be called multiple times, is there 
-  a way to batch the URLfetches for more efficiency?
+  The feed URLs of all receivers are published in as few requests as 
+  possible, each carrying up to HUB_URLS_PER_REQUEST hub.url values.
   
   Params:
-         receiver - the receiver entity with a newly updated feed
+         receivers - the receiver entities with a newly updated feed
   """
-  news_feed = NewsFeed(receiver)
-  # resolve the URL of the entity's ATOM feed
-  entity_feed_url = news_feed.getFeedUrl()
-  headers = {'content-type': 'application/x-www-form-urlencoded'}
-  post_params = {
-    'hub.mode': 'publish',
-    'hub.url': entity_feed_url,
-  }
-  payload = urllib.urlencode(post_params)
-  try:
-    # can these be sent in a batch?
-    response = urlfetch.fetch(HUB_URL, method='POST', payload=payload)
-  except urlfetch.Error:
-    logging.exception('Failed to deliver publishing message to %s', HUB_URL)
-  else:
-    logging.info('URL fetch status_code=%d, content="%s"',
-                 response.status_code, response.content)
-                   
+  hub_url = getHubUrl()
+  # resolve the URLs of the entities' ATOM feeds
+  feed_urls = [NewsFeed(receiver).getFeedUrl() for receiver in receivers]
+
+  for i in range(0, len(feed_urls), HUB_URLS_PER_REQUEST):
+    post_params = [('hub.mode', 'publish')]
+    post_params += [('hub.url', url) 
+                    for url in feed_urls[i:i+HUB_URLS_PER_REQUEST]]
+    payload = urllib.urlencode(post_params)
+    headers = {'content-type': 'application/x-www-form-urlencoded'}
+    try:
+      response = urlfetch.fetch(hub_url, method='POST', payload=payload,
+                                headers=headers)
+    except urlfetch.Error:
+      logging.exception('Failed to deliver publishing message to %s',
+                        hub_url)
+    else:
+      logging.info('URL fetch status_code=%d, content="%s"',
+                   response.status_code, response.content)
+
+
 def sendFeedItemEmailNotifications(entity, acting_user, update_type, 
   payload,  context = {}, **kwargs):
   """
@@ -227,6 +242,8 @@ def sendFeedItemEmailNotifications(entity, acting_user, update_type,
   site_entity = model_logic.site.logic.getSingleton()
   site_name = site_entity.site_name
    
+  messages = []
+
   for to_user in to_users:
     messageProperties = {
         # message configuration
@@ -243,8 +260,10 @@ def sendFeedItemEmailNotifications(entity, acting_user, update_type,
         'site_location': 'http://%s' % os.environ['HTTP_HOST']
         }
     logging.info(messageProperties)
-    # send out the message using the news_feed template
-    mail_dispatcher.sendMailFromTemplate(
-    'soc/mail/news_feed_notification.html', messageProperties)
+    messages.append(messageProperties)
+
+  # send out the messages using the news_feed template
+  mail_dispatcher.sendMailsFromTemplate(
+      'soc/mail/news_feed_notification.html', messages)
 
       
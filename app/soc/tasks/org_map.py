@@ -0,0 +1,124 @@
+#!/usr/bin/python2.5
+#
+# Copyright 2009 the Melange authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tasks related to rebuilding the Organization map data.
+"""
+
+__authors__ = [
+  '"Sverre Rabbelier" <sverre@rabbelier.nl>',
+  ]
+
+
+import time
+
+from google.appengine.api.labs import taskqueue
+from google.appengine.ext import db
+
+from django import http
+
+from soc.tasks.helper import error_handler
+
+
+# seconds a task may spend on rebuilding before it hands over to
+# a new task, well within the request deadline
+DEF_TIME_BUDGET = 15
+
+
+def getDjangoURLPatterns():
+  """Returns the URL patterns for the tasks in this module.
+  """
+
+  patterns = [(r'tasks/org_map/rebuild$',
+               'soc.tasks.org_map.rebuild')]
+
+  return patterns
+
+
+def rebuild(request, *args, **kwargs):
+  """Rebuilds the map data of one Organization, or of all Organizations in
+  a program in batches.
+
+  When the time budget runs out a new task is spawned that continues
+  where this one stopped.
+
+  Expects the following to be present in the POST dict:
+    org_key: Specifies the Organization key name, or
+    program_key: Specifies the Program key name.
+    start_key: optional, the key of the last Organization rebuilt.
+
+  Args:
+    request: Django Request object
+  """
+
+  from soc.logic.models.org_map import logic as org_map_logic
+  from soc.logic.models.organization import logic as org_logic
+  from soc.logic.models.program import logic as program_logic
+
+  post_dict = request.POST
+
+  org_key = post_dict.get('org_key')
+
+  if org_key:
+    org_entity = org_logic.getFromKeyName(org_key)
+
+    if not org_entity:
+      # invalid organization specified, log and return OK
+      return error_handler.logErrorAndReturnOK(
+          'Invalid organization specified: %s' % org_key)
+
+    org_map_logic.rebuildForOrg(org_entity)
+
+    # task completed, return OK
+    return http.HttpResponse('OK')
+
+  program_key = post_dict.get('program_key')
+
+  if not program_key:
+    # invalid task data, log and return OK
+    return error_handler.logErrorAndReturnOK(
+        'Invalid rebuild data: %s' % post_dict)
+
+  program_entity = program_logic.getFromKeyName(program_key)
+
+  if not program_entity:
+    # invalid program specified, log and return OK
+    return error_handler.logErrorAndReturnOK(
+        'Invalid program specified: %s' % program_key)
+
+  start_key = post_dict.get('start_key')
+  if start_key:
+    start_key = db.Key(start_key)
+
+  start = time.time()
+
+  while True:
+    start_key = org_map_logic.rebuildBatch(program_entity, start_key=start_key)
+
+    if not start_key:
+      break
+
+    if time.time() - start > DEF_TIME_BUDGET:
+      # spawn new task continuing from the last rebuilt organization
+      task_params = {'program_key': program_key,
+                     'start_key': str(start_key)}
+      task_url = '/tasks/org_map/rebuild'
+
+      new_task = taskqueue.Task(params=task_params, url=task_url)
+      new_task.add()
+      break
+
+  # task completed, return OK
+  return http.HttpResponse('OK')
@@ -0,0 +1,118 @@
+#!/usr/bin/python2.5
+#
+# Copyright 2009 the Melange authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tasks related to calculating the duplicate proposal assignments.
+"""
+
+__authors__ = [
+  '"Sverre Rabbelier" <sverre@rabbelier.nl>',
+  ]
+
+
+import time
+
+from google.appengine.api.labs import taskqueue
+from google.appengine.ext import db
+
+from django import http
+
+from soc.tasks.helper import error_handler
+
+
+# seconds a task may spend on calculating before it hands over to
+# a new task, well within the request deadline
+DEF_TIME_BUDGET = 15
+
+
+def getDjangoURLPatterns():
+  """Returns the URL patterns for the tasks in this module.
+  """
+
+  patterns = [(r'tasks/proposal_duplicates/calculate$',
+               'soc.tasks.proposal_duplicates.calculate')]
+
+  return patterns
+
+
+def calculate(request, *args, **kwargs):
+  """Calculates the proposals that would be assigned a slot for a program
+  and stores the students with more than one of those in ProposalDuplicates.
+
+  Either all organizations are processed in batches, spawning a new task
+  when the time budget runs out, or only the specified organization is.
+
+  Expects the following to be present in the POST dict:
+    program_key: Specifies the Program key name.
+    org_key: optional, only refresh the specified Organization.
+    start_key: optional, the key of the last Organization processed.
+
+  Args:
+    request: Django Request object
+  """
+
+  from soc.logic.models.program import logic as program_logic
+  from soc.logic.models.proposal_duplicates import logic as duplicates_logic
+  from soc.logic.models.student_proposal import logic as proposal_logic
+
+  post_dict = request.POST
+
+  program_key = post_dict.get('program_key')
+
+  if not program_key:
+    # invalid task data, log and return OK
+    return error_handler.logErrorAndReturnOK(
+        'Invalid calculate data: %s' % post_dict)
+
+  program_entity = program_logic.getFromKeyName(program_key)
+
+  if not program_entity:
+    # invalid program specified, log and return OK
+    return error_handler.logErrorAndReturnOK(
+        'Invalid program specified: %s' % program_key)
+
+  org_key = post_dict.get('org_key')
+
+  if org_key:
+    duplicates_logic.refreshOrgs(program_entity, [org_key])
+    return http.HttpResponse('OK')
+
+  start_key = post_dict.get('start_key')
+  if start_key:
+    start_key = db.Key(start_key)
+
+  start = time.time()
+
+  accepted_counts = proposal_logic.getAcceptedCountsForProgram(program_entity)
+
+  while True:
+    start_key = duplicates_logic.calculateBatch(
+        program_entity, start_key=start_key, accepted_counts=accepted_counts)
+
+    if not start_key:
+      break
+
+    if time.time() - start > DEF_TIME_BUDGET:
+      # spawn new task continuing from the last processed organization
+      task_params = {'program_key': program_key,
+                     'start_key': str(start_key)}
+      task_url = '/tasks/proposal_duplicates/calculate'
+
+      new_task = taskqueue.Task(params=task_params, url=task_url)
+      new_task.add()
+      break
+
+  # task completed, return OK
+  return http.HttpResponse('OK')
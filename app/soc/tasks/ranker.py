@@ -0,0 +1,86 @@
+#!/usr/bin/python2.5
+#
+# Copyright 2009 the Melange authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tasks related to applying buffered scores to Rankers.
+"""
+
+__authors__ = [
+  '"Sverre Rabbelier" <sverre@rabbelier.nl>',
+  ]
+
+
+import time
+
+from google.appengine.api.labs import taskqueue
+
+from django import http
+
+from soc.tasks.helper import error_handler
+
+
+# seconds a task may spend on applying scores before it hands over to
+# a new task, well within the request deadline
+DEF_TIME_BUDGET = 15
+
+
+def getDjangoURLPatterns():
+  """Returns the URL patterns for the tasks in this module.
+  """
+
+  patterns = [(r'tasks/ranker/apply$',
+               'soc.tasks.ranker.applyScores')]
+
+  return patterns
+
+
+def applyScores(request, *args, **kwargs):
+  """Applies the PendingScores for a Ranker in batches.
+
+  When the time budget runs out a new task is spawned that applies
+  the remaining PendingScores.
+
+  Expects the following to be present in the POST dict:
+    ranker_key: Specifies the RankerRoot key name.
+
+  Args:
+    request: Django Request object
+  """
+
+  from soc.logic.models.ranker_root import logic as ranker_root_logic
+
+  post_dict = request.POST
+
+  ranker_key = post_dict.get('ranker_key')
+
+  if not ranker_key:
+    # invalid task data, log and return OK
+    return error_handler.logErrorAndReturnOK(
+        'Invalid applyScores data: %s' % post_dict)
+
+  start = time.time()
+
+  while ranker_root_logic.applyPendingScores(ranker_key):
+    if time.time() - start > DEF_TIME_BUDGET:
+      # spawn new task applying the remaining scores
+      task_params = {'ranker_key': ranker_key}
+      task_url = '/tasks/ranker/apply'
+
+      new_task = taskqueue.Task(params=task_params, url=task_url)
+      new_task.add()
+      break
+
+  # task completed, return OK
+  return http.HttpResponse('OK')
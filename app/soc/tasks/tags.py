@@ -0,0 +1,119 @@
+#!/usr/bin/python2.5
+#
+# Copyright 2009 the Melange authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tasks related to migrating tags to TagMemberships.
+"""
+
+__authors__ = [
+  '"Sverre Rabbelier" <sverre@rabbelier.nl>',
+  ]
+
+
+import time
+
+from google.appengine.api.labs import taskqueue
+from google.appengine.ext import db
+
+from django import http
+
+from soc.tasks.helper import error_handler
+
+
+# seconds a task may spend on migrating before it hands over to
+# a new task, well within the request deadline
+DEF_TIME_BUDGET = 15
+
+# the kinds of the tags that are migrated when no tag_kind is specified
+DEF_TAG_KINDS = ['TaskTypeTag', 'TaskDifficultyTag']
+
+DEF_MIGRATE_TASK_URL = '/tasks/tags/migrate'
+
+
+def getDjangoURLPatterns():
+  """Returns the URL patterns for the tasks in this module.
+  """
+
+  patterns = [(r'tasks/tags/migrate$',
+               'soc.tasks.tags.migrate')]
+
+  return patterns
+
+
+def migrate(request, *args, **kwargs):
+  """Migrates the tags of one kind to TagMemberships in batches.
+
+  Tags that were applied before TagMemberships were introduced are only
+  listed in their tagged list, and their tagged_count is not kept in
+  TagCounterShards yet. When no tag_kind is specified a task is started
+  for each of DEF_TAG_KINDS. When the time budget runs out a new task is
+  spawned that continues where this one stopped.
+
+  Expects the following to be present in the POST dict:
+    tag_kind: optional, the kind of the tags to migrate.
+    start_key: optional, the key of the last tag migrated.
+
+  Args:
+    request: Django Request object
+  """
+
+  from taggable import taggable
+
+  # register the kinds of the GHOP tags
+  import soc.modules.ghop.models.task
+
+  post_dict = request.POST
+
+  tag_kind = post_dict.get('tag_kind')
+
+  if not tag_kind:
+    for tag_kind in DEF_TAG_KINDS:
+      new_task = taskqueue.Task(params={'tag_kind': tag_kind},
+                                url=DEF_MIGRATE_TASK_URL)
+      new_task.add()
+
+    # task completed, return OK
+    return http.HttpResponse('OK')
+
+  try:
+    tag_model = db.class_for_kind(tag_kind)
+  except db.KindError:
+    # invalid tag kind specified, log and return OK
+    return error_handler.logErrorAndReturnOK(
+        'Invalid tag kind specified: %s' % tag_kind)
+
+  start_key = post_dict.get('start_key')
+  if start_key:
+    start_key = db.Key(start_key)
+
+  start = time.time()
+
+  while True:
+    start_key = taggable.migrate_tags(tag_model, start_key=start_key)
+
+    if not start_key:
+      break
+
+    if time.time() - start > DEF_TIME_BUDGET:
+      # spawn new task continuing from the last migrated tag
+      task_params = {'tag_kind': tag_kind,
+                     'start_key': str(start_key)}
+
+      new_task = taskqueue.Task(params=task_params, url=DEF_MIGRATE_TASK_URL)
+      new_task.add()
+      break
+
+  # task completed, return OK
+  return http.HttpResponse('OK')
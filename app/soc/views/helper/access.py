@@ -31,10 +31,11 @@ __authors__ = [
   ]
 
 
-from google.appengine.api import memcache
+from google.appengine.ext import db
 
 from django.utils.translation import ugettext
 
+from soc.cache import rights as rights_cache
 from soc.logic import dicts
 from soc.logic import rights as rights_logic
 from soc.logic.helper import timeline as timeline_helper
@@ -46,6 +47,7 @@ from soc.logic.models.mentor import logic as mentor_logic
 from soc.logic.models.org_admin import logic as org_admin_logic
 from soc.logic.models.organization import logic as org_logic
 from soc.logic.models.program import logic as program_logic
+from soc.logic.models import role as role_module
 from soc.logic.models.request import logic as request_logic
 from soc.logic.models.role import logic as role_logic
 from soc.logic.models.site import logic as site_logic
@@ -244,6 +246,47 @@ def allowIfCheckPasses(checker_name):
 allowDeveloper = allowIfCheckPasses('checkIsDeveloper') 
 
 
+def _normalizeArg(arg):
+  """Returns a representation of a checker argument that is the same on
+  every instance, logics are represented by the kind of their model.
+  """
+
+  if isinstance(arg, (list, tuple)):
+    return [_normalizeArg(i) for i in arg]
+
+  if hasattr(arg, 'getModel'):
+    return arg.getModel().kind()
+
+  return unicode(arg)
+
+
+def _matchesFields(entity, fields):
+  """Returns whether the entity has the properties specified in fields.
+
+  Works like the filter of base.Logic.getForFields, list values match any
+  of their items and references are compared by key.
+  """
+
+  def normalize(value):
+    return value.key() if isinstance(value, db.Model) else value
+
+  for name, value in fields.iteritems():
+    prop = getattr(entity.__class__, name)
+
+    if isinstance(prop, db.ReferenceProperty):
+      actual = prop.get_value_for_datastore(entity)
+    else:
+      actual = getattr(entity, name)
+
+    if isinstance(value, list):
+      if actual not in [normalize(i) for i in value]:
+        return False
+    elif actual != normalize(value):
+      return False
+
+  return True
+
+
 class Checker(object):
   """
   The __setitem__() and __getitem__() methods are overloaded to DTRT
@@ -263,6 +306,34 @@ class Checker(object):
     'user_self': ('checkIsUserSelf', 'scope_path'),
     }
 
+  #: checks that are cached for every page view, their results only depend
+  # on the current user, its roles and the entities in the path of the
+  # scope_path and link_id, see getCacheKey
+  CACHEABLE_CHECKS = frozenset([
+      'checkGroupIsActiveForLinkId',
+      'checkGroupIsActiveForScopeAndLinkId',
+      'checkHasActiveRole',
+      'checkHasActiveRoleForKeyFieldsAsScope',
+      'checkHasActiveRoleForLinkId',
+      'checkHasActiveRoleForLinkIdAsScope',
+      'checkHasActiveRoleForScope',
+      'checkHasDocumentAccess',
+      'checkIsAllowedToManageRole',
+      'checkIsHost',
+      'checkIsHostForProgram',
+      'checkIsHostForProgramInScope',
+      'checkIsNotParticipatingInProgramInScope',
+      'checkIsNotStudentForProgramInScope',
+      'checkIsNotStudentForProgramOfOrg',
+      ])
+
+  #: the status codes cached for failed checks
+  EXCEPTION_CODES = {
+      out_of_band.AccessViolation: rights_cache.DENIED,
+      out_of_band.LoginRequest: rights_cache.LOGIN_REQUIRED,
+      out_of_band.Error: rights_cache.ERROR,
+      }
+
   #: the depths of various scopes to other scopes
   # the 0 entries are not used, and are for clarity purposes only
   SCOPE_DEPTH = {
@@ -310,29 +381,33 @@ class Checker(object):
 
     return [self.normalizeChecker(i) for i in self.rights.get(key, [])]
 
-  def key(self, checker_name):
-    """Returns the key for the specified checker for the current user.
-    """
+  def getRoleForFields(self, logic, fields):
+    """Returns the first entity that has the specified properties, like
+    logic.getForFields(fields, unique=True).
 
-    return "%s.%s" % (self.id, checker_name)
+    If fields selects roles of the current user they are looked up in the
+    role index of this request instead, see role.getRoleIndex, so that all
+    checks together only need one query per kind of role.
 
-  def put(self, checker_name, value):
-    """Puts the result for the specified checker in the cache.
+    Args:
+      logic: the logic that should be used to look up the entity
+      fields: a dict for the properties that the entity should have
     """
 
-    retention = 30
+    user = fields.get('user')
+    role_name = getattr(logic, 'role_name', None)
 
-    memcache_key = self.key(checker_name)
-    # pylint: disable-msg=E1101
-    memcache.add(memcache_key, value, retention)
+    if not (role_name and self.user and isinstance(user, db.Model) and
+            user.key() == self.user.key()):
+      return logic.getForFields(fields, unique=True)
 
-  def get(self, checker_name):
-    """Retrieves the result for the specified checker from cache.
-    """
+    index = role_module.getRoleIndex(self.user, [logic])
 
-    memcache_key = self.key(checker_name)
-    # pylint: disable-msg=E1101
-    return memcache.get(memcache_key)
+    for entity in index[logic.getModel().kind()]:
+      if _matchesFields(entity, fields):
+        return entity
+
+    return None
 
   def doCheck(self, checker_name, django_args, args):
     """Runs the specified checker with the specified arguments.
@@ -341,32 +416,77 @@ class Checker(object):
     checker = getattr(self, checker_name)
     checker(django_args, *args)
 
+  def getCacheKey(self, checker_name, django_args, args):
+    """Returns the rights cache key for the specified check, or None if
+    its result should not be cached.
+
+    The key depends on the current account and user, the checker and its
+    arguments, the string values in django_args and the generations of the
+    account and of all scopes in the path that scope_path and link_id
+    from django_args point to.
+    """
+
+    if 'seed' in django_args:
+      # checkSeeded modifies the django_args
+      return None
+
+    values = sorted((k, v) for k, v in django_args.iteritems()
+                    if isinstance(v, basestring))
+
+    path = [django_args.get('scope_path'), django_args.get('link_id')]
+    path = '/'.join(i for i in path if i)
+    parts = path.split('/') if path else []
+
+    scopes = [rights_cache.accountScope(self.id)]
+    scopes += ['/'.join(parts[:i + 1]) for i in range(len(parts))]
+
+    user_key = self.user.key().id_or_name() if self.user else None
+
+    return rights_cache.key([
+        self.id, user_key, checker_name, _normalizeArg(args), values,
+        bool(django_args.get('SIDEBAR_CALLING')),
+        rights_cache.getGenerations(scopes)])
+
   def doCachedCheck(self, checker_name, django_args, args):
     """Retrieves from cache or runs the specified checker.
+
+    Only a status code, and the message of a failed check, are cached.
+    Failures that carry a context or response arguments are not cached.
     """
 
-    cached = self.get(checker_name)
+    memcache_key = self.getCacheKey(checker_name, django_args, args)
+
+    if not memcache_key:
+      return self.doCheck(checker_name, django_args, args)
+
+    cached = rights_cache.get(memcache_key)
 
     if cached is None:
       try:
         self.doCheck(checker_name, django_args, args)
-        self.put(checker_name, True)
+        rights_cache.put(memcache_key, rights_cache.ALLOWED)
         return
       except out_of_band.Error, exception:
-        self.put(checker_name, exception)
+        code = self.EXCEPTION_CODES.get(exception.__class__)
+        if code and not (exception.context or exception.response_args):
+          rights_cache.put(memcache_key, code, exception.message_fmt)
         raise
 
-    if cached is True:
+    code, message_fmt = cached
+
+    if code == rights_cache.ALLOWED:
       return
 
-    # re-raise the cached exception
-    raise cached
+    for exception_class, exception_code in self.EXCEPTION_CODES.iteritems():
+      if code == exception_code:
+        raise exception_class(message_fmt=message_fmt)
 
   def check(self, use_cache, checker_name, django_args, args):
-    """Runs the checker, optionally using the cache.
+    """Runs the checker, using the cache if use_cache is set or if the
+    checker is in CACHEABLE_CHECKS.
     """
 
-    if use_cache:
+    if use_cache or checker_name in self.CACHEABLE_CHECKS:
       self.doCachedCheck(checker_name, django_args, args)
     else:
       self.doCheck(checker_name, django_args, args)
@@ -478,7 +598,7 @@ class Checker(object):
 
     for checker_name, args in checks:
       try:
-        self.doCheck(checker_name, django_args, args)
+        self.check(False, checker_name, django_args, args)
         # one check passed, all is well
         return
       except out_of_band.Error, exception:
@@ -696,7 +816,7 @@ class Checker(object):
     fields = dicts.filter(django_args, fields)
     fields['status'] = 'active'
 
-    entity = logic.getForFields(fields, unique=True)
+    entity = self.getRoleForFields(logic, fields)
 
     if entity:
       return entity
@@ -1183,7 +1303,7 @@ class Checker(object):
               'status': 'active'}
 
     # check if the current user is already a student for this program
-    student_role = student_logic.getForFields(filter, unique=True)
+    student_role = self.getRoleForFields(student_logic, filter)
 
     if student_role:
       raise out_of_band.AccessViolation(
@@ -1196,13 +1316,13 @@ class Checker(object):
               'program': program_entity,
               'status': 'active'}
 
-    mentor_role = mentor_logic.getForFields(filter, unique=True)
+    mentor_role = self.getRoleForFields(mentor_logic, filter)
     if mentor_role:
       # the current user has a role for the given program
       raise out_of_band.AccessViolation(
             message_fmt=DEF_ALREADY_PARTICIPATING_MSG)
 
-    org_admin_role = org_admin_logic.getForFields(filter, unique=True)
+    org_admin_role = self.getRoleForFields(org_admin_logic, filter)
     if org_admin_role:
       # the current user has a role for the given program
       raise out_of_band.AccessViolation(
@@ -1236,7 +1356,7 @@ class Checker(object):
               'status': 'active'}
 
     # check if the current user is already a student for this program
-    student_role = student_logic.getForFields(filter, unique=True)
+    student_role = self.getRoleForFields(student_logic, filter)
 
     if student_role:
       raise out_of_band.AccessViolation(
@@ -1266,7 +1386,7 @@ class Checker(object):
               'user': user_entity,
               'status': 'active'}
 
-    student_role = student_logic.getForFields(filter=filter, unique=True)
+    student_role = self.getRoleForFields(student_logic, filter)
 
     if student_role:
       raise out_of_band.AccessViolation(
@@ -1318,21 +1438,21 @@ class Checker(object):
       # check if the current user is a host for this proposal's program
       filter['scope'] =  proposal_entity.program
 
-      if host_logic.getForFields(filter, unique=True):
+      if self.getRoleForFields(host_logic, filter):
         return
 
     if 'org_admin' in allowed_roles:
       # check if the current user is an admin for this proposal's org
       filter['scope'] = proposal_entity.org
 
-      if org_admin_logic.getForFields(filter, unique=True):
+      if self.getRoleForFields(org_admin_logic, filter):
         return
 
     if 'mentor' in allowed_roles:
       # check if the current user is a mentor for this proposal's org
       filter['scope'] = proposal_entity.org
 
-      if mentor_logic.getForFields(filter, unique=True):
+      if self.getRoleForFields(mentor_logic, filter):
         return
 
     # no roles found, access denied
@@ -1769,7 +1889,7 @@ class Checker(object):
         fields = {'user': user_entity,
                   'scope': project_entity.scope,
                   'status': 'active'}
-        admin_entity = org_admin_logic.getForFields(fields, unique=True)
+        admin_entity = self.getRoleForFields(org_admin_logic, fields)
         if not admin_entity:
           # this user is no Org Admin or Mentor for this project
           raise out_of_band.AccessViolation(
@@ -1841,7 +1961,7 @@ class Checker(object):
     fields = {'user': user_entity,
               'scope': record_entity.org,
               'status': 'active'}
-    admin_entity = org_admin_logic.getForFields(fields, unique=True)
+    admin_entity = self.getRoleForFields(org_admin_logic, fields)
 
     if admin_entity:
       # this user is org admin for the retrieved record's project
@@ -23,6 +23,8 @@ __authors__ = [
   ]
 
 
+from google.appengine.ext import db
+
 from soc.logic import dicts
 from soc.logic.models.user import logic as user_logic
 
@@ -70,6 +72,35 @@ def makeLimitKey(limit_idx):
   return LIMIT_KEY % limit_idx
 
 
+def makeCursor(position, key, backwards=False):
+  """Returns an opaque cursor to be used as value for the offset GET arg.
+
+  Args:
+    position: the offset of the first item on the page the cursor points to
+    key: the key of the entity just before (or, if backwards is set, just
+      after) the page the cursor points to
+    backwards: iff True the page ends before key instead of starting after it
+  """
+
+  return '%s%d.%s' % ('-' if backwards else '', position, key)
+
+
+def parseCursor(cursor):
+  """Parses a cursor created by makeCursor.
+
+  Returns:
+    a (position, key, backwards) tuple or None if cursor is not valid
+  """
+
+  backwards = cursor.startswith('-')
+  position, _, key = cursor.lstrip('-').partition('.')
+
+  try:
+    return max(0, int(position)), db.Key(key), backwards
+  except (ValueError, db.BadArgumentError, db.BadKeyError):
+    return None
+
+
 def getListParameters(request, list_index):
   """Retrieves, converts and validates values for one list
 
@@ -79,7 +110,8 @@ def getListParameters(request, list_index):
        by an integer.)
 
   Returns:
-    a dictionary of str -> str.  field name -> field value.
+    a dictionary with the limit and offset for the list and, if the offset
+    GET arg contains a cursor, the start_key and backwards values from it.
   """
 
   offset = request.GET.get(makeOffsetKey(list_index))
@@ -91,11 +123,18 @@ def getListParameters(request, list_index):
   if limit is None:
     limit = ''
 
+  start_key = None
+  backwards = False
+
   try:
     offset = int(offset)
   except ValueError:
+    cursor = parseCursor(offset)
     offset = 0
 
+    if cursor:
+      offset, start_key, backwards = cursor
+
   try:
     limit = int(limit)
   except ValueError:
@@ -109,7 +148,8 @@ def getListParameters(request, list_index):
   else:
     limit = min(DEF_MAX_PAGINATION, limit)
 
-  return dict(limit=limit, offset=offset)
+  return dict(limit=limit, offset=offset, start_key=start_key,
+              backwards=backwards)
 
 
 def generateLinkFromGetArgs(request, offset_and_limits):
@@ -135,6 +175,80 @@ def generateLinkForRequest(request, base_params, updated_params):
   return generateLinkFromGetArgs(request, params)
 
 
+def _getOffsetPage(logic, filter, order, limit, offset):
+  """Retrieves a page of a list using the offset of its first item.
+
+  Returns:
+    a (data, offset, next_offset, prev_offset) tuple, where next_offset and
+    prev_offset are None if there is no next or previous page
+  """
+
+  # Fetch one more to see if there should be a 'next' link
+  data = logic.getForFields(filter=filter, limit=limit+1, offset=offset,
+                            order=order)
+
+  more = len(data) > limit
+
+  if more:
+    del data[limit:]
+
+  next_offset = (offset + limit) if more else None
+  prev_offset = max(0, offset-limit) if offset > 0 else None
+
+  return data, offset, next_offset, prev_offset
+
+
+def _getKeysetPage(logic, filter, limit, offset, start_key, backwards):
+  """Retrieves a page of a list that is ordered by key.
+
+  Instead of skipping offset entities the page is retrieved with a filter
+  on the key of the entity before (or after) it, so that the cost of a
+  page does not depend on how deep into the list it is.
+
+  Returns:
+    a (data, offset, next_cursor, prev_cursor) tuple, where next_cursor and
+    prev_cursor are None if there is no next or previous page
+  """
+
+  if backwards:
+    key_filter = dicts.merge({'__key__ <': start_key}, filter or {})
+    data = logic.getForFields(filter=key_filter, limit=limit+1,
+                              order=['-__key__'])
+    more_before = len(data) > limit
+    del data[limit:]
+    data.reverse()
+    more_after = True
+
+    if not more_before:
+      offset = 0
+
+    if not data:
+      # nothing before start_key (anymore), so start at the beginning
+      return _getKeysetPage(logic, filter, limit, 0, None, False)
+  else:
+    # start_key is None on the first page, or on pages requested by offset
+    data = logic.getForFields(filter=filter, limit=limit+1,
+                              offset=0 if start_key else offset,
+                              start_key=start_key)
+    more_after = len(data) > limit
+    del data[limit:]
+    more_before = bool(start_key or offset)
+
+  if not data:
+    return data, offset, None, (0 if more_before else None)
+
+  next_cursor = prev_cursor = None
+
+  if more_after:
+    next_cursor = makeCursor(offset + len(data), data[-1].key())
+
+  if more_before:
+    prev_cursor = makeCursor(max(0, offset - limit), data[0].key(),
+                             backwards=True)
+
+  return data, offset, next_cursor, prev_cursor
+
+
 def getListContent(request, params, filter=None, order=None,
                    idx=0, need_content=False):
   """Returns a dict with fields used for rendering lists.
@@ -144,6 +258,11 @@ def getListContent(request, params, filter=None, order=None,
     Meaning 1:  the underlying list, which may be very large.
     Meaning 2:  the returned list, which is at most 'limit' items.
 
+  Lists without an order of views with list_key_paging set are paged by
+  key, the 'next' and 'prev' links then contain a cursor (see makeCursor)
+  instead of a numeric offset. Each filter of such a list needs the
+  indexes listed in index.yaml.
+
   Args:
     request: the Django HTTP request object
     params: a dict with params for the View this list belongs to
@@ -157,6 +276,8 @@ def getListContent(request, params, filter=None, order=None,
 
     {
       'data': list data to be displayed
+      'filter': the filter for this list
+      'order': the order for this list
       'main': url to list main template
       'pagination': url to list pagination template
       'row': url to list row template
@@ -180,18 +301,21 @@ def getListContent(request, params, filter=None, order=None,
   pagination_form = makePaginationForm(request, list_params['limit'],
                                        limit_key)
 
-  # Fetch one more to see if there should be a 'next' link
-  data = logic.getForFields(filter=filter, limit=limit+1, offset=offset,
-                            order=order)
+  if order or not params.get('list_key_paging'):
+    # a cursor only makes sense for lists in key order
+    if list_params['start_key']:
+      offset = 0
+
+    data, offset, next_offset, prev_offset = _getOffsetPage(
+        logic, filter, order, limit, offset)
+  else:
+    data, offset, next_offset, prev_offset = _getKeysetPage(
+        logic, filter, limit, offset, list_params['start_key'],
+        list_params['backwards'])
 
   if need_content and not data:
     return None
 
-  more = len(data) > limit
-
-  if more:
-    del data[limit:]
-
   newest = next = prev = export_link = ''
 
   base_params = dict(i for i in request.GET.iteritems() if
@@ -200,16 +324,14 @@ def getListContent(request, params, filter=None, order=None,
   if params.get('list_key_order'):
     export_link = generateLinkForRequest(request, base_params, {'export': idx})
 
-  if more:
-    # TODO(dbentley): here we need to implement a new field "last_key"
+  if next_offset is not None:
     next = generateLinkForRequest(request, base_params, 
-                                  {offset_key: offset + limit,
+                                  {offset_key: next_offset,
                                    limit_key: limit})
 
-  if offset > 0:
-    # TODO(dbentley): here we need to implement previous in the good way.
+  if prev_offset is not None:
     prev = generateLinkForRequest(request, base_params,
-                                  {offset_key: max(0, offset-limit),
+                                  {offset_key: prev_offset,
                                    limit_key: limit})
 
   if offset > limit:
@@ -227,12 +349,14 @@ def getListContent(request, params, filter=None, order=None,
       'idx': idx,
       'data': data,
       'export': export_link,
+      'filter': filter,
       'first': offset+1,
       'last': len(data) > 1 and offset+len(data) or None,
       'logic': logic,
       'limit': limit,
       'newest': newest,
       'next': next,
+      'order': order,
       'pagination_form': pagination_form,
       'prev': prev,
       }
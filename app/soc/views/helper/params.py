@@ -280,6 +280,7 @@ def constructParams(params):
       }
 
   new_params['list_description'] = DEF_LIST_DESCRIPTION_FMT % params
+  new_params['list_key_paging'] = False
   new_params['no_lists_msg'] = ""
   new_params['save_message'] = [ugettext('%(name)s saved.' % params),
                                 ugettext('Cannot delete %(name)s.' % params)]
@@ -29,6 +29,7 @@ from google.appengine.api import users
 from django import http
 from django.template import loader
 
+from soc.cache import request_scope
 from soc.logic import accounts
 from soc.logic import system
 from soc.logic.helper import timeline
@@ -84,8 +85,50 @@ def respond(request, template, context=None, response_args=None,
   return http_response
 
 
+# request_scope namespace of the parts of the universal context that are
+# shared by all its callers during a request
+DEF_UNIVERSAL_CONTEXT_NAMESPACE = 'universal_context'
+
+
+class LazySidebar(object):
+  """Sequence of sidebar menu items that are built when first read.
+
+  Pages that do not render the sidebar, such as JSON and CSV exports,
+  never build it.
+  """
+
+  def __init__(self, account, user):
+    """Stores the account and user to build the sidebar for.
+    """
+
+    self._account = account
+    self._user = user
+    self._items = None
+
+  def _getItems(self):
+    """Returns the sidebar menu items, building them on the first call.
+    """
+
+    if self._items is None:
+      self._items = callback.getCore().getSidebar(self._account, self._user)
+
+    return self._items
+
+  def __iter__(self):
+    return iter(self._getItems())
+
+  def __len__(self):
+    return len(self._getItems())
+
+  def __getitem__(self, index):
+    return self._getItems()[index]
+
+
 def getUniversalContext(request):
   """Constructs a template context dict will many common variables defined.
+
+  The values that do not depend on the current user are computed once per
+  request and path, the sidebar is built when a template first reads it.
   
   Args:
     request: the Django HTTP request object
@@ -102,7 +145,7 @@ def getUniversalContext(request):
       'is_debug': True if system.isDebug() is True
       'sign_in': a Google Account login URL
       'sign_out': a Google Account logout URL
-      'sidebar_menu_html': an HTML string that renders the sidebar menu
+      'sidebar_menu_items': a LazySidebar that returns the sidebar menu
     }
   """
 
@@ -110,24 +153,40 @@ def getUniversalContext(request):
   user = None
   is_admin = False
 
-  context = {}
-  context['request'] = request
-
   if account:
+    # the unique query is memoized until a User is written
     user = user_logic.getForAccount(account)
     is_admin = user_logic.isDeveloper(account=account, user=user)
 
+  context = dict(_getRequestContext(request))
+  context['request'] = request
+
   context['account'] = account
   context['user'] = user
   context['is_admin'] = is_admin
 
+  context['sidebar_menu_items'] = _getLazySidebar(account, user)
+
+  return context
+
+
+def _getRequestContext(request):
+  """Returns the part of the universal context that is the same for all
+  users, computed once per request and path.
+  """
+
+  context = request_scope.get(DEF_UNIVERSAL_CONTEXT_NAMESPACE, request.path)
+
+  if context is not None:
+    return context
+
+  context = {}
+
   context['is_local'] = system.isLocal()
   context['is_debug'] = system.isDebug()
   context['sign_in'] = users.create_login_url(request.path)
   context['sign_out'] = users.create_logout_url(request.path)
 
-  context['sidebar_menu_items'] = callback.getCore().getSidebar(account, user)
-
   context['gae_version'] = system.getAppVersion()
   context['soc_release'] = system.getMelangeVersion()
 
@@ -139,9 +198,28 @@ def getUniversalContext(request):
   context['site_notice'] = settings.site_notice
   context['tos_link'] = redirects.getToSRedirect(settings)
   context['in_maintenance'] = timeline.isActivePeriod(site, 'maintenance')
- 
+
+  request_scope.put(DEF_UNIVERSAL_CONTEXT_NAMESPACE, request.path, context)
+
   return context
 
+
+def _getLazySidebar(account, user):
+  """Returns the LazySidebar for account and user, shared by all universal
+  contexts of the request.
+  """
+
+  user_key = user and str(user.key())
+  key = 'sidebar:%s:%s' % (account and account.email(), user_key)
+
+  sidebar = request_scope.get(DEF_UNIVERSAL_CONTEXT_NAMESPACE, key)
+
+  if sidebar is None:
+    sidebar = LazySidebar(account, user)
+    request_scope.put(DEF_UNIVERSAL_CONTEXT_NAMESPACE, key, sidebar)
+
+  return sidebar
+
 def useJavaScript(context, uses):
   """Updates the context for JavaScript usage.
   """
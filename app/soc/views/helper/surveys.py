@@ -45,10 +45,14 @@ from soc.logic import dicts
 from soc.logic.lists import Lists
 from soc.models.survey import COMMENT_PREFIX
 from soc.models.survey import SurveyContent
+from soc.models.survey import parseSchema
 from soc.views.helper import widgets as custom_widgets
 
 CHOICE_TYPES = set(('selection', 'pick_multi', 'choice', 'pick_quant'))
 
+# number of records fetched at a time when exporting survey results
+DEF_EXPORT_BATCH_SIZE = 100
+
 # TODO(ajaksu) add this to template
 REQUIRED_COMMENT_TPL = """
   <label for="required_for_{{ name }}">Required</label>
@@ -153,7 +157,7 @@ class SurveyTakeForm(djangoforms.ModelForm):
 
     schema = {}
     if self.survey_content:
-      schema = eval(self.survey_content.schema)
+      schema = self.survey_content.getSchema()
 
     for key, val in schema.items():
       if val['type'] == 'long_answer':
@@ -212,7 +216,7 @@ class SurveyTakeForm(djangoforms.ModelForm):
 
     post_dict = post_dict or {}
     self.survey_fields = {}
-    schema = SurveyContentSchema(self.survey_content.schema)
+    schema = SurveyContentSchema(self.survey_content.getSchema())
     attrs = {}
 
     # figure out whether we want a read-only view
@@ -543,7 +547,7 @@ class SurveyEditForm(djangoforms.ModelForm):
       return
 
     self.survey_fields = {}
-    schema = SurveyContentSchema(self.survey_content.schema)
+    schema = SurveyContentSchema(self.survey_content.getSchema())
     extra_attrs = {}
 
     # add unordered fields to self.survey_fields
@@ -593,10 +597,14 @@ class SurveyContentSchema(object):
     """Set the dictionary that this class encapsulates.
 
     Args:
-      schema: schema as stored in SurveyConent entity
+      schema: parsed schema as returned by SurveyContent.getSchema, or the
+        schema text as stored in the SurveyContent entity
     """
 
-    self.schema = eval(schema)
+    if isinstance(schema, basestring):
+      schema = parseSchema(schema)
+
+    self.schema = schema
 
   def getType(self, field):
     """Fetch question type for field e.g. short_answer, pick_multi, etc.
@@ -1036,16 +1044,24 @@ def getCSVHeader(survey_entity):
   return ''.join(fields).replace('\n', '\r\n')
 
 
-def getRecords(recs, props):
+def getRecords(recs, survey_order):
   """Fetch properties from SurveyRecords for CSV export.
+
+  The users that took the survey are fetched with a single batch get.
+
+  Args:
+    recs: list of SurveyRecord entities of the same survey
+    survey_order: the survey order of the survey the records belong to
   """
 
+  user_keys = [rec.__class__.user.get_value_for_datastore(rec) for rec in recs]
+  users = dict((user.key(), user) for user in db.get(user_keys) if user)
+
   records = []
-  props = props[1:]
-  for rec in recs:
-    values = tuple(getattr(rec, prop, None) for prop in props)
-    leading = (rec.user.link_id,)
-    records.append(leading + values)
+  for rec, user_key in zip(recs, user_keys):
+    user = users.get(user_key)
+    leading = (user.link_id if user else None, rec.created, rec.modified)
+    records.append(leading + tuple(rec.getValues(survey_order)))
   return records
 
 
@@ -1062,30 +1078,38 @@ def toCSV(survey_view):
     survey_logic = survey_view.getParams()['logic']
     record_logic = survey_logic.getRecordLogic()
 
-    # get header and properties
+    # get header and properties, the schema is looked up once per export
     header = getCSVHeader(survey)
+    survey_order = survey.survey_content.getSurveyOrder()
     leading = ['user', 'created', 'modified']
     properties = leading + survey.survey_content.orderedProperties()
 
-    # retrieve the query of the data to export
     fields = {'survey': survey}
-    record_query = record_logic.getQueryForFields(fields)
-
-    try:
-      first = record_query.run().next()
-    except StopIteration:
-      # bail out early if survey_records.run() is empty
+    output = None
+    writer = None
+    start_key = None
+
+    # write the records to CSV in batches ordered by key
+    while True:
+      recs = record_logic.getForFields(fields, limit=DEF_EXPORT_BATCH_SIZE,
+                                       start_key=start_key)
+      if not recs:
+        break
+
+      if not writer:
+        output = StringIO.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(properties)
+
+      writer.writerows(getRecords(recs, survey_order))
+
+      if len(recs) < DEF_EXPORT_BATCH_SIZE:
+        break
+      start_key = recs[-1].key()
+
+    if not writer:
+      # bail out early if there are no records for this survey
       return header, survey.link_id
 
-    # generate results list
-    recs = record_query.run()
-    recs = getRecords(recs, properties)
-
-    # write results to CSV
-    output = StringIO.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(properties)
-    writer.writerows(recs)
-
     return header + output.getvalue(), survey.link_id
   return wrapper
@@ -33,7 +33,9 @@ from django import http
 from django.utils import simplejson
 from django.utils.translation import ugettext
 
+from soc.logic import accounts
 from soc.logic import dicts
+from soc.logic.models.csv_export import logic as csv_export_logic
 from soc.views import helper
 from soc.views import out_of_band
 from soc.views.helper import decorators
@@ -68,6 +70,13 @@ class View(object):
   DEF_CREATE_INSTRUCTION_MSG_FMT = ugettext(
       'Please select a %s for the new %s.')
 
+  DEF_EXPORT_RUNNING_MSG = ugettext(
+      'The export is being prepared, please reload this page in a few'
+      ' minutes to download it.')
+
+  #: the maximum amount of entities that is exported during the request
+  DEF_MAX_STREAMED_EXPORT = 1000
+
   def __init__(self, params=None):
     """
 
@@ -534,7 +543,7 @@ class View(object):
     """Returns the list page for the specified contents.
 
     If the export parameter is present in request.GET a csv export of
-    the specified list is returned instead, see csv().
+    the specified list is returned instead, see _export().
 
     Args:
       request: the standard Django HTTP request object
@@ -565,10 +574,8 @@ class View(object):
       key_order = content.get('key_order')
 
       if key_order:
-        data = [i.toDict(key_order) for i in content['data']]
-
         filename = "export_%d" % export
-        return self.csv(request, data, filename, params, key_order)
+        return self._export(request, params, content, key_order, filename)
 
     context = dicts.merge(context,
         helper.responses.getUniversalContext(request))
@@ -767,42 +774,98 @@ class View(object):
 
     If key_order is set data should be a sequence of dicts, otherwise
     data should be a sequence of lists, see csv.writer and
-    csv.DictWriter for more information.
+    csv.DictWriter for more information. The data is written to the
+    response one row at a time, so it can be a generator.
     """
 
-    params = params.copy()
-    params['export_extension'] = '.csv'
-    params['export_content_type'] = 'text/csv'
-    # fieldnames = params['csv_fieldnames']
+    if key_order:
+      content = csv_export_logic.generateRows(data, key_order)
+    else:
+      content = self._generateCSVRows(data)
+
+    return self._csvResponse(content, filename)
+
+  def _generateCSVRows(self, data):
+    """Yields the csv formatted line for each list in data.
+    """
 
     file_handler = StringIO.StringIO()
+    writer = csv.writer(file_handler, dialect='excel')
 
-    if key_order:
-      writer = csv.DictWriter(file_handler, key_order, dialect='excel')
-      writer.writerow(dicts.identity(key_order))
-
-      # encode the data to UTF-8 to ensure compatibiliy
-      for row_dict in data:
-        for key in row_dict.keys():
-          value = row_dict[key]
-          if isinstance(value, basestring):
-            row_dict[key] = value.encode("utf-8")
-          else:
-            row_dict[key] = str(value)
-        writer.writerow(row_dict)
-    else:
-      writer = csv.writer(file_handler, dialect='excel')
+    # encode the data to UTF-8 to ensure compatibiliy
+    for row in data:
+      if row:
+        writer.writerow(row.encode("utf-8"))
+      else:
+        writer.writerow(row)
 
-      # encode the data to UTF-8 to ensure compatibiliy
-      for row in data:
-        if row:
-          writer.writerow(row.encode("utf-8"))
-        else:
-          writer.writerow(row)
+      yield file_handler.getvalue()
 
-    data = file_handler.getvalue()
+      file_handler.seek(0)
+      file_handler.truncate()
 
-    return self.download(request, data, filename, params)
+  def _csvResponse(self, content, filename):
+    """Returns a response that offers content as a csv file.
+
+    Args:
+      content: an iterable of strings that make up the file
+      filename: the name of the file without extension
+    """
+
+    response = http.HttpResponse(content, mimetype='text/csv')
+    response['Content-Disposition'] = 'attachment; filename=%s.csv' % (
+        filename)
+
+    return response
+
+  def _export(self, request, params, content, key_order, filename):
+    """Returns a csv export of the entities in the specified list content.
+
+    Lists with an explicit order are exported as displayed. Lists in key
+    order are exported completely: small ones are read in batches while
+    the response is written, larger ones are built in the background by
+    soc.tasks.csv_export and are offered for download once completed.
+
+    Args:
+      request: the standard Django HTTP request object
+      params: a dict with params for this View
+      content: the list content dict, see helper.lists.getListContent
+      key_order: the fields that are exported, in column order
+      filename: the name of the file without extension
+    """
+
+    if content.get('order'):
+      data = (i.toDict(key_order) for i in content['data'])
+      return self.csv(request, data, filename, params, key_order)
+
+    logic = content['logic']
+    filter = content.get('filter')
+
+    query = logic.getQueryForFields(filter=filter)
+
+    if query.count(self.DEF_MAX_STREAMED_EXPORT+1) <= \
+        self.DEF_MAX_STREAMED_EXPORT:
+      query_gen = lambda: logic.getQueryForFields(filter=filter)
+      data = (i.toDict(key_order) for i in logic.entityIterator(query_gen))
+      return self.csv(request, data, filename, params, key_order)
+
+    key_name = csv_export_logic.getKeyNameForList(
+        accounts.getCurrentAccount(), request.path, content['idx'])
+    export_entity = csv_export_logic.startExport(key_name, logic, filter,
+                                                 key_order, filename)
+
+    if export_entity.status == 'completed':
+      chunks = csv_export_logic.iterateChunks(export_entity)
+      return self._csvResponse(chunks, filename)
+
+    context = helper.responses.getUniversalContext(request)
+    helper.responses.useJavaScript(context, params['js_uses_all'])
+    context['page_name'] = ugettext('Export')
+    context['body_content'] = self.DEF_EXPORT_RUNNING_MSG
+
+    template = 'soc/base.html'
+
+    return helper.responses.respond(request, template, context)
 
   def _editPost(self, request, entity, fields):
     """Performs any required processing on the entity to post its edit page.
@@ -966,6 +1029,19 @@ class View(object):
 
     return sidebar.getSidebarMenus(id, user, params=params)
 
+  @decorators.merge_params
+  def getSidebarSkeleton(self, params=None):
+    """Returns the sidebar entry for this View without checking access.
+
+    Only Views that do not override getSidebarMenus should be registered
+    with the sidebar through this method, see Core.getSidebar.
+
+    Args:
+      params: a dict with params for this View
+    """
+
+    return sidebar.getSidebarSkeleton(params=params)
+
   @decorators.merge_params
   def getDjangoURLPatterns(self, params=None):
     """Retrieves a list of sidebar entries for this view
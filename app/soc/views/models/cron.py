@@ -22,7 +22,9 @@ __authors__ = [
   ]
 
 
-import random
+import datetime
+import logging
+import time
 
 from django import http
 
@@ -35,6 +37,13 @@ from soc.views.models import base
 import soc.cron.job
 
 
+# seconds a poke may spend on claiming jobs, well within the request deadline
+DEF_POKE_BUDGET = 20
+
+# the upper bound for counting the waiting jobs of a PriorityGroup
+DEF_QUEUE_DEPTH_LIMIT = 1000
+
+
 class View(base.View):
   """View methods for the Cron model.
   """
@@ -67,53 +76,116 @@ class View(base.View):
   def poke(self, request, access_type, page_name):
     """View called by the cron system that handles jobs.
 
+    Jobs are claimed from the PriorityGroups in order of priority until
+    DEF_POKE_BUDGET runs out, or dispatched to the task queue for the groups
+    listed in priority_group_logic.dispatched. Before that, started jobs of
+    which the lease has expired are put back in their queue.
+
     Args:
       request: the standard Django HTTP request object
       access_type : the name of the access type which should be checked
       page_name: the page name displayed in templates as page and header title
     """
 
+    start = time.time()
+
     order = ['-priority']
     query = priority_group_logic.getQueryForFields(order=order)
     groups = priority_group_logic.getAll(query)
     handler = soc.cron.job.handler
 
-    groups_touched = 0
-    jobs_completed = 0
+    metrics = []
+    out_of_time = False
 
     for group in groups:
-      groups_touched += 1
+      group_metrics = {
+          'group': group.link_id,
+          'claimed': 0,
+          'completed': 0,
+          'dispatched': 0,
+          'expired': self._reclaimExpiredJobs(group),
+          }
+      metrics.append(group_metrics)
 
       filter = {
           'priority_group': group,
           'status': 'waiting',
           }
 
-      queryGen = lambda: job_logic.getQueryForFields(filter=filter)
-      jobs = job_logic.entityIterator(queryGen, batch_size=10)
+      if group.link_id in priority_group_logic.dispatched:
+        # the jobs of this group run in tasks on the jobs queue
+        amount = priority_group_logic.dispatched[group.link_id]
+        group_metrics['dispatched'] = handler.dispatchWaiting(group, amount)
+        jobs = []
+      else:
+        queryGen = lambda: job_logic.getQueryForFields(filter=filter)
+        jobs = job_logic.entityIterator(queryGen, batch_size=10)
+
+      for job in jobs:
+        if out_of_time or time.time() - start > DEF_POKE_BUDGET:
+          out_of_time = True
+          break
 
-      retry_jobs = []
+        status = handler.handle(job.key())
 
-      for job in handler.iterate(jobs, retry_jobs):
-        if random.randint(0, 3) > 0:
-          retry_jobs.append(job)
+        if status is handler.ALREADY_CLAIMED:
           continue
 
-        job_key = job.key().id()
-        status = handler.handle(job_key)
+        group_metrics['claimed'] += 1
+
+        if status is handler.SUCCESS:
+          group_metrics['completed'] += 1
 
         if status is handler.OUT_OF_TIME:
+          out_of_time = True
           break
 
-        if status is handler.ERRORED:
-          retry_jobs.append(job)
+      query = job_logic.getQueryForFields(filter=filter)
+      group_metrics['depth'] = query.count(DEF_QUEUE_DEPTH_LIMIT)
+
+    lines = ['%(group)s: claimed %(claimed)d, completed %(completed)d, '
+             'dispatched %(dispatched)d, expired %(expired)d, '
+             'waiting %(depth)d' % i for i in metrics]
+
+    for line in lines:
+      logging.info(line)
 
-        jobs_completed += 1
+    jobs_completed = sum([i['completed'] for i in metrics])
 
     response = 'Completed %d jobs in %d priority groups.' % (
-        jobs_completed, groups_touched)
+        jobs_completed, len(metrics))
+
+    return http.HttpResponse('\n'.join([response] + lines),
+                             mimetype='text/plain')
+
+  def _reclaimExpiredJobs(self, group):
+    """Puts the started jobs of the group with an expired lease back.
+
+    Jobs that were started before leases were introduced have no lease,
+    they are checked as well, see soc.cron.job.Handler.reclaimJob.
+
+    Returns: the amount of jobs that were reclaimed.
+    """
+
+    expired = {
+        'priority_group': group,
+        'status': 'started',
+        'lease_expires <': datetime.datetime.now(),
+        }
+
+    unleased = {
+        'priority_group': group,
+        'status': 'started',
+        'lease_expires': None,
+        }
+
+    job_keys = []
+
+    for filter in [expired, unleased]:
+      query = job_logic.getQueryForFields(filter=filter)
+      job_keys += [i.key() for i in query.fetch(100)]
 
-    return http.HttpResponse(response)
+    return soc.cron.job.handler.reclaimExpired(job_keys)
 
 
 view = View()
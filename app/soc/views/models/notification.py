@@ -96,6 +96,7 @@ class View(base.View):
     new_params['name'] = "Notification"
 
     new_params['no_create_with_key_fields'] = True
+    new_params['list_key_paging'] = True
     new_params['create_form'] = CreateForm
 
     new_params['edit_redirect'] = '/%(url_name)s/list'
@@ -259,11 +259,8 @@ class View(group.View):
     scores = [[proposal.score] for proposal in proposals]
 
     # retrieve the ranker
-    fields = {'link_id': student_proposal.DEF_RANKER_NAME,
-              'scope': org_entity}
-
-    ranker_root = ranker_root_logic.getForFields(fields, unique=True)
-    ranker = ranker_root_logic.getRootFromEntity(ranker_root)
+    ranker = ranker_root_logic.getRanker(org_entity.key().id_or_name(),
+                                         student_proposal.DEF_RANKER_NAME)
 
     # retrieve the ranks for these scores
     ranks = [rank+1 for rank in ranker.FindRanks(scores)]
@@ -421,89 +418,44 @@ class View(group.View):
 
     return self._list(request, params, contents, page_name)
 
-  def _getMapData(self, filter=None):
+  def _getMapData(self, entity):
     """Constructs the JSON object required to generate 
        Google Maps on organization home page.
 
     Args:
-      filter: a dict for the properties that the entities should have
+      entity: the Organization for which the map data should be returned
 
     Returns: 
       A JSON object containing map data.
     """
 
-    from soc.logic.models.student_project import logic as student_project_logic
-    from soc.views.models import student_project as student_project_view
-
-    sp_params = student_project_view.view.getParams().copy()
-
-    people = {}
-    projects = {}
-
-    # get all the student_project entities for the given filter
-    student_project_entities = student_project_logic.getForFields(
-        filter=filter)
-
-    # Construct a dictionary of mentors and students. For each mentor construct
-    # a list of 3-tuples containing student name, project title and url.
-    # And for each student a list of 3 tuples containing mentor name, project
-    # title and url. Only students and mentors who have agreed to publish their
-    # locations will be in the dictionary.
-    for entity in student_project_entities:
-
-      project_key_name = entity.key().id_or_name()
-      project_redirect = redirects.getPublicRedirect(entity, sp_params)
-
-      student_entity = entity.student
-      student_key_name = student_entity.key().id_or_name()
-
-      mentor_entity = entity.mentor
-      mentor_key_name = mentor_entity.key().id_or_name()
-
-      # store the project data in the projects dictionary
-      projects[project_key_name] = {'title': entity.title,
-                                    'redirect': project_redirect,
-                                    'student_key': student_key_name,
-                                    'student_name': student_entity.name(),
-                                    'mentor_key': mentor_key_name,
-                                    'mentor_name': mentor_entity.name()}
-
-      if mentor_entity.publish_location:
-        if mentor_key_name not in people:
-          # we have not stored the information of this mentor yet
-          people[mentor_key_name] = {
-              'type': 'mentor',
-              'name': mentor_entity.name(),
-              'lat': mentor_entity.latitude,
-              'long': mentor_entity.longitude,
-              'projects': []
-              }
-
-        # add this project to the mentor's list
-        people[mentor_key_name]['projects'].append(project_key_name)
-
-      if student_entity.publish_location:
-        if student_key_name not in people:
-          # new student, store the name and location
-          people[student_key_name] = {
-              'type': 'student',
-              'name': student_entity.name(),
-              'lat': student_entity.latitude,
-              'long': student_entity.longitude,
-              'projects': [],
-              }
-
-        # append the current project to the known student's list of projects
-        people[student_key_name]['projects'].append(project_key_name)
-
-    # combine the people and projects data into one JSON object
     data = {}
     # TODO: to enable map data uncomment the piece of code below
-    #data = {'people': people,
-    #        'projects': projects}
+    #data = self._getStoredMapData(entity)
 
     return simplejson.dumps(data)
 
+  def _getStoredMapData(self, entity):
+    """Returns the map data that the org_map logic maintains for the
+    organization, with the redirects to its projects added.
+
+    Args:
+      entity: the Organization for which the map data should be returned
+    """
+
+    from soc.logic.models.org_map import logic as org_map_logic
+    from soc.views.models import student_project as student_project_view
+
+    sp_params = student_project_view.view.getParams()
+
+    data = org_map_logic.getMapData(entity)
+
+    for project_key_name, project in data['projects'].iteritems():
+      project['redirect'] = '/%s/show/%s' % (sp_params['url_name'],
+                                             project_key_name)
+
+    return data
+
   def _public(self, request, entity, context):
     """See base.View._public().
     """
@@ -545,7 +497,7 @@ class View(group.View):
       context['list'] = soc.logic.lists.Lists(contents)
 
       # obtain data to construct the organization map as json object
-      context['org_map_data'] = self._getMapData(filter)
+      context['org_map_data'] = self._getMapData(entity)
       
     news_feed = NewsFeed(entity)
     context['news_feed'] = news_feed.getFeed()
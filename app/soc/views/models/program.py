@@ -39,8 +39,8 @@ from soc.logic.models import mentor as mentor_logic
 from soc.logic.models import organization as org_logic
 from soc.logic.models import org_admin as org_admin_logic
 from soc.logic.models import org_app as org_app_logic
-from soc.logic.models import student_proposal as student_proposal_logic
 from soc.logic.models import program as program_logic
+from soc.logic.models.proposal_duplicates import logic as duplicates_logic
 from soc.logic.models import student as student_logic
 from soc.views import helper
 from soc.views import out_of_band
@@ -352,8 +352,9 @@ class View(presence.View):
       locked_slots = dicts.groupDictBy(from_json, 'locked', 'slots')
 
       if submit:
-        program.slots_allocation = result
-        program.put()
+        fields = {'slots_allocation': result}
+        program = program_logic.logic.updateEntityProperties(program, fields,
+                                                             silent=True)
 
     orgs = {}
     applications = {}
@@ -366,7 +367,7 @@ class View(presence.View):
 
     max_slots_per_org = program.max_slots
     min_slots_per_org = program.min_slots
-    algorithm = 2
+    algorithm = 3
 
     allocator = allocations.Allocator(orgs.keys(), applications, max,
                                       program_slots, max_slots_per_org,
@@ -442,55 +443,46 @@ class View(presence.View):
 
     from django.utils import simplejson
 
-    from soc.logic.models.proposal_duplicates import logic as duplicates_logic
-
     program_entity = program_logic.logic.getFromKeyFieldsOr404(kwargs)
 
-    if request.POST and request.POST.get('result'):
-      # store result in the datastore
-      fields = {'link_id': program_entity.link_id,
-                'scope': program_entity,
-                'scope_path': program_entity.key().id_or_name(),
-                'json_representation' : request.POST['result']
-                }
-      key_name = duplicates_logic.getKeyNameFromFields(fields)
-      duplicates_logic.updateOrCreateFromKeyName(fields, key_name)
-
-      response = simplejson.dumps({'status': 'done'})
+    if request.POST and request.POST.get('calculate'):
+      # calculate the duplicates in the background
+      duplicates_logic.startCalculation(program_entity)
+
+      response = simplejson.dumps({'status': 'started'})
       return http.HttpResponse(response)
 
+    duplicates = duplicates_logic.getForProgram(program_entity)
+
+    if request.GET.get('poll'):
+      # report the state of the last calculation
+      status = {'calculated_on': None, 'in_progress': False}
+      if duplicates:
+        # pylint: disable-msg=E1103
+        stored = simplejson.loads(duplicates.json_representation)
+        status['calculated_on'] = str(duplicates.calculated_on)
+        status['in_progress'] = stored.get('in_progress', False)
+      return http.HttpResponse(simplejson.dumps(status))
+
     context = helper.responses.getUniversalContext(request)
     helper.responses.useJavaScript(context, params['js_uses_all'])
     context['uses_duplicates'] = True
     context['uses_json'] = True
     context['page_name'] = page_name
 
-    # get all orgs for this program who are active and have slots assigned
-    fields = {'scope': program_entity,
-              'slots >': 0,
-              'status': 'active'}
-
-    query = org_logic.logic.getQueryForFields(fields)
-
-    to_json = {
-        'nr_of_orgs': query.count(),
-        'program_key': program_entity.key().id_or_name()}
-    json = simplejson.dumps(to_json)
-    context['info'] = json
-    context['offset_length'] = 10
-
-    fields = {'link_id': program_entity.link_id,
-              'scope': program_entity}
-    duplicates = duplicates_logic.getForFields(fields, unique=True)
-
     if duplicates:
-      # we have stored information
+      # we have stored information, the per org assignments are only
+      # needed to refresh the calculation
       # pylint: disable-msg=E1103
-      context['duplicate_cache_content'] = duplicates.json_representation
+      stored = simplejson.loads(duplicates.json_representation)
+      context['duplicate_cache_content'] = simplejson.dumps(
+          {'data': stored['data']})
       context['date_of_calculation'] = duplicates.calculated_on
+      context['calculated_on'] = simplejson.dumps(str(duplicates.calculated_on))
     else:
       # no information stored
       context['duplicate_cache_content'] = simplejson.dumps({})
+      context['calculated_on'] = simplejson.dumps(None)
 
     template = 'soc/program/show_duplicates.html'
 
@@ -532,47 +524,19 @@ class View(presence.View):
     org_entities = org_logic.logic.getForFields(fields, 
         limit=limit, offset=offset)
 
+    assignments = duplicates_logic.getAssignedProposals(program_entity,
+                                                        org_entities)
+
     orgs_data = {}
     proposals_data = []
 
-    # for each org get the proposals who will be assigned a slot
-    for org in org_entities:
-
-      org_data = {'name': org.name}
-
-      fields = {'scope': org,
-                'status': 'active',
-                'user': org.founder}
-
-      org_admin = org_admin_logic.logic.getForFields(fields, unique=True)
-
-      if org_admin:
-        # pylint: disable-msg=E1103
-        org_data['admin_name'] = org_admin.name()
-        org_data['admin_email'] = org_admin.email
-
-      proposals = student_proposal_logic.logic.getProposalsToBeAcceptedForOrg(
-          org, step_size=program_entity.max_slots)
-
-      if not proposals:
+    for org_key_name, assignment in assignments.iteritems():
+      if not assignment:
         # nothing to accept, next organization
         continue
 
-      # store information about the org
-      orgs_data[org.key().id_or_name()] = org_data
-
-      # store each proposal in the dictionary
-      for proposal in proposals:
-        student_entity = proposal.scope
-
-        proposals_data.append(
-            {'key_name': proposal.key().id_or_name(),
-            'proposal_title': proposal.title,
-            'student_key': student_entity.key().id_or_name(),
-            'student_name': student_entity.name(),
-            'student_contact': student_entity.email,
-            'org_key': org.key().id_or_name()
-            })
+      orgs_data[org_key_name] = assignment['org']
+      proposals_data.extend(assignment['proposals'])
 
     # return all the data in JSON format
     data = {'orgs': orgs_data,
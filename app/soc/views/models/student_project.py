@@ -92,6 +92,7 @@ class View(base.View):
     new_params['scope_redirect'] = redirects.getCreateRedirect
 
     new_params['no_create_with_key_fields'] = True
+    new_params['list_key_paging'] = True
 
     new_params['extra_dynaexclude'] = ['program', 'status', 'link_id',
                                        'mentor', 'additional_mentors',
@@ -39,6 +39,7 @@ from soc.logic.helper import timeline
 from soc.logic.models.survey import logic as survey_logic
 from soc.logic.models.user import logic as user_logic
 from soc.models.survey import Survey
+from soc.models.survey import parseSchema
 from soc.models.survey_record import SurveyRecord
 from soc.models.user import User
 from soc.views import out_of_band
@@ -293,7 +294,8 @@ class View(base.View):
 
       # there is a SurveyContent already
       survey_content = entity.survey_content
-      schema = eval(survey_content.schema)
+      # parse a private copy, as the schema is modified by the caller
+      schema = parseSchema(survey_content.schema)
 
       for question_name in survey_content.dynamic_properties():
 
@@ -802,8 +804,7 @@ class View(base.View):
     content = ((prop, getattr(sur.survey_content, prop)) for prop in dynamic)
     json['survey_content'] = dict(content)
 
-    schema =  sur.survey_content.schema
-    json['survey_content']['schema'] = eval(sur.survey_content.schema)
+    json['survey_content']['schema'] = sur.survey_content.getSchema()
 
     data = simplejson.dumps(json, indent=2)
 
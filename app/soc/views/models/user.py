@@ -73,6 +73,7 @@ class View(base.View):
     new_params['cache_pick'] = True
 
     new_params['sidebar_heading'] = 'Users'
+    new_params['list_key_paging'] = True
 
     new_params['extra_dynaexclude'] = ['former_accounts', 'agreed_to_tos',
         'agreed_to_tos_on', 'status']
@@ -36,6 +36,7 @@ from django.utils.translation import ugettext
 from soc.logic import cleaning
 from soc.logic import dicts
 from soc.logic import models as model_logic
+from soc.logic.models.notification import logic as notification_logic
 from soc.logic.models.user import logic as user_logic
 from soc.logic.models.site import logic as site_logic
 from soc.logic.models.subscriptions import logic as subscription_logic
@@ -47,6 +48,13 @@ from soc.views.helper import widgets
 from soc.views.models import base
 from soc.views.models import role as role_view
 
+# the role views add themselves to role_view.ROLE_VIEWS when they are
+# imported, which the callback no longer does for every view up front
+import soc.views.models.host
+import soc.views.models.mentor
+import soc.views.models.org_admin
+import soc.views.models.student
+
 
 class View(base.View):
   """Views for User own profiles.
@@ -290,7 +298,7 @@ class View(base.View):
         'unread': True,
         }
 
-    notifications = model_logic.notification.logic.getForFields(filter)
+    notifications = notification_logic.getForFields(filter)
     count = len(list(notifications))
 
     if count > 0:
@@ -22,6 +22,8 @@ __authors__ = [
   ]
 
 
+import hashlib
+
 from soc.views import out_of_band
 
 
@@ -151,3 +153,136 @@ def getSidebarMenus(id, user, params=None):
   menus = [menu]
 
   return menus
+
+
+def getSidebarSkeleton(params=None):
+  """Constructs the default sidebar menu for a View without checking
+  access to its items.
+
+  Args:
+    params: a dict with params for this View
+
+  Returns:
+    A list with one menu, like getSidebarMenus, except that its 'items'
+    value is the list returned by getSidebarItems and that the Checker
+    that should be used for the access checks is stored in 'rights'.
+  """
+
+  items = getSidebarItems(params)
+
+  if 'sidebar_heading' not in params:
+    params['sidebar_heading'] = params['name']
+
+  menu = {}
+
+  menu['heading'] = params['sidebar_heading']
+  menu['items'] = items
+  menu['group'] = params['sidebar_grouping']
+  menu['rights'] = params['rights']
+
+  return [menu]
+
+
+def getSkeletonVersion(skeleton):
+  """Returns a version string for the specified skeleton.
+
+  The version only changes if the urls or access types of the items
+  change, which invalidates the rights bitmaps of the old skeleton.
+
+  Args:
+    skeleton: a list of menus as returned by getSidebarSkeleton
+  """
+
+  parts = []
+
+  for menu in skeleton:
+    for url, _, access_type in menu['items']:
+      parts.append('%s %s' % (url, access_type))
+
+  return hashlib.md5('\n'.join(parts)).hexdigest()
+
+
+def getRightsBitmap(id, user, skeleton):
+  """Returns a bitmap with the items of the skeleton the user may access.
+
+  Bit i is set if the user may access the i-th item of the skeleton,
+  counting the items of all menus in order. Each distinct check is run
+  only once, regardless of how many items depend on it, and through the
+  rights cache like any other check made for the sidebar.
+
+  Args:
+    skeleton: a list of menus as returned by getSidebarSkeleton
+  """
+
+  kwargs = SIDEBAR_ACCESS_KWARGS
+
+  results = {}
+  bitmap = 0
+  index = 0
+
+  for menu in skeleton:
+    rights = menu['rights']
+    rights.setCurrentUser(id, user)
+
+    for _, _, access_type in menu['items']:
+      checks = rights['any_access']
+
+      if access_type in rights.rights:
+        checks += rights[access_type]
+      else:
+        checks += rights['unspecified']
+
+      allowed = True
+
+      for checker_name, args in checks:
+        check_key = (rights.__class__, checker_name, repr(args))
+
+        if check_key not in results:
+          try:
+            rights.check(True, checker_name, kwargs, args)
+            results[check_key] = True
+          except out_of_band.Error:
+            results[check_key] = False
+
+        if not results[check_key]:
+          allowed = False
+          break
+
+      if allowed:
+        bitmap |= 1 << index
+
+      index += 1
+
+  return bitmap
+
+
+def mergeSkeleton(skeleton, bitmap):
+  """Returns the sidebar menus for the items of skeleton set in bitmap.
+
+  Args:
+    skeleton: a list of menus as returned by getSidebarSkeleton
+    bitmap: a bitmap as returned by getRightsBitmap
+
+  Returns:
+    A list of menus as returned by getSidebarMenus, menus without any
+    accessible items are left out.
+  """
+
+  menus = []
+  index = 0
+
+  for menu in skeleton:
+    submenus = []
+
+    for url, menu_text, _ in menu['items']:
+      if bitmap & (1 << index):
+        submenus.append({'url': url, 'title': menu_text})
+
+      index += 1
+
+    if submenus:
+      menus.append({'heading': menu['heading'],
+                    'items': submenus,
+                    'group': menu['group']})
+
+  return menus
@@ -1,6 +1,19 @@
 from google.appengine.ext import db
+import random
 import string
-    
+
+
+# number of shards the tagged count of each tag is spread over
+DEF_COUNTER_SHARDS = 10
+
+# number of tags migrated to TagMemberships per batch
+DEF_MIGRATE_TAGS_BATCH_SIZE = 10
+
+# number of entities stored or retrieved per datastore call when a tag is
+# migrated to TagMemberships
+DEF_MIGRATE_BATCH_SIZE = 500
+
+
 class Tag(db.Model):
   "Google AppEngine model for store of tags."
 
@@ -11,40 +24,53 @@ class Tag(db.Model):
   "The date and time that the tag was first added to the datastore."
 
   tagged = db.ListProperty(db.Key)
-  "A List of db.Key values for the datastore objects that have been tagged with this tag value."
+  """The entities tagged before TagMemberships were introduced, emptied
+  when the tag is migrated by migrate_tags."""
 
   tagged_count = db.IntegerProperty(default=0)
-  "The number of entities in tagged."
+  """The number of tagged entities, summed from the TagCounterShards
+  whenever the tag is applied or removed."""
+
+  counted = db.BooleanProperty(default=False)
+  """Whether tagged_count is kept in TagCounterShards, which is the case for
+  new and migrated tags."""
 
   @classmethod
   def __key_name(cls, tag_name):
     return cls.__name__ + '_' + tag_name
+
+  @classmethod
+  def key_name_for(cls, scope, tag_name):
+    "Returns the key name of the tag with the given value in scope."
+    return cls.__key_name(tag_name)
+
+  @classmethod
+  def new_tag(cls, key_name, scope, tag_name):
+    "Returns a new, not yet stored, tag."
+    return cls(key_name=key_name, tag=tag_name, counted=True)
     
   def remove_tagged(self, key):
-    def remove_tagged_txn():
-      if key in self.tagged:
-        self.tagged.remove(key)
-        self.tagged_count -= 1
-        self.put()
-    db.run_in_transaction(remove_tagged_txn)
-    self.__class__.expire_cached_tags()
+    apply_tag_changes(self.__class__, [(key, [], [self])])
 
   def add_tagged(self, key):
-    def add_tagged_txn():
-      if key not in self.tagged:
-        self.tagged.append(key)
-        self.tagged_count += 1
-        self.put()
-    db.run_in_transaction(add_tagged_txn)
-    self.__class__.expire_cached_tags()
+    apply_tag_changes(self.__class__, [(key, [self], [])])
     
   def clear_tagged(self):
-    def clear_tagged_txn():
-      self.tagged = []
-      self.tagged_count = 0
-      self.put()
-    db.run_in_transaction(clear_tagged_txn)
-    self.__class__.expire_cached_tags()
+    memberships = TagMembership.all(keys_only=True).filter('tag =', self)
+    keys = memberships.fetch(1000)
+    while keys:
+      db.delete(keys)
+      keys = memberships.fetch(1000)
+
+    shards = [TagCounterShard(key_name=i, tag=self, count=0)
+              for i in TagCounterShard.key_names_for(self.key())]
+    db.put(shards)
+
+    self.tagged = []
+    self.tagged_count = 0
+    self.counted = True
+    self.put()
+    self.__class__.refresh_cached_tags([self])
         
   @classmethod
   def get_by_name(cls, tag_name):
@@ -52,9 +78,44 @@ class Tag(db.Model):
     
   @classmethod
   def get_tags_for_key(cls, key):
-    "Set the tags for the datastore object represented by key."
-    tags = db.Query(cls).filter('tagged =', key).fetch(1000)
+    """Get the tags for the datastore object represented by key.
+
+    Tags that have not been migrated yet are found through their tagged
+    list."""
+    memberships = TagMembership.all().filter('tagged =', key).filter(
+        'tag_kind =', cls.kind()).fetch(1000)
+    tag_keys = [TagMembership.tag.get_value_for_datastore(i)
+                for i in memberships]
+    tags = [i for i in db.get(tag_keys) if i] if tag_keys else []
+
+    tag_keys = set(tag_keys)
+    for tag in db.Query(cls).filter('tagged =', key).fetch(1000):
+      if tag.key() not in tag_keys:
+        tags.append(tag)
+
     return tags
+
+  @classmethod
+  def get_or_create_multi(cls, scope, tag_names):
+    """Get the tags with the given values, creating the missing ones
+    with one batch put.
+
+    Returns:
+      A list with the tags and a list with the tags that were created.
+    """
+    key_names = [cls.key_name_for(scope, i) for i in tag_names]
+    tags = cls.get_by_key_name(key_names)
+
+    created = []
+    for i, tag in enumerate(tags):
+      if tag is None:
+        tags[i] = cls.new_tag(key_names[i], scope, tag_names[i])
+        created.append(tags[i])
+
+    if created:
+      db.put(created)
+
+    return tags, created
     
   @classmethod
   def get_or_create(cls, tag_name):
@@ -64,7 +125,7 @@ class Tag(db.Model):
     if existing_tag is None:
       # The tag does not yet exist, so create it.
       def create_tag_txn():
-        new_tag = cls(key_name=tag_key_name, tag=tag_name)
+        new_tag = cls(key_name=tag_key_name, tag=tag_name, counted=True)
         new_tag.put()
         return new_tag
       existing_tag = db.run_in_transaction(create_tag_txn)
@@ -129,12 +190,339 @@ class Tag(db.Model):
     memcache.delete(cls.__name__ + '_tags_by_name_asc')
     memcache.delete(cls.__name__ + '_tags_by_name_desc')
 
+  @classmethod
+  def refresh_cached_tags(cls, tags, created=None):
+    """Expire only the cached lists that are affected by the changed counts
+    of tags, or by the creation of the tags in created."""
+    from google.appengine.api import memcache
+
+    if created:
+      memcache.delete_multi([cls.__name__ + '_tags_by_name_asc',
+                             cls.__name__ + '_tags_by_name_desc'])
+
+    popular = memcache.get(cls.__name__ + '_popular_tags')
+    if popular is None:
+      return
+
+    popular_keys = set(i.key() for i in popular)
+    lowest = min([i.tagged_count for i in popular] or [0])
+
+    for tag in tags:
+      if tag.key() in popular_keys or tag.tagged_count >= lowest:
+        memcache.delete(cls.__name__ + '_popular_tags')
+        return
+
   def __str__(self):
     """Returns the string representation of the entity's tag name.
     """
 
     return self.tag
 
+class TagMembership(db.Model):
+  "Index entity that records that an entity has been tagged with a tag."
+
+  tag = db.ReferenceProperty(Tag, required=True,
+                             collection_name='memberships')
+  "The tag that has been applied."
+
+  tag_kind = db.StringProperty(required=True)
+  "The kind of the tag, to look up the tags of one kind for an entity."
+
+  tagged = db.ReferenceProperty(required=True,
+                                collection_name='tag_memberships')
+  "The entity that has been tagged."
+
+  @classmethod
+  def key_name_for(cls, tag_key, tagged_key):
+    return '%s/%s' % (tag_key, tagged_key)
+
+
+class TagCounterShard(db.Model):
+  "One of the DEF_COUNTER_SHARDS shards of the tagged count of a tag."
+
+  tag = db.ReferenceProperty(Tag, required=True,
+                             collection_name='counter_shards')
+  "The tag that is counted."
+
+  count = db.IntegerProperty(required=True, default=0)
+  "The part of the tagged count stored in this shard."
+
+  @classmethod
+  def key_names_for(cls, tag_key):
+    return ['%s/%d' % (tag_key, i) for i in range(DEF_COUNTER_SHARDS)]
+
+  @classmethod
+  def increment(cls, tag_key, delta):
+    "Adds delta to a random shard of the tag, in a short transaction."
+    key_name = random.choice(cls.key_names_for(tag_key))
+
+    def increment_txn():
+      shard = cls.get_by_key_name(key_name)
+      if shard is None:
+        shard = cls(key_name=key_name, tag=tag_key)
+      shard.count += delta
+      shard.put()
+    db.run_in_transaction(increment_txn)
+
+  @classmethod
+  def count_tagged(cls, tag_keys):
+    "Returns the tagged counts of the tags, retrieved with one batch get."
+    key_names = []
+    for tag_key in tag_keys:
+      key_names.extend(cls.key_names_for(tag_key))
+
+    counts = dict((i, 0) for i in tag_keys)
+    for shard in cls.get_by_key_name(key_names):
+      if shard:
+        counts[cls.tag.get_value_for_datastore(shard)] += shard.count
+
+    return counts
+
+
+def apply_tag_changes(tag_model, changes, created=None):
+  """Applies tags to and removes tags from entities with a few batch writes.
+
+  The memberships are stored and deleted in one batch each, and every tag
+  whose count changed gets one increment of a counter shard. The
+  tagged_count of those tags is then refreshed in a short transaction per
+  tag. Tags that have not been migrated yet keep their tagged_count
+  without shards, and removed entities are dropped from their tagged list.
+
+  Args:
+    tag_model: the Tag class of all tags in changes
+    changes: list of (key, tags to add, tags to remove) tuples, the
+        tags to add must not have been applied to the entity yet
+    created: the tags in changes that have just been created
+  """
+
+  memberships = []
+  removed = []
+  deltas = {}
+  untagged = {}
+  tags = {}
+
+  for key, added_tags, removed_tags in changes:
+    for tag in added_tags:
+      memberships.append(TagMembership(
+          key_name=TagMembership.key_name_for(tag.key(), key),
+          tag=tag, tag_kind=tag_model.kind(), tagged=key))
+      deltas[tag.key()] = deltas.get(tag.key(), 0) + 1
+      tags[tag.key()] = tag
+
+    for tag in removed_tags:
+      removed.append(db.Key.from_path(
+          TagMembership.kind(), TagMembership.key_name_for(tag.key(), key)))
+      deltas[tag.key()] = deltas.get(tag.key(), 0) - 1
+      untagged.setdefault(tag.key(), []).append(key)
+      tags[tag.key()] = tag
+
+  if memberships:
+    db.put(memberships)
+
+  if removed:
+    db.delete(removed)
+
+  changed = [tags[i] for i, delta in deltas.iteritems() if delta]
+
+  if not changed:
+    return
+
+  counted = [i for i in changed if i.counted]
+
+  for tag in counted:
+    TagCounterShard.increment(tag.key(), deltas[tag.key()])
+
+  counts = TagCounterShard.count_tagged([i.key() for i in counted])
+
+  def update_txn(tag_key, was_counted):
+    entity = tag_model.get(tag_key)
+    # skip tags that were migrated since they were read, migrate_tag
+    # counts them again when it is rerun
+    if entity is None or entity.counted != was_counted:
+      return None
+    if entity.counted:
+      entity.tagged_count = counts[tag_key]
+    else:
+      entity.tagged_count += deltas[tag_key]
+      entity.tagged = [i for i in entity.tagged
+                       if i not in untagged.get(tag_key, [])]
+    entity.put()
+    return entity
+
+  for tag in changed:
+    entity = db.run_in_transaction(update_txn, tag.key(), tag.counted)
+    if entity:
+      tag.tagged = entity.tagged
+      tag.tagged_count = entity.tagged_count
+
+  tag_model.refresh_cached_tags(changed, created)
+
+
+def migrate_tag(tag):
+  """Moves the tagged list of a tag to TagMemberships and counts them.
+
+  The memberships are stored for every key in tagged, and the counter
+  shards are reset to the number of memberships of the tag. Running it
+  again for a tag recounts it, which corrects counts that changed while
+  the tag was migrated.
+
+  Returns:
+    The migrated tag.
+  """
+
+  tag_model = tag.__class__
+
+  memberships = [TagMembership(
+      key_name=TagMembership.key_name_for(tag.key(), key),
+      tag=tag, tag_kind=tag_model.kind(), tagged=key) for key in tag.tagged]
+
+  for i in range(0, len(memberships), DEF_MIGRATE_BATCH_SIZE):
+    db.put(memberships[i:i+DEF_MIGRATE_BATCH_SIZE])
+
+  count = 0
+  query = TagMembership.all(keys_only=True).filter('tag =', tag)
+  keys = query.fetch(DEF_MIGRATE_BATCH_SIZE)
+
+  while keys:
+    count += len(keys)
+    query = TagMembership.all(keys_only=True).filter('tag =', tag).filter(
+        '__key__ >', keys[-1])
+    keys = query.fetch(DEF_MIGRATE_BATCH_SIZE)
+
+  key_names = TagCounterShard.key_names_for(tag.key())
+  shards = [TagCounterShard(key_name=i, tag=tag, count=0) for i in key_names]
+  shards[0].count = count
+  db.put(shards)
+
+  def migrate_txn():
+    entity = tag_model.get(tag.key())
+    # entities that were untagged since tag was retrieved
+    removed = [i for i in tag.tagged if i not in entity.tagged]
+    entity.tagged = []
+    entity.tagged_count = count - len(removed)
+    entity.counted = True
+    entity.put()
+    return entity, removed
+
+  entity, removed = db.run_in_transaction(migrate_txn)
+
+  if removed:
+    db.delete([db.Key.from_path(TagMembership.kind(),
+                                TagMembership.key_name_for(tag.key(), i))
+               for i in removed])
+    TagCounterShard.increment(tag.key(), -len(removed))
+
+  return entity
+
+
+def migrate_tags(tag_model, start_key=None):
+  """Migrates the next DEF_MIGRATE_TAGS_BATCH_SIZE tags of tag_model, see
+  migrate_tag.
+
+  Args:
+    tag_model: the Tag class whose tags should be migrated
+    start_key: key of the last tag of the previous batch
+
+  Returns:
+    The key of the last tag in this batch, or None if all tags have been
+    migrated.
+  """
+
+  query = db.Query(tag_model)
+  if start_key:
+    query.filter('__key__ >', start_key)
+
+  tags = query.fetch(DEF_MIGRATE_TAGS_BATCH_SIZE)
+
+  for tag in tags:
+    migrate_tag(tag)
+
+  tag_model.expire_cached_tags()
+
+  if len(tags) < DEF_MIGRATE_TAGS_BATCH_SIZE:
+    return None
+
+  return tags[-1].key()
+
+
+def _split_tags(seed, tag_separator):
+  "Returns the list of tag values in seed['tags']."
+  import types
+  if type(seed['tags']) is types.UnicodeType:
+    # Convert unicode to a plain string
+    seed['tags'] = str(seed['tags'])
+  if type(seed['tags']) is types.StringType:
+    # Tags is a string, split it on tag_seperator into a list
+    seed['tags'] = string.split(seed['tags'], tag_separator)
+  if type(seed['tags']) is not types.ListType:
+    raise Exception, "tags must be either a unicode, a string or a list"
+
+  values = []
+  for each_tag in seed['tags']:
+    each_tag = string.strip(each_tag)
+    if len(each_tag) > 0 and each_tag not in values:
+      values.append(each_tag)
+  return values
+
+
+def set_tags_bulk(entities, tag_name, seeds):
+  """Set the tags of the tag property tag_name for many entities at once.
+
+  All missing tags are created with one batch put and all changes are
+  written by apply_tag_changes.
+
+  Args:
+    entities: stored Taggable entities
+    tag_name: the name of the tag property
+    seeds: for each entity a dict with the 'tags' and their 'scope',
+        like the value assigned to the tag property
+  """
+
+  if not entities:
+    return
+
+  tag_model = entities[0]._tag_model[tag_name]
+
+  plans = []
+  for entity, seed in zip(entities, seeds):
+    values = _split_tags(seed, entity.tag_separator)
+    current = getattr(entity, tag_name)
+    plans.append((entity, seed, values, current))
+
+  # create the missing tags for each scope with one batch put
+  missing = {}
+  for entity, seed, values, current in plans:
+    current_values = [i.tag for i in current]
+    scope_missing = missing.setdefault(seed['scope'], [])
+    for value in values:
+      if value not in current_values and value not in scope_missing:
+        scope_missing.append(value)
+
+  by_value = {}
+  created = []
+  for scope, values in missing.iteritems():
+    if not values:
+      continue
+    tags, new_tags = tag_model.get_or_create_multi(scope, values)
+    created.extend(new_tags)
+    for value, tag in zip(values, tags):
+      by_value[(scope, value)] = tag
+
+  changes = []
+  for entity, seed, values, current in plans:
+    removed_tags = [i for i in current if i.tag not in values]
+    current_values = [i.tag for i in current]
+    added_tags = [by_value[(seed['scope'], i)] for i in values
+                  if i not in current_values]
+
+    changes.append((entity.key(), added_tags, removed_tags))
+
+    entity._tags[tag_name] = [i for i in current if i.tag in values]
+    entity._tags[tag_name].extend(added_tags)
+
+  apply_tag_changes(tag_model, changes, created)
+
+
 def tag_property(tag_name):
   """Decorator that creates and returns a tag property to be used 
   in Google AppEngine model.
@@ -159,37 +547,7 @@ def tag_property(tag_name):
     the specified entity.
     """
 
-    import types
-    if type(seed['tags']) is types.UnicodeType:
-      # Convert unicode to a plain string
-      seed['tags'] = str(seed['tags'])
-    if type(seed['tags']) is types.StringType:
-      # Tags is a string, split it on tag_seperator into a list
-      seed['tags'] = string.split(seed['tags'], self.tag_separator)
-    if type(seed['tags']) is types.ListType:
-      get_tags(self)
-      # Firstly, we will check to see if any tags have been removed.
-      # Iterate over a copy of _tags, as we may need to modify _tags
-      for each_tag in self._tags[tag_name][:]:
-        if each_tag not in seed['tags']:
-          # A tag that was previously assigned to this entity is
-          # missing in the list that is being assigned, so we
-          # disassocaite this entity and the tag.
-          each_tag.remove_tagged(self.key())
-          self._tags[tag_name].remove(each_tag)
-      # Secondly, we will check to see if any tags have been added.
-      for each_tag in seed['tags']:
-        each_tag = string.strip(each_tag)
-        if len(each_tag) > 0 and each_tag not in self._tags[tag_name]:
-          # A tag that was not previously assigned to this entity
-          # is present in the list that is being assigned, so we
-          # associate this entity with the tag.
-          tag = self._tag_model[tag_name].get_or_create(
-              seed['scope'], each_tag)
-          tag.add_tagged(self.key())
-          self._tags[tag_name].append(tag)
-    else:
-      raise Exception, "tags must be either a unicode, a string or a list"
+    set_tags_bulk([self], tag_name, [seed])
 
   return property(get_tags, set_tags)
 
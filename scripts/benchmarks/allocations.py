@@ -0,0 +1,75 @@
+#!/usr/bin/python2.5
+#
+# Copyright 2009 the Melange authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmark for the slot allocation algorithms in soc.logic.allocations.
+
+Allocates the slots of synthetic programs in which every org has a random
+popularity and number of mentors, with a tenth of the orgs locked.
+"""
+
+__authors__ = [
+  '"Sverre Rabbelier" <sverre@rabbelier.nl>',
+]
+
+
+import random
+
+import helper
+
+
+ORG_COUNTS = [1000, 10000, 100000]
+
+# the reliable algorithm is quadratic in the number of orgs, so it
+# is only measured for the smaller programs
+RELIABLE_MAX_ORGS = 10000
+
+
+def program(count):
+  """Returns the Allocator arguments and locked slots for count orgs.
+  """
+
+  rand = random.Random(count)
+
+  orgs = ['org_%d' % i for i in range(count)]
+  popularity = dict([(i, rand.randint(0, 200)) for i in orgs])
+  mentors = dict([(i, rand.randint(1, 20)) for i in orgs])
+  locked_slots = dict([(i, rand.randint(1, 10)) for i in orgs[::10]])
+
+  args = (orgs, popularity, mentors, count * 5, 20, 1)
+
+  return args, locked_slots
+
+
+def main():
+  helper.setup(stubs=False)
+
+  from soc.logic import allocations
+
+  for count in ORG_COUNTS:
+    args, locked_slots = program(count)
+
+    for algorithm in [2, 3]:
+      if algorithm == 2 and count > RELIABLE_MAX_ORGS:
+        continue
+
+      allocator = allocations.Allocator(*(args + (algorithm,)))
+      fun = lambda: allocator.allocate(locked_slots)
+      name = 'Algorithm %d with %d orgs' % (algorithm, count)
+      helper.report(name, helper.measure(fun, 3))
+
+
+if __name__ == '__main__':
+  main()
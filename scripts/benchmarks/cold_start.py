@@ -0,0 +1,118 @@
+#!/usr/bin/python2.5
+#
+# Copyright 2009 the Melange authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmark for the first request on a new instance.
+
+Every measurement runs in a fresh interpreter, so nothing is imported
+beforehand. The lazy mode is what an instance does today, the eager mode
+builds the patterns of every view module while registering the core, which
+is what happened when the core callback imported all views up front.
+"""
+
+__authors__ = [
+  '"Sverre Rabbelier" <sverre@rabbelier.nl>',
+]
+
+
+import logging
+import os
+import subprocess
+import sys
+import time
+
+import helper
+
+
+MODES = ['eager', 'lazy']
+
+# a task, the home page without a site and a page with the full sidebar
+PATHS = ['/tasks/ranker/apply', '/', '/program/list']
+
+
+def request(application, path):
+  """Runs a single GET request for path through application.
+  """
+
+  from StringIO import StringIO
+
+  environ = {
+      'REQUEST_METHOD': 'GET',
+      'PATH_INFO': path,
+      'QUERY_STRING': '',
+      'SERVER_NAME': os.environ['SERVER_NAME'],
+      'SERVER_PORT': os.environ['SERVER_PORT'],
+      'SERVER_PROTOCOL': 'HTTP/1.1',
+      'wsgi.input': StringIO(),
+      'wsgi.errors': sys.stderr,
+      'wsgi.url_scheme': 'http',
+      }
+
+  application(environ, lambda status, headers: None)
+
+
+def child(mode, path):
+  """Measures one cold start and prints the timings for the parent.
+  """
+
+  # the task is requested without a payload, which it logs as an error
+  logging.disable(logging.ERROR)
+
+  start = time.time()
+
+  helper.setup()
+
+  import django.core.handlers.wsgi
+
+  from soc.modules import callback
+  from soc.modules import core
+
+  callback.registerCore(core.Core())
+  callback.getCore().registerModuleCallbacks()
+
+  import urls
+
+  if mode == 'eager':
+    for pattern in urls.urlpatterns:
+      if isinstance(pattern, core.LazyURLResolver):
+        pattern.urlpatterns
+
+  registered = time.time()
+
+  request(django.core.handlers.wsgi.WSGIHandler(), path)
+
+  done = time.time()
+
+  print registered - start, done - registered, len(sys.modules)
+
+
+def main():
+  if len(sys.argv) == 3:
+    child(*sys.argv[1:])
+    return
+
+  for path in PATHS:
+    for mode in MODES:
+      output = subprocess.Popen([sys.executable, __file__, mode, path],
+                                stdout=subprocess.PIPE).communicate()[0]
+      startup, first, modules = output.split()[-3:]
+
+      helper.report('Startup, %s (%s modules)' % (mode, modules),
+                    float(startup))
+      helper.report('First request %s, %s' % (path, mode), float(first))
+
+
+if __name__ == '__main__':
+  main()
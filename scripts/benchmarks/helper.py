@@ -0,0 +1,150 @@
+#!/usr/bin/python2.5
+#
+# Copyright 2009 the Melange authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Helpers for the micro-benchmarks in this package.
+
+Each benchmark module can be run directly from the root of the repository,
+for example:
+
+  python2.5 scripts/benchmarks/lists.py
+
+Benchmarks that touch the App Engine APIs run against the same stubs that
+tests/run.py uses, so the absolute numbers are only useful to compare two
+revisions on the same machine.
+"""
+
+__authors__ = [
+  '"Sverre Rabbelier" <sverre@rabbelier.nl>',
+]
+
+
+import os
+import sys
+import time
+
+
+HERE = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                     '..', '..'))
+appengine_location = os.path.join(HERE, 'thirdparty', 'google_appengine')
+extra_paths = [HERE,
+               os.path.join(appengine_location, 'lib', 'django'),
+               os.path.join(appengine_location, 'lib', 'webob'),
+               os.path.join(appengine_location, 'lib', 'yaml', 'lib'),
+               os.path.join(appengine_location, 'lib', 'antlr3'),
+               appengine_location,
+               os.path.join(HERE, 'app'),
+              ]
+
+
+def setup(stubs=True):
+  """Sets up sys.path and, if stubs is set, the App Engine API stubs.
+  """
+
+  sys.path = extra_paths + sys.path
+
+  os.environ['SERVER_SOFTWARE'] = 'Development via benchmark'
+  os.environ['SERVER_NAME'] = 'Foo'
+  os.environ['SERVER_PORT'] = '8080'
+  os.environ['APPLICATION_ID'] = 'test-app-run'
+  os.environ['USER_EMAIL'] = 'test@example.com'
+  os.environ['CURRENT_VERSION_ID'] = 'testing-version'
+  os.environ['HTTP_HOST'] = 'some.testing.host.tld'
+
+  if not stubs:
+    return
+
+  from google.appengine.api import apiproxy_stub_map
+  from google.appengine.api import datastore_file_stub
+  from google.appengine.api import mail_stub
+  from google.appengine.api import user_service_stub
+  from google.appengine.api import urlfetch_stub
+  from google.appengine.api.labs.taskqueue import taskqueue_stub
+  from google.appengine.api.memcache import memcache_stub
+  apiproxy_stub_map.apiproxy = apiproxy_stub_map.APIProxyStubMap()
+  apiproxy_stub_map.apiproxy.RegisterStub('urlfetch',
+                                          urlfetch_stub.URLFetchServiceStub())
+  apiproxy_stub_map.apiproxy.RegisterStub('user',
+                                          user_service_stub.UserServiceStub())
+  apiproxy_stub_map.apiproxy.RegisterStub('datastore',
+    datastore_file_stub.DatastoreFileStub('test-app-run', None, None))
+  apiproxy_stub_map.apiproxy.RegisterStub('memcache',
+    memcache_stub.MemcacheServiceStub())
+  apiproxy_stub_map.apiproxy.RegisterStub('mail', mail_stub.MailServiceStub())
+  apiproxy_stub_map.apiproxy.RegisterStub('taskqueue',
+    taskqueue_stub.TaskQueueServiceStub())
+
+  # set up Django the same way the application does
+  import main
+
+
+def createEntity(model, **kwargs):
+  """Stores and returns a new entity of model.
+
+  Required properties that are not in kwargs are set to a valid dummy
+  value, so that fixtures only need to specify what the benchmark uses.
+  """
+
+  import datetime
+
+  from google.appengine.ext import db
+
+  dummies = {
+      basestring: 'benchmark',
+      db.Text: db.Text('benchmark'),
+      db.Link: 'http://www.example.com',
+      db.Email: 'benchmark@example.com',
+      db.PhoneNumber: '0123456789',
+      int: 1,
+      long: 1,
+      datetime.date: datetime.date(1990, 1, 1),
+      datetime.datetime: datetime.datetime(2009, 1, 1),
+      }
+
+  for name, prop in model.properties().iteritems():
+    if name in kwargs or not prop.required or prop.default is not None:
+      continue
+
+    if prop.choices:
+      kwargs[name] = list(prop.choices)[0]
+    else:
+      kwargs[name] = dummies[prop.data_type]
+
+  entity = model(**kwargs)
+  entity.put()
+
+  return entity
+
+
+def measure(fun, repeat=10):
+  """Returns the best wall clock time in seconds of repeat calls to fun.
+  """
+
+  best = None
+
+  for _ in range(repeat):
+    start = time.time()
+    fun()
+    elapsed = time.time() - start
+    best = elapsed if best is None else min(best, elapsed)
+
+  return best
+
+
+def report(name, seconds):
+  """Prints a single benchmark result.
+  """
+
+  print '%-50s %10.3f ms' % (name, seconds * 1000)
@@ -0,0 +1,71 @@
+#!/usr/bin/python2.5
+#
+# Copyright 2009 the Melange authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmark for rendering lists through soc.logic.lists.Lists.
+
+Walks the Lists object the same way soc/list/main.html does: once per
+list and then once per row, reading the item and its redirect.
+"""
+
+__authors__ = [
+  '"Sverre Rabbelier" <sverre@rabbelier.nl>',
+]
+
+
+import helper
+
+
+ROW_COUNTS = [50, 100, 1000]
+
+
+def redirect(entity, params):
+  """Trivial redirect, only the cost of calling it matters here.
+  """
+
+  return entity
+
+
+def render(lists):
+  """Visits every row of every list in lists.
+  """
+
+  for _ in lists.lists():
+    lists.nextList()
+    for _ in lists.rows():
+      lists.nextRow()
+      lists.item()
+      lists.redirect()
+
+
+def main():
+  helper.setup(stubs=False)
+
+  from soc.logic.lists import Lists
+
+  for count in ROW_COUNTS:
+    content = {
+        'data': range(count),
+        'main': 'soc/list/main.html',
+        'row': 'soc/list/row.html',
+        'action': (redirect, None),
+        }
+
+    fun = lambda: render(Lists([content]))
+    helper.report('Lists with %d rows' % count, helper.measure(fun, 100))
+
+
+if __name__ == '__main__':
+  main()
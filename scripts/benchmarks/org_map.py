@@ -0,0 +1,150 @@
+#!/usr/bin/python2.5
+#
+# Copyright 2009 the Melange authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmark for the map data on the organization home page.
+
+Compares building the map data from a StudentProject query, dereferencing
+the student and mentor of every project, with reading the precomputed
+OrgMap entity. Every call starts with an empty request cache, as a new
+page view would.
+"""
+
+__authors__ = [
+  '"Sverre Rabbelier" <sverre@rabbelier.nl>',
+]
+
+
+import helper
+
+
+PROJECT_COUNTS = [5, 50, 500]
+
+
+def queryMapData(org):
+  """Builds the map data the way the organization view used to.
+  """
+
+  from django.utils import simplejson
+
+  from soc.logic.models.student_project import logic as project_logic
+
+  people = {}
+  projects = {}
+
+  fields = {'scope': org, 'status': ['accepted', 'completed']}
+
+  for entity in project_logic.getForFields(fields):
+    project_key_name = entity.key().id_or_name()
+    student = entity.student
+    mentor = entity.mentor
+
+    projects[project_key_name] = {
+        'title': entity.title,
+        'redirect': '/student_project/show/%s' % project_key_name,
+        'student_key': student.key().id_or_name(),
+        'student_name': student.name(),
+        'mentor_key': mentor.key().id_or_name(),
+        'mentor_name': mentor.name()}
+
+    for role, role_type in [(mentor, 'mentor'), (student, 'student')]:
+      if role.publish_location:
+        person = people.setdefault(role.key().id_or_name(), {
+            'type': role_type, 'name': role.name(), 'lat': role.latitude,
+            'long': role.longitude, 'projects': []})
+        person['projects'].append(project_key_name)
+
+  return simplejson.dumps({'people': people, 'projects': projects})
+
+
+def createOrg(program, user, count):
+  """Creates an organization with count accepted projects.
+  """
+
+  from soc.models.mentor import Mentor
+  from soc.models.organization import Organization
+  from soc.models.student import Student
+  from soc.models.student_project import StudentProject
+
+  create = helper.createEntity
+
+  link_id = 'org%d' % count
+  org_key_name = '%s/%s' % (program.key().name(), link_id)
+  org = create(Organization, key_name=org_key_name, link_id=link_id,
+               scope=program, scope_path=program.key().name(), founder=user,
+               status='active')
+
+  for i in range(count):
+    student_link_id = 'student_%d_%d' % (count, i)
+    student = create(Student, key_name='%s/%s' % (program.key().name(),
+                                                  student_link_id),
+                     link_id=student_link_id, scope=program,
+                     scope_path=program.key().name(), user=user,
+                     publish_location=True, latitude=1.0, longitude=1.0)
+
+    mentor_link_id = 'mentor%d' % i
+    mentor = create(Mentor, key_name='%s/%s' % (org_key_name, mentor_link_id),
+                    link_id=mentor_link_id, scope=org, scope_path=org_key_name,
+                    user=user, program=program, publish_location=True,
+                    latitude=2.0, longitude=2.0)
+
+    project_link_id = 'project%d' % i
+    create(StudentProject, key_name='%s/%s' % (org_key_name, project_link_id),
+           link_id=project_link_id, scope=org, scope_path=org_key_name,
+           student=student, mentor=mentor, program=program,
+           status='accepted')
+
+  return org
+
+
+def main():
+  helper.setup()
+
+  from google.appengine.api import users
+
+  from soc.cache import request_scope
+  from soc.logic.models.org_map import logic as org_map_logic
+  from soc.models.program import Program
+  from soc.models.timeline import Timeline
+  from soc.models.user import User
+
+  create = helper.createEntity
+
+  user = create(User, key_name='benchmark', link_id='benchmark',
+                account=users.User('benchmark@example.com'))
+  timeline = create(Timeline, key_name='sponsor/program', link_id='program')
+  program = create(Program, key_name='sponsor/program', link_id='program',
+                   scope_path='sponsor', timeline=timeline)
+
+  for count in PROJECT_COUNTS:
+    org = createOrg(program, user, count)
+    org_map_logic.rebuildForOrg(org)
+
+    def query():
+      request_scope.flush()
+      queryMapData(org)
+
+    def precomputed():
+      request_scope.flush()
+      org_map_logic.getMapData(org)
+
+    helper.report('Query map data, %d projects' % count,
+                  helper.measure(query, 5))
+    helper.report('Precomputed map data, %d projects' % count,
+                  helper.measure(precomputed, 5))
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,95 @@
+#!/usr/bin/python2.5
+#
+# Copyright 2009 the Melange authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Benchmark for rendering list pages with and without the template cache.
+
+Renders soc/models/list.html, which extends soc/base.html and includes the
+list templates, the way responses.respond does. Without the cache every
+render reads and compiles all of these templates again.
+"""
+
+__authors__ = [
+  '"Sverre Rabbelier" <sverre@rabbelier.nl>',
+]
+
+
+import helper
+
+
+ROW_COUNTS = [0, 50, 500]
+
+
+class Row(object):
+  """Stands in for the entities in a list of users.
+  """
+
+  def __init__(self, i):
+    self.link_id = 'user%d' % i
+    self.name = 'User %d' % i
+    self.account = 'user%d@example.com' % i
+
+
+def redirect(entity, params):
+  """Trivial redirect, only the cost of calling it matters here.
+  """
+
+  return entity
+
+
+def renderPage(count):
+  """Renders a list page with count rows.
+  """
+
+  from django.template import loader
+
+  from soc.logic.lists import Lists
+
+  content = {
+      'data': [Row(i) for i in range(count)],
+      'main': 'soc/list/main.html',
+      'row': 'soc/user/list/row.html',
+      'heading': 'soc/user/list/heading.html',
+      'action': (redirect, None),
+      }
+
+  context = {'list': Lists([content]),
+             'page_name': 'Benchmark list',
+             }
+
+  return loader.render_to_string('soc/models/list.html', dictionary=context)
+
+
+def main():
+  helper.setup()
+
+  from django.conf import settings
+  from django.template import loader
+
+  for count in ROW_COUNTS:
+    fun = lambda: renderPage(count)
+
+    settings.TEMPLATE_CACHE = False
+    helper.report('List page with %d rows, no cache' % count,
+                  helper.measure(fun, 20))
+
+    settings.TEMPLATE_CACHE = True
+    loader.reset_template_cache()
+    helper.report('List page with %d rows, cached' % count,
+                  helper.measure(fun, 20))
+
+
+if __name__ == '__main__':
+  main()
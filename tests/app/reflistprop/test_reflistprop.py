@@ -0,0 +1,97 @@
+#!/usr/bin/python2.5
+#
+# Copyright 2009 the Melange authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+__authors__ = [
+  '"Sverre Rabbelier" <sverre@rabbelier.nl>',
+  ]
+
+
+import unittest
+
+from google.appengine.api import apiproxy_stub_map
+from google.appengine.ext import db
+
+import reflistprop
+
+
+class Bit(db.Model):
+  name = db.StringProperty()
+
+
+class Holder(db.Model):
+  bits = reflistprop.ReferenceListProperty(Bit, default=None)
+
+
+class ReferenceListPropertyTest(unittest.TestCase):
+  """Tests that reference lists are retrieved in batch gets.
+  """
+
+  def setUp(self):
+    self.bits = [Bit(name='bit%d' % i) for i in range(3)]
+    db.put(self.bits)
+
+    self.holders = [Holder(bits=self.bits[:2]), Holder(bits=self.bits[1:])]
+    db.put(self.holders)
+
+    self.gets = []
+    self.stub = apiproxy_stub_map.apiproxy.GetStub('datastore_v3')
+    self.original_get = self.stub._Dynamic_Get
+
+    def countingGet(request, response):
+      self.gets.append(request.key_size())
+      return self.original_get(request, response)
+
+    self.stub._Dynamic_Get = countingGet
+
+  def tearDown(self):
+    self.stub._Dynamic_Get = self.original_get
+    db.delete(self.holders + self.bits)
+
+  def testLazyBatchGet(self):
+    """Test that the list is retrieved with one get on first access.
+    """
+
+    holder = Holder.get(self.holders[0].key())
+    self.assertEqual([1], self.gets)
+
+    self.assertEqual(['bit0', 'bit1'], [i.name for i in holder.bits])
+    self.assertEqual([1, 2], self.gets)
+
+    holder.bits
+    self.assertEqual([1, 2], self.gets)
+
+  def testPutWithoutAccess(self):
+    """Test that storing a holder does not retrieve its list.
+    """
+
+    holder = Holder.get(self.holders[0].key())
+    holder.put()
+
+    self.assertEqual([1], self.gets)
+    self.assertEqual(['bit0', 'bit1'],
+                     [i.name for i in Holder.get(holder.key()).bits])
+
+  def testResolve(self):
+    """Test that the lists of many holders are retrieved with one get.
+    """
+
+    holders = db.get([i.key() for i in self.holders])
+    reflistprop.resolve(holders)
+
+    self.assertEqual([2, 3], self.gets)
+    self.assertEqual(['bit1', 'bit2'], [i.name for i in holders[1].bits])
+    self.assertEqual([2, 3], self.gets)
@@ -0,0 +1,147 @@
+#!/usr/bin/python2.5
+#
+# Copyright 2009 the Melange authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+__authors__ = [
+  '"Sverre Rabbelier" <sverre@rabbelier.nl>',
+  ]
+
+
+import unittest
+
+from google.appengine.api import memcache
+from google.appengine.ext import db
+
+from soc.cache import entity as entity_cache
+from soc.cache import request_scope
+from soc.logic.models import base
+
+
+class CachedThing(db.Model):
+  name = db.StringProperty()
+
+
+class CachedThingLogic(base.Logic):
+  ENTITY_CACHE_RETENTION = 60
+
+  def __init__(self):
+    super(CachedThingLogic, self).__init__(CachedThing)
+
+
+class EntityCacheTest(unittest.TestCase):
+  """Tests for the instance and memcache entity cache.
+  """
+
+  def setUp(self):
+    self.logic = CachedThingLogic()
+    self.entity = CachedThing(key_name='thing', name='old')
+    self.entity.put()
+
+  def tearDown(self):
+    db.delete(CachedThing.all(keys_only=True).fetch(100))
+    entity_cache.flushAll()
+    memcache.flush_all()
+    request_scope.flush()
+
+  def testTiers(self):
+    """Test that entities are served from the instance, then memcache.
+    """
+
+    entity_cache.put(CachedThing, 'thing', self.entity, 60)
+
+    cached = entity_cache.get(CachedThing, 'thing', 60)
+    self.assertEqual('old', cached.name)
+    self.assertFalse(cached is self.entity)
+
+    entity_cache.flushAll()
+    self.assertEqual('old', entity_cache.get(CachedThing, 'thing', 60).name)
+
+    entity_cache.flush(CachedThing, 'thing')
+    self.assertEqual(None, entity_cache.get(CachedThing, 'thing', 60))
+
+  def testBounded(self):
+    """Test that the instance cache does not grow past its maximum.
+    """
+
+    old_max_entries = entity_cache.DEF_MAX_ENTRIES
+    entity_cache.DEF_MAX_ENTRIES = 3
+
+    try:
+      for i in range(5):
+        entity_cache.put(CachedThing, 'thing%d' % i, self.entity, 60 + i)
+
+      self.assertEqual(3, len(entity_cache._cache))
+      self.assertTrue(entity_cache.key(CachedThing, 'thing4')
+                      in entity_cache._cache)
+    finally:
+      entity_cache.DEF_MAX_ENTRIES = old_max_entries
+
+  def testGetFromKeyName(self):
+    """Test that later requests are served from the cache until the
+    entity is written through the logic.
+    """
+
+    self.assertEqual('old', self.logic.getFromKeyName('thing').name)
+    request_scope.flush()
+
+    # a write that bypasses the logic is not noticed
+    self.entity.name = 'bypassed'
+    self.entity.put()
+    self.assertEqual('old', self.logic.getFromKeyName('thing').name)
+
+    self.logic.updateEntityProperties(
+        self.logic.getFromKeyName('thing'), {'name': 'new'})
+    request_scope.flush()
+
+    self.assertEqual('new', self.logic.getFromKeyName('thing').name)
+
+  def testSilentUpdate(self):
+    """Test that an update without hooks also drops the cached entity.
+    """
+
+    self.assertEqual('old', self.logic.getFromKeyName('thing').name)
+    request_scope.flush()
+
+    self.logic.updateEntityProperties(
+        self.logic.getFromKeyName('thing'), {'name': 'new'}, silent=True)
+    request_scope.flush()
+
+    self.assertEqual('new', self.logic.getFromKeyName('thing').name)
+
+  def testStaleReader(self):
+    """Test that an entity read before a flush is not cached again.
+    """
+
+    stale = CachedThing.get_by_key_name('thing')
+
+    self.logic.updateEntityProperties(stale, {'name': 'new'})
+    entity_cache.put(CachedThing, 'thing', stale, 60)
+
+    self.assertEqual(None, entity_cache.get(CachedThing, 'thing', 60))
+
+  def testTransaction(self):
+    """Test that transactions do not see cached entities.
+    """
+
+    self.assertEqual('old', self.logic.getFromKeyName('thing').name)
+
+    self.entity.name = 'bypassed'
+    self.entity.put()
+
+    def txn():
+      return self.logic.getFromKeyName('thing').name
+
+    self.assertEqual('bypassed', db.run_in_transaction(txn))
@@ -0,0 +1,69 @@
+#!/usr/bin/python2.5
+#
+# Copyright 2009 the Melange authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+__authors__ = [
+  '"Sverre Rabbelier" <sverre@rabbelier.nl>',
+  ]
+
+
+import unittest
+
+from google.appengine.api import memcache
+
+from soc.cache import logic
+
+from tests.app.soc.logic.models.test_model import TestModelLogic
+from tests.app.soc.models.test_model import TestModel
+
+
+class LogicCacheTest(unittest.TestCase):
+  """Tests that query results are cached and invalidated properly.
+  """
+
+  def setUp(self):
+    self.called = 0
+    self.filter = {'value': 1}
+
+  def tearDown(self):
+    memcache.flush_all()
+
+  def testFlush(self):
+    """Test that the result is gone after flushing the kind.
+    """
+
+    _, memcache_key = logic.get(TestModel, self.filter, [])
+    logic.put(42, memcache_key, TestModel)
+    self.assertEqual((42, memcache_key), logic.get(TestModel, self.filter, []))
+
+    logic.flush(TestModel)
+    self.assertEqual(None, logic.get(TestModel, self.filter, [])[0])
+
+  def testFlushOnWrite(self):
+    """Test that writing an entity invalidates the cached results.
+    """
+
+    @logic.cache
+    def getAnswer(model, filter, order):
+      self.called = self.called + 1
+      return [i.value for i in TestModel.all()]
+
+    self.assertEqual([], getAnswer(TestModel, self.filter, []))
+
+    TestModelLogic().updateOrCreateFromKeyName({'value': 1}, 'test')
+
+    self.assertEqual([1], getAnswer(TestModel, self.filter, []))
+    self.assertEqual([1], getAnswer(TestModel, self.filter, []))
+    self.assertEqual(2, self.called)
@@ -0,0 +1,73 @@
+#!/usr/bin/python2.5
+#
+# Copyright 2009 the Melange authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+__authors__ = [
+  '"Sverre Rabbelier" <sverre@rabbelier.nl>',
+  ]
+
+
+import unittest
+
+from google.appengine.api import memcache
+
+from soc.cache import rights
+
+
+class RightsCacheTest(unittest.TestCase):
+  """Tests for the versioned rights cache.
+  """
+
+  def tearDown(self):
+    memcache.flush_all()
+
+  def testGenerations(self):
+    """Test that generations are stable until they are bumped.
+    """
+
+    first = rights.getGenerations(['scope_a', 'scope_b'])
+    self.assertEqual(first, rights.getGenerations(['scope_a', 'scope_b']))
+
+    rights.bumpGeneration('scope_b')
+    second = rights.getGenerations(['scope_a', 'scope_b'])
+
+    self.assertEqual(first[0], second[0])
+    self.assertNotEqual(first[1], second[1])
+
+  def testFlush(self):
+    """Test that flushing an account bumps its generation.
+    """
+
+    scope = rights.accountScope('id')
+    before = rights.getGenerations([scope])
+
+    rights.flush('id')
+    self.assertNotEqual(before, rights.getGenerations([scope]))
+
+  def testGetPut(self):
+    """Test that status codes are cached and hits and misses counted.
+    """
+
+    stats = rights.getStats()
+    memcache_key = rights.key(['id', 'checkIsHost', [1]])
+
+    self.assertEqual(None, rights.get(memcache_key))
+
+    rights.put(memcache_key, rights.DENIED, 'message')
+    self.assertEqual((rights.DENIED, 'message'), rights.get(memcache_key))
+
+    self.assertEqual(stats['hits'] + 1, rights.getStats()['hits'])
+    self.assertEqual(stats['misses'] + 1, rights.getStats()['misses'])
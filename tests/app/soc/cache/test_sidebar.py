@@ -87,4 +87,15 @@ class SidebarCacheTest(unittest.TestCase):
     self.assertEqual(42, getAnswer('id'))
     self.assertEqual(self.called, 1)
 
+  def testRights(self):
+    """Test that the rights are only returned for the same version.
+    """
+
+    self.assertEqual(None, sidebar.getRights('id', 'v1'))
 
+    sidebar.putRights('id', 'v1', 0)
+    self.assertEqual(0, sidebar.getRights('id', 'v1'))
+    self.assertEqual(None, sidebar.getRights('id', 'v2'))
+
+    sidebar.flush('id')
+    self.assertEqual(None, sidebar.getRights('id', 'v1'))
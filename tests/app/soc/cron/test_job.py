@@ -0,0 +1,278 @@
+#!/usr/bin/python2.5
+#
+# Copyright 2009 the Melange authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+__authors__ = [
+  '"Sverre Rabbelier" <sverre@rabbelier.nl>',
+  ]
+
+
+
+import datetime
+import unittest
+
+from google.appengine.api.labs import taskqueue
+from google.appengine.ext import db
+
+from soc.cron import job as job_module
+from soc.models.job import Job
+from soc.models.priority_group import PriorityGroup
+
+
+class HandlerTest(unittest.TestCase):
+  """Tests related to claiming and reclaiming jobs.
+  """
+
+  def setUp(self):
+    """Creates a waiting job that does nothing.
+    """
+
+    self.group = PriorityGroup(key_name='test_group', link_id='test_group')
+    self.group.put()
+
+    self.job = Job(priority_group=self.group, task_name='testTask')
+    self.job.put()
+    self.job_key = self.job.key()
+
+    self.handler = job_module.Handler()
+    self.handler.tasks['testTask'] = lambda job: None
+
+  def testClaimSetsLease(self):
+    """Test that a claimed job is leased and cannot be claimed again.
+    """
+
+    job = db.run_in_transaction(self.handler.claimJob, self.job_key)
+
+    self.failUnlessEqual('started', job.status)
+    self.failUnless(job.lease_expires > datetime.datetime.now())
+
+    job = db.run_in_transaction(self.handler.claimJob, self.job_key)
+    self.failUnlessEqual(None, job)
+
+  def testReclaimExpired(self):
+    """Test that only a job with an expired lease is put back.
+    """
+
+    db.run_in_transaction(self.handler.claimJob, self.job_key)
+    self.failUnlessEqual(0, self.handler.reclaimExpired([self.job_key]))
+
+    job = Job.get(self.job_key)
+    job.lease_expires = datetime.datetime.now() - datetime.timedelta(1)
+    job.put()
+
+    self.failUnlessEqual(1, self.handler.reclaimExpired([self.job_key]))
+
+    job = Job.get(self.job_key)
+    self.failUnlessEqual('waiting', job.status)
+    self.failUnlessEqual(1, job.timeouts)
+    self.failUnlessEqual(None, job.lease_expires)
+
+  def testReclaimUnleased(self):
+    """Test that a job started without a lease is put back eventually.
+    """
+
+    job = Job.get(self.job_key)
+    job.status = 'started'
+    job.put()
+
+    self.failUnlessEqual(0, self.handler.reclaimExpired([self.job_key]))
+
+    job.last_modified_on = datetime.datetime.now() - \
+        job_module.DEF_LEASE_TIME - datetime.timedelta(minutes=1)
+    # a plain put would set last_modified_on to now
+    Job.last_modified_on.auto_now = False
+
+    try:
+      job.put()
+    finally:
+      Job.last_modified_on.auto_now = True
+
+    self.failUnlessEqual(1, self.handler.reclaimExpired([self.job_key]))
+    self.failUnlessEqual('waiting', Job.get(self.job_key).status)
+
+  def testHandleFinishesJob(self):
+    """Test that a handled job is finished and its lease released.
+    """
+
+    status = self.handler.handle(self.job_key)
+    self.failUnlessEqual(self.handler.SUCCESS, status)
+
+    job = Job.get(self.job_key)
+    self.failUnlessEqual('finished', job.status)
+    self.failUnlessEqual(None, job.lease_expires)
+
+  def testHandleUnknownTask(self):
+    """Test that a job for an unknown task is aborted.
+    """
+
+    del self.handler.tasks['testTask']
+
+    status = self.handler.handle(self.job_key)
+    self.failUnlessEqual(self.handler.ABORTED, status)
+    self.failUnlessEqual('aborted', Job.get(self.job_key).status)
+
+  def testKeyNamedJob(self):
+    """Test that jobs with a key name can fail and time out.
+    """
+
+    job = Job(key_name='testTask/named', priority_group=self.group,
+              task_name='testTask')
+    job.put()
+
+    def fail(job):
+      raise Exception('failed')
+
+    self.handler.tasks['testTask'] = fail
+
+    status = self.handler.handle(job.key())
+    self.failUnlessEqual(self.handler.ERRORED, status)
+    self.failUnlessEqual(1, Job.get(job.key()).errors)
+
+    db.run_in_transaction(self.handler.claimJob, job.key())
+
+    job = Job.get(job.key())
+    job.lease_expires = datetime.datetime.now() - datetime.timedelta(1)
+    job.put()
+
+    self.failUnlessEqual(1, self.handler.reclaimExpired([job.key()]))
+    self.failUnlessEqual(1, Job.get(job.key()).timeouts)
+
+
+class DispatchTest(unittest.TestCase):
+  """Tests related to dispatching jobs to the jobs queue.
+  """
+
+  def setUp(self):
+    """Creates waiting jobs and makes adding a task with a name twice fail.
+    """
+
+    self.group = PriorityGroup(key_name='dispatch_group',
+                               link_id='dispatch_group')
+    self.group.put()
+
+    self.jobs = [Job(key_name='job_%d' % i, priority_group=self.group,
+                     task_name='testTask') for i in range(5)]
+    db.put(self.jobs)
+
+    self.handler = job_module.Handler()
+    self.task_names = []
+    self.add = taskqueue.Task.add
+
+    def add(task, queue_name):
+      # the task queue stub does not reject duplicate names
+      if task.name in self.task_names:
+        raise taskqueue.TaskAlreadyExistsError()
+      self.task_names.append(task.name)
+
+    taskqueue.Task.add = add
+
+  def tearDown(self):
+    taskqueue.Task.add = self.add
+    db.delete(self.jobs)
+
+  def getDispatched(self):
+    """Returns the key names of the dispatched jobs.
+    """
+
+    # the task names are job-<job key>-<attempts>-<window>
+    return [db.Key(i[len('job-'):].rsplit('-', 2)[0]).name()
+            for i in self.task_names]
+
+  def testDispatchOncePerWindow(self):
+    """Test that an attempt of a job is dispatched once per window.
+    """
+
+    job = self.jobs[0]
+
+    self.failUnless(self.handler.dispatch(job))
+    self.failIf(self.handler.dispatch(job))
+
+    job.errors += 1
+    self.failUnless(self.handler.dispatch(job))
+
+  def testDispatchWaitingSkipsDispatched(self):
+    """Test that jobs that were dispatched already are paged past.
+    """
+
+    for job in self.jobs[:3]:
+      self.handler.dispatch(job)
+
+    self.failUnlessEqual(1, self.handler.dispatchWaiting(self.group, 1))
+    self.failUnlessEqual('job_3', self.getDispatched()[-1])
+
+    self.failUnlessEqual(1, self.handler.dispatchWaiting(self.group, 2))
+    self.failUnlessEqual('job_4', self.getDispatched()[-1])
+
+    self.failUnlessEqual(0, self.handler.dispatchWaiting(self.group, 1))
+
+  def testDispatchWaitingOnlyWaiting(self):
+    """Test that only waiting jobs are dispatched.
+    """
+
+    job = self.jobs[0]
+    job.status = 'finished'
+    job.put()
+
+    self.failUnlessEqual(4, self.handler.dispatchWaiting(self.group, 10))
+    self.failUnlessEqual(['job_%d' % i for i in range(1, 5)],
+                         self.getDispatched())
+
+
+class CreateJobsTest(unittest.TestCase):
+  """Tests related to creating jobs in bulk.
+  """
+
+  def setUp(self):
+    """Creates the PriorityGroup for the jobs.
+    """
+
+    self.group = PriorityGroup(key_name='bulk_group', link_id='bulk_group')
+    self.group.put()
+
+  def testCreateJobsIsIdempotent(self):
+    """Test that a job is only created once for the same data.
+    """
+
+    from soc.logic.models.job import logic as job_logic
+
+    keys = [db.Key.from_path('Student', 'student_%d' % i) for i in range(3)]
+
+    created = job_logic.createJobs(self.group, 'testTask', [[i] for i in keys])
+    self.failUnlessEqual(3, created)
+
+    created = job_logic.createJobs(self.group, 'testTask', [[i] for i in keys])
+    self.failUnlessEqual(0, created)
+
+    query = Job.all().filter('priority_group', self.group)
+    self.failUnlessEqual(3, query.count())
+
+  def testCreateJobsSkipsLegacyJobs(self):
+    """Test that no job is created for data that has an id based job.
+    """
+
+    from soc.logic.models.job import logic as job_logic
+
+    keys = [db.Key.from_path('Student', 'legacy_%d' % i) for i in range(3)]
+
+    Job(priority_group=self.group, task_name='legacyTask',
+        key_data=[keys[0]]).put()
+
+    created = job_logic.createJobs(self.group, 'legacyTask',
+                                   [[i] for i in keys])
+    self.failUnlessEqual(2, created)
+
+    query = Job.all().filter('task_name', 'legacyTask')
+    self.failUnlessEqual(3, query.count())
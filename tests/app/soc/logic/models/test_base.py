@@ -147,3 +147,49 @@ class UserTest(unittest.TestCase):
     expected = [4, 3, 2, 1]
     actual = [i.value for i in self.logic.getForFields(fields, order=order)]
     self.assertEqual(expected, actual)
+
+  def testGetFromKeyNameIdentity(self):
+    """Test that the same entity is returned for the same key name.
+    """
+
+    first = self.logic.getFromKeyName('test_1')
+    second = self.logic.getFromKeyName('test_1')
+
+    self.assertEqual(1, first.value)
+    self.assertTrue(first is second)
+
+  def testPrefetch(self):
+    """Test that prefetch returns the entities in the requested order.
+    """
+
+    key_names = ['test_3', 'test_missing', 'test_0', 'test_3']
+
+    expected = [3, None, 0, 3]
+    actual = [i.value if i else None for i in self.logic.prefetch(key_names)]
+    self.assertEqual(expected, actual)
+
+    entity = self.logic.getFromKeyName('test_3')
+    self.assertTrue(entity is self.logic.prefetch(['test_3'])[0])
+
+  def testUpdateRefreshesIdentityMap(self):
+    """Test that an updated entity is returned after updating it.
+    """
+
+    entity = self.logic.getFromKeyName('test_2')
+    self.logic.updateEntityProperties(entity, {'value': 42})
+
+    fields = {'value': 42}
+
+    actual = self.logic.getForFields(fields, unique=True)
+    self.assertEqual('test_2', actual.key().name())
+    self.assertEqual(42, self.logic.getFromKeyName('test_2').value)
+
+  def testDeleteInvalidatesIdentityMap(self):
+    """Test that a deleted entity is no longer returned.
+    """
+
+    entity = self.logic.getFromKeyName('test_4')
+    self.logic.delete(entity)
+
+    self.assertEqual(None, self.logic.getFromKeyName('test_4'))
+    self.assertEqual(None, self.logic.getForFields({'value': 4}, unique=True))
@@ -0,0 +1,155 @@
+#!/usr/bin/python2.5
+#
+# Copyright 2009 the Melange authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+__authors__ = [
+  '"Sverre Rabbelier" <sverre@rabbelier.nl>',
+  ]
+
+
+import datetime
+import unittest
+
+from google.appengine.api import apiproxy_stub_map
+from google.appengine.api import users
+
+from django import http
+
+from soc.cache import request_scope
+from soc.logic.models import csv_export
+from soc.logic.models.csv_export import logic as csv_export_logic
+from soc.logic.models.user import logic as user_logic
+from soc.models.csv_export import CSVExport
+from soc.models.user import User
+from soc.tasks import csv_export as csv_export_tasks
+
+
+KEY_ORDER = ['link_id', 'name']
+
+
+class CSVExportTest(unittest.TestCase):
+  """Tests for building CSVExports in batches.
+  """
+
+  def setUp(self):
+    for i in range(5):
+      link_id = 'export_%d' % i
+      User(key_name=link_id, link_id=link_id, name='User %d' % i,
+           account=users.User(email='%s@example.com' % link_id)).put()
+
+    self.old_batch_size = csv_export.DEF_BATCH_SIZE
+    csv_export.DEF_BATCH_SIZE = 2
+
+  def tearDown(self):
+    csv_export.DEF_BATCH_SIZE = self.old_batch_size
+
+  def start(self):
+    return csv_export_logic.startExport('export', user_logic, {},
+                                        KEY_ORDER, 'users.csv')
+
+  def getTasks(self):
+    stub = apiproxy_stub_map.apiproxy.GetStub('taskqueue')
+    return stub.GetTasks('default')
+
+  def getExport(self):
+    request_scope.flush()
+    return csv_export_logic.getFromKeyName('export')
+
+  def testBuild(self):
+    """Test that the export contains every entity once, in key order.
+    """
+
+    entity = self.start()
+
+    self.assertEqual('running', entity.status)
+    self.assertEqual([csv_export.DEF_BUILD_TASK_URL],
+                     [i['url'] for i in self.getTasks()])
+
+    batches = 1
+    while csv_export_logic.buildBatch('export'):
+      batches += 1
+
+    entity = self.getExport()
+    self.assertEqual(3, batches)
+    self.assertEqual('completed', entity.status)
+
+    lines = ''.join(csv_export_logic.iterateChunks(entity)).splitlines()
+    self.assertEqual(['link_id,name'] +
+                     ['export_%d,User %d' % (i, i) for i in range(5)], lines)
+
+  def testStaleSnapshot(self):
+    """Test that a batch is not stored twice for the same export.
+    """
+
+    self.start()
+
+    get_by_key_name = CSVExport.get_by_key_name
+    snapshot = CSVExport.get_by_key_name('export')
+
+    # another task stores the first batch while this one is exporting it
+    csv_export_logic.buildBatch('export')
+
+    CSVExport.get_by_key_name = classmethod(lambda cls, key_name: snapshot)
+
+    try:
+      self.assertFalse(csv_export_logic.buildBatch('export'))
+    finally:
+      CSVExport.get_by_key_name = get_by_key_name
+
+    self.assertEqual(1, self.getExport().chunks)
+
+  def testRestart(self):
+    """Test that exports without progress are restarted.
+    """
+
+    self.start()
+    csv_export_logic.buildBatch('export')
+
+    request_scope.flush()
+    self.assertEqual(1, self.start().chunks)
+
+    entity = self.getExport()
+    entity.last_modified_on = datetime.datetime.now() - \
+        csv_export.DEF_EXPORT_TIMEOUT - datetime.timedelta(minutes=1)
+    # a plain put would set last_modified_on to now
+    CSVExport.last_modified_on.auto_now = False
+
+    try:
+      entity.put()
+    finally:
+      CSVExport.last_modified_on.auto_now = True
+
+    request_scope.flush()
+    entity = self.start()
+
+    self.assertEqual('running', entity.status)
+    self.assertEqual(0, entity.chunks)
+    self.assertEqual(2, len(self.getTasks()))
+
+  def testBuildTask(self):
+    """Test that the build task completes the export.
+    """
+
+    self.start()
+
+    request = http.HttpRequest()
+    request.POST['export_key'] = 'export'
+
+    response = csv_export_tasks.buildExport(request)
+
+    self.assertEqual(200, response.status_code)
+    self.assertEqual('completed', self.getExport().status)
+    self.assertEqual(3, self.getExport().chunks)
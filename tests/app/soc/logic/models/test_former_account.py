@@ -0,0 +1,117 @@
+#!/usr/bin/python2.5
+#
+# Copyright 2009 the Melange authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+__authors__ = [
+  '"Sverre Rabbelier" <sverre@rabbelier.nl>',
+  ]
+
+
+import unittest
+
+from google.appengine.api import apiproxy_stub_map
+from google.appengine.api import users
+
+from soc.logic.models import former_account
+from soc.logic.models.former_account import logic as former_account_logic
+from soc.logic.models.user import logic as user_logic
+from soc.models.user import User
+
+
+def _createUser(link_id, email, former_accounts=None):
+  """Stores and returns a User without running the creation hooks.
+  """
+
+  entity = User(key_name=link_id, link_id=link_id, name=link_id,
+                account=users.User(email=email),
+                former_accounts=former_accounts or [])
+  entity.put()
+
+  return entity
+
+
+class FormerAccountTest(unittest.TestCase):
+  """Tests related to the FormerAccount index.
+  """
+
+  def tearDown(self):
+    former_account_logic._indexed = False
+
+  def getTaskURLs(self):
+    stub = apiproxy_stub_map.apiproxy.GetStub('taskqueue')
+    return [i['url'] for i in stub.GetTasks('default')]
+
+  def testAccountChange(self):
+    """Test that changing the account of a user indexes the old account.
+    """
+
+    entity = _createUser('former_user', 'former@example.com')
+
+    former = users.User(email='former@example.com')
+    self.failIf(user_logic.isFormerAccount(former))
+
+    properties = {'account': users.User(email='new@example.com')}
+    entity = user_logic.updateEntityProperties(entity, properties)
+
+    self.failUnlessEqual([former], entity.former_accounts)
+    self.failUnless(user_logic.isFormerAccount(former))
+    self.failUnless(user_logic.isFormerAccount(
+        users.User(email='FORMER@example.com')))
+    self.failIf(user_logic.isFormerAccount(entity.account))
+
+  def testIndexBatch(self):
+    """Test that the migration indexes the former accounts of all users.
+    """
+
+    for i in range(3):
+      former = users.User(email='indexed%d@example.com' % i)
+      _createUser('indexed_%d' % i, 'current%d@example.com' % i, [former])
+
+    # not indexed yet, found by scanning the users and starting the index
+    self.failIf(former_account_logic.isIndexed())
+    self.failUnless(user_logic.isFormerAccount(former))
+    self.failUnlessEqual([former_account.DEF_INDEX_TASK_URL],
+                         self.getTaskURLs())
+
+    old_batch_size = former_account.DEF_BATCH_SIZE
+    former_account.DEF_BATCH_SIZE = 2
+
+    try:
+      start_key = former_account_logic.indexBatch()
+      self.failIfEqual(None, start_key)
+
+      while start_key:
+        start_key = former_account_logic.indexBatch(start_key=start_key)
+    finally:
+      former_account.DEF_BATCH_SIZE = old_batch_size
+
+    self.failUnless(former_account_logic.isIndexed())
+
+    for i in range(3):
+      self.failUnless(user_logic.isFormerAccount(
+          users.User(email='indexed%d@example.com' % i)))
+
+  def testNoScanWhenIndexed(self):
+    """Test that users are not scanned once the index is complete.
+    """
+
+    former_account_logic.indexBatch()
+
+    former = users.User(email='unindexed@example.com')
+    _createUser('unindexed', 'current@example.com', [former])
+
+    self.failIf(user_logic.isFormerAccount(former))
+    self.failUnlessEqual([], self.getTaskURLs())
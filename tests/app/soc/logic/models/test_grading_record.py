@@ -0,0 +1,102 @@
+#!/usr/bin/python2.5
+#
+# Copyright 2009 the Melange authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+__authors__ = [
+  '"Sverre Rabbelier" <sverre@rabbelier.nl>',
+  ]
+
+
+import unittest
+
+from google.appengine.api import apiproxy_stub_map
+from google.appengine.ext import db
+
+from soc.cache import request_scope
+from soc.logic.models import grading_record
+from soc.logic.models.grading_record import logic as grading_record_logic
+from soc.logic.models.survey_record import project_logic
+from soc.models.project_survey_record import ProjectSurveyRecord
+
+
+class RecordsByProjectTest(unittest.TestCase):
+  """Tests for retrieving the SurveyRecords of a batch of projects.
+  """
+
+  def setUp(self):
+    self.survey = db.Key.from_path('ProjectSurvey', 'survey')
+    other_survey = db.Key.from_path('ProjectSurvey', 'other')
+    user = db.Key.from_path('User', 'user')
+
+    self.projects = [db.Key.from_path('StudentProject', 'project%d' % i)
+                     for i in range(5)]
+
+    records = [ProjectSurveyRecord(survey=self.survey, user=user, project=i)
+               for i in self.projects]
+    records += [ProjectSurveyRecord(survey=other_survey, user=user,
+                                    project=i) for i in self.projects[:2]]
+    db.put(records)
+
+    self.old_max_in_values = grading_record.DEF_MAX_IN_VALUES
+    grading_record.DEF_MAX_IN_VALUES = 2
+
+    self.read = 0
+    self.make_sync_call = apiproxy_stub_map.MakeSyncCall
+
+    def makeSyncCall(service, call, request, response):
+      self.make_sync_call(service, call, request, response)
+      if call in ['RunQuery', 'Next']:
+        self.read += response.result_size()
+
+    apiproxy_stub_map.MakeSyncCall = makeSyncCall
+
+  def tearDown(self):
+    apiproxy_stub_map.MakeSyncCall = self.make_sync_call
+    grading_record.DEF_MAX_IN_VALUES = self.old_max_in_values
+
+    db.delete(ProjectSurveyRecord.all(keys_only=True).fetch(100))
+    request_scope.flush()
+
+  def getRecords(self, project_keys):
+    self.read = 0
+    return grading_record_logic._getRecordsByProject(
+        project_logic, {'survey': self.survey}, project_keys)
+
+  def testRecords(self):
+    """Test that only the records of the survey and projects are returned.
+    """
+
+    result = self.getRecords(self.projects[1:4])
+
+    self.assertEqual(set(self.projects[1:4]), set(result.keys()))
+
+    for project_key, record in result.iteritems():
+      self.assertEqual(project_key,
+                       ProjectSurveyRecord.project.get_value_for_datastore(
+                           record))
+      self.assertEqual(self.survey,
+                       ProjectSurveyRecord.survey.get_value_for_datastore(
+                           record))
+
+  def testReads(self):
+    """Test that only the records of the given projects are read.
+    """
+
+    self.getRecords(self.projects[:1])
+    self.assertEqual(1, self.read)
+
+    self.getRecords(self.projects[2:5])
+    self.assertEqual(3, self.read)
@@ -20,15 +20,23 @@ __authors__ = [
   ]
 
 
+import cgi
 import unittest
 
 from google.appengine.api import users
 
+from django.conf import settings
+
 from soc.models import news_feed
 from soc.logic.models.document import logic as document_logic
 from soc.logic.models.news_feed import logic as news_feed_logic
 from soc.logic.models.site import logic as site_logic
 from soc.logic.models.user import logic as user_logic
+from soc.logic.models import news_feed as news_feed_module
+from soc.tasks import news_feed as news_feed_tasks
+
+from tests.app.soc.models.test_model import TestModel
+from tests.pymox import stubout
 
 
 class FeedItemTest(unittest.TestCase):
@@ -87,3 +95,130 @@ class FeedItemTest(unittest.TestCase):
     self.failUnlessEqual(document_feed[0].sender, self.document)
     self.failUnlessEqual(document_feed[0].receivers[0], self.site)
     self.failUnlessEqual(document_feed[0].user, self.user)
+
+
+class FeedTimelineTest(unittest.TestCase):
+  """Tests related to the precomputed news feed timelines.
+  """
+
+  def setUp(self):
+    """Creates a receiver and a few FeedItems in the order they happened.
+    """
+
+    self.receiver = TestModel(key_name='receiver')
+    self.receiver.put()
+    self.items = []
+
+    # reading the empty feed starts the timeline
+    news_feed_logic.retrieveFeed(self.receiver)
+
+    for i in range(3):
+      item = news_feed.FeedItem(key_name='item_%d' % i,
+                                sender=self.receiver.key(),
+                                receivers=[self.receiver.key()],
+                                update_type='updated')
+      item.put()
+      self.items.append(item)
+
+  def testTimelineOrder(self):
+    """Test that the newest item comes first and items are not repeated.
+    """
+
+    for item in self.items + self.items[-1:]:
+      news_feed_logic.addToTimelines(item, [self.receiver.key()])
+
+    feed = news_feed_logic.retrieveFeed(self.receiver)
+    expected = [i.key() for i in reversed(self.items)]
+    self.failUnlessEqual(expected, [i.key() for i in feed])
+
+  def testTimelineIsBounded(self):
+    """Test that the timeline only keeps the most recent items.
+    """
+
+    old_size = news_feed_module.DEF_TIMELINE_SIZE
+    news_feed_module.DEF_TIMELINE_SIZE = 2
+
+    try:
+      for item in self.items:
+        news_feed_logic.addToTimelines(item, [self.receiver.key()])
+    finally:
+      news_feed_module.DEF_TIMELINE_SIZE = old_size
+
+    timeline = news_feed.FeedTimeline.get_by_key_name(
+        str(self.receiver.key()))
+    expected = [i.key() for i in reversed(self.items[1:])]
+    self.failUnlessEqual(expected, timeline.items)
+
+  def testTimelineStartedOnRead(self):
+    """Test that a timeline is started with the existing items when read.
+    """
+
+    receiver = TestModel(key_name='new_receiver')
+    receiver.put()
+
+    for item in self.items:
+      item.receivers.append(receiver.key())
+      item.put()
+      news_feed_logic.addToTimelines(item, [receiver.key()])
+
+    self.failUnlessEqual(None, news_feed.FeedTimeline.get_by_key_name(
+        str(receiver.key())))
+
+    expected = [i.key() for i in reversed(self.items)]
+    feed = news_feed_logic.retrieveFeed(receiver)
+    self.failUnlessEqual(expected, [i.key() for i in feed])
+
+    timeline = news_feed.FeedTimeline.get_by_key_name(str(receiver.key()))
+    self.failUnlessEqual(expected, timeline.items)
+
+
+class Response(object):
+  """Mocker for a urlfetch response.
+  """
+
+  status_code = 204
+  content = ''
+
+
+class HubNotificationTest(unittest.TestCase):
+  """Tests related to pinging the PubSubHubbub hub.
+  """
+
+  def setUp(self):
+    """Points the hub to a local stand-in that records the requests.
+    """
+
+    self.requests = []
+
+    def fetch(url, **kwargs):
+      """Records the request instead of sending it.
+      """
+      self.requests.append((url, cgi.parse_qs(kwargs['payload'])))
+      return Response()
+
+    self.stubout = stubout.StubOutForTesting()
+    self.stubout.Set(news_feed_tasks.urlfetch, 'fetch', fetch)
+    self.stubout.Set(settings, 'NEWS_FEED_HUB_URL', 'http://hub.local/')
+
+  def tearDown(self):
+    """Restores the hub.
+    """
+
+    self.stubout.UnsetAll()
+
+  def testBatchedPublish(self):
+    """Test that all feeds are published in a single request.
+    """
+
+    receivers = [TestModel(key_name='receiver_%d' % i) for i in range(3)]
+    for receiver in receivers:
+      receiver.put()
+
+    news_feed_tasks.sendHubNotifications(receivers)
+
+    self.failUnlessEqual(1, len(self.requests))
+
+    url, params = self.requests[0]
+    self.failUnlessEqual('http://hub.local/', url)
+    self.failUnlessEqual(['publish'], params['hub.mode'])
+    self.failUnlessEqual(3, len(params['hub.url']))
@@ -0,0 +1,125 @@
+#!/usr/bin/python2.5
+#
+# Copyright 2009 the Melange authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+__authors__ = [
+  '"Sverre Rabbelier" <sverre@rabbelier.nl>',
+  ]
+
+
+import unittest
+
+from google.appengine.api import apiproxy_stub_map
+from google.appengine.ext import db
+
+from soc.logic.models.org_map import logic as org_map_logic
+
+
+class _Entity(object):
+  """Stand-in for a StudentProject, Student or Mentor entity.
+  """
+
+  def __init__(self, key_name, title=None, name=None, publish_location=True):
+    self._key = db.Key.from_path('Entity', key_name)
+    self.title = title
+    self._name = name
+    self.publish_location = publish_location
+    self.latitude = 1.0
+    self.longitude = 2.0
+
+  def key(self):
+    return self._key
+
+  def name(self):
+    return self._name
+
+
+class OrgMapTest(unittest.TestCase):
+  """Tests related to the OrgMap logic.
+  """
+
+  def setUp(self):
+    self.student = _Entity('program/student', name='Student')
+    self.mentor = _Entity('program/org/mentor', name='Mentor',
+                          publish_location=False)
+    self.project = _Entity('program/org/project', title='Project')
+    self.data = {'people': {}, 'projects': {}}
+
+  def testAddProject(self):
+    """Test that only roles that publish their location are added.
+    """
+
+    org_map_logic._addProject(self.data, self.project, self.student,
+                              self.mentor)
+
+    project = self.data['projects']['program/org/project']
+    self.assertEqual('Project', project['title'])
+    self.assertEqual('Mentor', project['mentor_name'])
+
+    self.assertEqual(['program/student'], self.data['people'].keys())
+    self.assertEqual(['program/org/project'],
+                     self.data['people']['program/student']['projects'])
+
+    # adding the project again replaces it
+    org_map_logic._addProject(self.data, self.project, self.student,
+                              self.mentor)
+    self.assertEqual(['program/org/project'],
+                     self.data['people']['program/student']['projects'])
+
+  def testRemoveProject(self):
+    """Test that people without projects are removed from the map.
+    """
+
+    org_map_logic._addProject(self.data, self.project, self.student,
+                              self.mentor)
+    org_map_logic._removeProject(self.data, 'program/org/project')
+
+    self.assertEqual({'people': {}, 'projects': {}}, self.data)
+
+  def testUpdateRole(self):
+    """Test that role changes update both the projects and the people.
+    """
+
+    org_map_logic._addProject(self.data, self.project, self.student,
+                              self.mentor)
+
+    self.mentor._name = 'New Mentor'
+    self.mentor.publish_location = True
+    org_map_logic._updateRole(self.data, self.mentor, 'mentor')
+
+    self.assertEqual('New Mentor',
+                     self.data['projects']['program/org/project']['mentor_name'])
+    self.assertEqual('mentor',
+                     self.data['people']['program/org/mentor']['type'])
+
+    self.student.publish_location = False
+    org_map_logic._updateRole(self.data, self.student, 'student')
+
+    self.assertFalse('program/student' in self.data['people'])
+
+  def testMissingMapIsBuiltByTask(self):
+    """Test that a missing map is built by a task instead of the request.
+    """
+
+    org = _Entity('program/org')
+
+    self.assertEqual({'people': {}, 'projects': {}},
+                     org_map_logic.getMapData(org))
+    self.assertEqual(None, org_map_logic.getFromKeyName('program/org'))
+
+    stub = apiproxy_stub_map.apiproxy.GetStub('taskqueue')
+    tasks = stub.GetTasks('default')
+    self.assertEqual(['/tasks/org_map/rebuild'], [i['url'] for i in tasks])
@@ -0,0 +1,155 @@
+#!/usr/bin/python2.5
+#
+# Copyright 2009 the Melange authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+__authors__ = [
+  '"Sverre Rabbelier" <sverre@rabbelier.nl>',
+  ]
+
+
+
+import datetime
+import pickle
+import unittest
+
+from google.appengine.api.labs import taskqueue
+from google.appengine.ext import db
+
+from soc.logic.models import outbox_message
+from soc.logic.models.outbox_message import logic as outbox_logic
+from soc.models.outbox_message import OutboxMessage
+
+
+class OutboxMessageTest(unittest.TestCase):
+  """Tests related to sending the messages in the outbox.
+  """
+
+  def setUp(self):
+    """Clear the outbox.
+    """
+
+    db.delete(OutboxMessage.all(keys_only=True).fetch(1000))
+
+  def queue(self, **context):
+    """Stores an OutboxMessage for the given context.
+    """
+
+    entity = OutboxMessage(context=db.Blob(pickle.dumps(context, 2)))
+    entity.put()
+    return entity
+
+  def testSendBatch(self):
+    """Test that sent messages are removed from the outbox.
+    """
+
+    for i in range(3):
+      self.queue(sender='test@example.com', to='to%d@example.com' % i,
+                 subject='subject', body='body')
+
+    sent, more, next_delay = outbox_logic.sendBatch(batch_size=2)
+    self.assertEqual((2, True, 0), (sent, more, next_delay))
+
+    sent, more, next_delay = outbox_logic.sendBatch(batch_size=2)
+    self.assertEqual((1, False, None), (sent, more, next_delay))
+
+    self.assertEqual(0, OutboxMessage.all().count())
+
+  def testInvalidMessageFails(self):
+    """Test that a message without recipients is not retried.
+    """
+
+    self.queue(sender='test@example.com', subject='subject', body='body')
+
+    sent, _, next_delay = outbox_logic.sendBatch()
+    self.assertEqual((0, None), (sent, next_delay))
+
+    entity = OutboxMessage.all().get()
+    self.assertEqual('failed', entity.status)
+    self.assertEqual(1, entity.attempts)
+
+  def testSentMessagesAreDeletedRightAway(self):
+    """Test that a failing send does not keep the earlier messages around.
+    """
+
+    for i in range(2):
+      self.queue(sender='test@example.com', to='to%d@example.com' % i,
+                 subject='subject', body='body')
+
+    send = outbox_logic._send
+    contexts = []
+
+    def sendOnce(context):
+      if contexts:
+        raise RuntimeError('the task died')
+      contexts.append(context)
+      return send(context)
+
+    outbox_logic._send = sendOnce
+
+    try:
+      self.assertRaises(RuntimeError, outbox_logic.sendBatch)
+    finally:
+      outbox_logic._send = send
+
+    entities = OutboxMessage.all().fetch(10)
+    self.assertEqual(1, len(entities))
+    self.assertNotEqual(contexts[0], pickle.loads(entities[0].context))
+
+  def testLeasedMessage(self):
+    """Test that a leased message is sent once its lease ends.
+    """
+
+    entity = self.queue(sender='test@example.com', to='to@example.com',
+                        subject='subject', body='body')
+    entity.next_attempt = datetime.datetime.now() + outbox_message.DEF_LEASE
+    entity.put()
+
+    sent, more, next_delay = outbox_logic.sendBatch()
+
+    self.assertEqual((0, False), (sent, more))
+    self.assertTrue(0 < next_delay <= outbox_message.DEF_LEASE.seconds + 1)
+
+  def testRetryDelay(self):
+    """Test that the delay between attempts doubles up to the maximum.
+    """
+
+    delays = [outbox_logic.getRetryDelay(i) for i in range(1, 9)]
+    self.assertEqual([60, 120, 240, 480, 960, 1920, 3600, 3600], delays)
+
+  def testScheduleSendingOncePerWindow(self):
+    """Test that requests within one window share a single task.
+    """
+
+    task_names = []
+    add = taskqueue.Task.add
+
+    def addOnce(task, queue_name):
+      # the task queue stub does not reject duplicate names
+      if task.name in task_names:
+        raise taskqueue.TaskAlreadyExistsError()
+      task_names.append(task.name)
+
+    taskqueue.Task.add = addOnce
+
+    try:
+      outbox_logic.scheduleSending()
+      outbox_logic.scheduleSending()
+      outbox_logic.scheduleSending(
+          countdown=outbox_message.DEF_SEND_WINDOW * 3)
+    finally:
+      taskqueue.Task.add = add
+
+    self.assertEqual(2, len(task_names))
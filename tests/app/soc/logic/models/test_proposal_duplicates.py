@@ -0,0 +1,79 @@
+#!/usr/bin/python2.5
+#
+# Copyright 2009 the Melange authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+__authors__ = [
+  '"Sverre Rabbelier" <sverre@rabbelier.nl>',
+  ]
+
+
+import unittest
+
+from soc.logic.models.proposal_duplicates import logic as duplicates_logic
+
+
+def _proposal(key_name, student_key, org_key):
+  """Returns the assignment data for a single proposal.
+  """
+
+  return {'key_name': key_name,
+          'proposal_title': 'Title of %s' % key_name,
+          'student_key': student_key,
+          'student_name': 'Name of %s' % student_key,
+          'student_contact': '%s@example.com' % student_key,
+          'org_key': org_key,
+          }
+
+
+class ProposalDuplicatesTest(unittest.TestCase):
+  """Tests related to the ProposalDuplicates logic.
+  """
+
+  def testKeyNameForProgram(self):
+    """Test that the key name matches the one derived from the key fields.
+    """
+
+    fields = {'scope_path': 'sponsor/program', 'link_id': 'program'}
+
+    self.assertEqual(duplicates_logic.getKeyNameFromFields(fields),
+                     duplicates_logic.getKeyNameForProgram('sponsor/program'))
+
+  def testBuildRepresentation(self):
+    """Test that only students with multiple assigned proposals are listed.
+    """
+
+    assigned = {
+        'org_a': {'org': {'name': 'A'},
+                  'proposals': [_proposal('p1', 'student1', 'org_a'),
+                                _proposal('p2', 'student2', 'org_a')]},
+        'org_b': {'org': {'name': 'B'},
+                  'proposals': [_proposal('p3', 'student1', 'org_b')]},
+        }
+
+    result = duplicates_logic.buildRepresentation(assigned, in_progress=True)
+
+    self.assertEqual(assigned, result['assigned'])
+    self.assertTrue(result['in_progress'])
+    self.assertEqual({'org_a': {'name': 'A'}, 'org_b': {'name': 'B'}},
+                     result['data']['orgs'])
+
+    students = result['data']['students']
+    self.assertEqual(['student1'], students.keys())
+    self.assertEqual('student1@example.com', students['student1']['contact'])
+
+    proposals = sorted(i['proposal_key']
+                       for i in students['student1']['proposals'])
+    self.assertEqual(['p1', 'p3'], proposals)
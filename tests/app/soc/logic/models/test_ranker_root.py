@@ -0,0 +1,121 @@
+#!/usr/bin/python2.5
+#
+# Copyright 2009 the Melange authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+__authors__ = [
+  '"Sverre Rabbelier" <sverre@rabbelier.nl>',
+  ]
+
+
+
+import unittest
+
+from ranklist.ranker import Ranker
+
+from soc.logic.models.ranker_root import logic as ranker_root_logic
+from soc.models.ranker_root import PendingScore
+from soc.models.ranker_root import RankerRoot
+
+
+class RankerRootTest(unittest.TestCase):
+  """Tests related to the RankerRoot logic.
+  """
+
+  def setUp(self):
+    """Set up a RankerRoot for the test organization.
+    """
+
+    ranker = Ranker.Create([0, 1000], 100)
+
+    RankerRoot(key_name='test_org/test_ranker', link_id='test_ranker',
+               scope_path='test_org', root=ranker.rootkey).put()
+
+    self.ranker_key = 'test_org/test_ranker'
+
+  def testGetRanker(self):
+    """Test that the Ranker is retrieved by the RankerRoot key fields.
+    """
+
+    ranker = ranker_root_logic.getRanker('test_org', 'test_ranker')
+    self.assertTrue(ranker)
+    self.assertEqual(None, ranker_root_logic.getRanker('test_org', 'none'))
+
+  def testApplyPendingScores(self):
+    """Test that all PendingScores are applied at once and then removed.
+    """
+
+    for name, value in [('a', [10]), ('b', [20]), ('c', [30])]:
+      PendingScore(key_name='%s/%s' % (self.ranker_key, name),
+                   ranker_root=self.ranker_key, name=name, value=value).put()
+
+    self.assertFalse(ranker_root_logic.applyPendingScores(self.ranker_key))
+    self.assertEqual(0, PendingScore.all().count())
+
+    ranker = ranker_root_logic.getRanker('test_org', 'test_ranker')
+    self.assertEqual(3, ranker.TotalRankedScores())
+
+    ranks = ranker.FindRanksForNames(['a', 'b', 'c', 'd'])
+    self.assertEqual({'a': 2, 'b': 1, 'c': 0, 'd': None}, ranks)
+
+  def testApplyPendingScoresChanged(self):
+    """Test that a PendingScore changed while it is applied is kept.
+    """
+
+    key_name = '%s/a' % self.ranker_key
+
+    PendingScore(key_name=key_name, ranker_root=self.ranker_key,
+                 name='a', value=[10]).put()
+
+    set_scores = Ranker.SetScores
+
+    def changeAndSetScores(ranker, scores):
+      PendingScore(key_name=key_name, ranker_root=self.ranker_key,
+                   name='a', value=[40]).put()
+      set_scores(ranker, scores)
+
+    Ranker.SetScores = changeAndSetScores
+
+    try:
+      ranker_root_logic.applyPendingScores(self.ranker_key)
+    finally:
+      Ranker.SetScores = set_scores
+
+    self.assertEqual([40], PendingScore.get_by_key_name(key_name).value)
+
+  def testApplyPendingScoresRemoval(self):
+    """Test that an empty PendingScore removes the score from the Ranker.
+    """
+
+    ranker = ranker_root_logic.getRanker('test_org', 'test_ranker')
+    ranker.SetScores({'a': [10], 'b': [20]})
+
+    PendingScore(key_name='%s/a' % self.ranker_key,
+                 ranker_root=self.ranker_key, name='a', value=[]).put()
+
+    ranker_root_logic.applyPendingScores(self.ranker_key)
+
+    self.assertEqual(1, ranker.TotalRankedScores())
+    self.assertEqual({'a': None, 'b': 0}, ranker.FindRanksForNames(['a', 'b']))
+
+  def testApplyPendingScoresMissingRoot(self):
+    """Test that the PendingScores of a missing RankerRoot are deleted.
+    """
+
+    PendingScore(key_name='test_org/none/a', ranker_root='test_org/none',
+                 name='a', value=[10]).put()
+
+    self.assertFalse(ranker_root_logic.applyPendingScores('test_org/none'))
+    self.assertEqual(0, PendingScore.all().count())
@@ -20,6 +20,7 @@ __authors__ = [
   ]
 
 
+import random
 import unittest
 
 from soc.logic import allocations
@@ -157,3 +158,109 @@ class AllocationsTest(unittest.TestCase):
 
     result = self.allocater.allocate(locked_slots)
     self.failUnlessEqual(locked_slots, result)
+
+
+class LargestRemainderAllocationsTest(AllocationsTest):
+  """Runs the slot allocation tests against the largest remainder algorithm.
+  """
+
+  def setUp(self):
+    """Set up required for the slot allocation tests.
+    """
+
+    super(LargestRemainderAllocationsTest, self).setUp()
+
+    self.algorithm = 3
+    self.allocater = allocations.Allocator(
+        self.orgs, self.popularity, self.mentors, self.slots,
+        self.max_slots_per_org, self.min_slots_per_org, self.algorithm)
+
+
+class AllocationsPropertyTest(unittest.TestCase):
+  """Checks the invariants of the largest remainder algorithm against the
+  reliable algorithm on randomly generated programs.
+  """
+
+  def setUp(self):
+    """Set up a random generator with a fixed seed so that runs repeat.
+    """
+
+    self.random = random.Random(1337)
+
+  def generate(self):
+    """Returns the Allocator arguments and locked slots of a random program.
+    """
+
+    rand = self.random
+
+    orgs = ['org_%d' % i for i in range(rand.randint(1, 40))]
+    popularity = dict([(i, rand.randint(0, 100)) for i in orgs])
+    mentors = dict([(i, rand.randint(0, 30)) for i in orgs])
+
+    # the reliable algorithm only terminates if no org can have more
+    # mentors than slots per org
+    max_slots_per_org = rand.randint(max(mentors.values()), 40)
+    min_slots_per_org = rand.randint(0, 3)
+    slots = rand.randint(0, 500)
+
+    locked = rand.sample(orgs, rand.randint(0, len(orgs) / 2))
+    locked_slots = dict([(i, rand.randint(0, 20)) for i in locked])
+
+    args = (orgs, popularity, mentors, slots,
+            max_slots_per_org, min_slots_per_org)
+
+    return args, locked_slots
+
+  def allocate(self, args, locked_slots, algorithm):
+    """Returns the allocator and the allocation for the given algorithm.
+    """
+
+    allocator = allocations.Allocator(*(args + (algorithm,)))
+    return allocator, allocator.allocate(locked_slots.copy())
+
+  def testInvariants(self):
+    """Test that both algorithms agree on bounds, locks and totals.
+    """
+
+    for _ in range(300):
+      args, locked_slots = self.generate()
+
+      _, expected = self.allocate(args, locked_slots, 2)
+      allocator, actual = self.allocate(args, locked_slots, 3)
+
+      self.failUnlessEqual(set(expected.keys()), set(actual.keys()))
+      self.failUnlessEqual(sum(expected.values()), sum(actual.values()))
+
+      if not sum(allocator.popularity.values()):
+        continue
+
+      for org, slots in actual.iteritems():
+        if org in locked_slots:
+          self.failUnlessEqual(
+              allocator.rangeSlots(locked_slots[org], org), slots)
+        else:
+          self.failIf(slots < allocator.rangeSlots(0, org))
+          self.failIf(slots > allocator.maxSlots(org))
+
+  def testExactQuotas(self):
+    """Test that without bounds every org gets its quota rounded up or down.
+    """
+
+    for _ in range(300):
+      args, _ = self.generate()
+      orgs, popularity, _, slots, _, _ = args
+
+      total_popularity = sum(popularity.values())
+      if not total_popularity:
+        continue
+
+      mentors = dict([(i, slots) for i in orgs])
+      args = (orgs, popularity, mentors, slots, slots, 0)
+
+      _, actual = self.allocate(args, {}, 3)
+
+      self.failUnlessEqual(slots, sum(actual.values()))
+
+      for org, count in actual.iteritems():
+        quota = float(popularity[org] * slots) / total_popularity
+        self.failUnless(abs(count - quota) < 1)
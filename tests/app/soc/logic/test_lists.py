@@ -0,0 +1,89 @@
+#!/usr/bin/python2.5
+#
+# Copyright 2009 the Melange authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+__authors__ = [
+  '"Sverre Rabbelier" <sverre@rabbelier.nl>',
+  ]
+
+
+import unittest
+
+from soc.logic import lists
+
+
+def getRedirect(entity, params):
+  """Simple redirect that returns the entity with the params appended.
+  """
+
+  return '%s%s' % (entity, params)
+
+
+class ListsTest(unittest.TestCase):
+  """Tests related to iterating over lists in templates.
+  """
+
+  def setUp(self):
+    """Set up two lists the way the list templates use them.
+    """
+
+    self.contents = [
+        {'data': ['a', 'b', 'c'], 'main': 'main_0', 'row': 'row_0',
+         'action': (getRedirect, '!'), 'idx': 0},
+        {'data': [], 'main': 'main_1', 'row': 'row_1', 'idx': 1},
+        ]
+
+    self.lists = lists.Lists(self.contents)
+
+  def testEmpty(self):
+    """Test that only a Lists without contents is empty.
+    """
+
+    self.assertFalse(self.lists.empty())
+    self.assertTrue(lists.Lists([]).empty())
+
+  def testIterate(self):
+    """Test that all rows of all lists are visited in order.
+    """
+
+    visited = []
+
+    for _ in self.lists.lists():
+      main = self.lists.nextList()
+      for _ in self.lists.rows():
+        row = self.lists.nextRow()
+        visited.append((main, row, self.lists.item(), self.lists.redirect()))
+
+    expected = [('main_0', 'row_0', 'a', 'a!'),
+                ('main_0', 'row_0', 'b', 'b!'),
+                ('main_0', 'row_0', 'c', 'c!')]
+    self.assertEqual(expected, visited)
+
+    # the contents are not consumed
+    self.assertEqual(['a', 'b', 'c'], self.contents[0]['data'])
+
+  def testPassthrough(self):
+    """Test that passthrough fields are read from the current list.
+    """
+
+    self.lists.nextList()
+    self.assertEqual(0, self.lists.idx)
+    self.assertEqual("", self.lists.info())
+
+    self.lists.nextList()
+    self.assertEqual(1, self.lists.idx)
+    self.assertFalse(self.lists.rows())
+    self.assertRaises(AttributeError, getattr, self.lists, 'prev')
+    self.assertRaises(AttributeError, getattr, self.lists, 'data')
@@ -0,0 +1,81 @@
+#!/usr/bin/python2.5
+#
+# Copyright 2009 the Melange authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+__authors__ = [
+  '"Sverre Rabbelier" <sverre@rabbelier.nl>',
+  ]
+
+
+import unittest
+
+from soc.models import survey
+from soc.models.survey import SurveyContent
+
+
+class SchemaTest(unittest.TestCase):
+  """Tests for parsing and caching of the SurveyContent schema.
+  """
+
+  def setUp(self):
+    survey._schema_cache.clear()
+
+    self.schema = {
+        'first': {'index': 0, 'type': 'short_answer', 'required': True,
+                  'has_comment': False, 'question': u'First?'},
+        'second': {'index': 1, 'type': 'pick_multi', 'required': False,
+                   'has_comment': True, 'order': ['a', 'b'], 'render': None},
+        }
+
+  def testParseSchema(self):
+    """Test that a stored schema is parsed back into the same dictionary.
+    """
+
+    self.assertEqual(survey.parseSchema(str(self.schema)), self.schema)
+    self.assertEqual(survey.parseSchema(''), {})
+    self.assertEqual(survey.parseSchema("{'a': (-1, 2.5)}"), {'a': (-1, 2.5)})
+
+  def testParseSchemaRejectsExpressions(self):
+    """Test that anything but a dictionary literal is rejected.
+    """
+
+    for schema in ["__import__('os').getcwd()", "{'a': open('x')}",
+                   "{'a': ().__class__}", "[1, 2]", "{'a': 1 + 1}", "{'a'"]:
+      self.assertRaises(survey.SchemaError, survey.parseSchema, schema)
+
+  def testSchemaIsParsedOncePerVersion(self):
+    """Test that the parsed schema is shared until the schema changes.
+    """
+
+    content = SurveyContent(schema=str(self.schema), first='',
+                            second=['a', 'b'])
+    content.put()
+
+    order = content.getSurveyOrder()
+    self.assertEqual(order, {0: 'first', 1: 'second'})
+    self.assertEqual(content.orderedProperties(), ['first', 'second'])
+
+    first = SurveyContent.get(content.key())
+    second = SurveyContent.get(content.key())
+    self.failUnless(first.getSchema() is second.getSchema())
+
+    # the order is returned as a copy
+    order[5] = 'changed'
+    self.assertEqual(content.getSurveyOrder(), {0: 'first', 1: 'second'})
+
+    self.schema['first']['index'] = 2
+    content.schema = str(self.schema)
+    self.assertEqual(content.getSurveyOrder(), {1: 'second', 2: 'first'})
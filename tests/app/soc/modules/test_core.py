@@ -0,0 +1,131 @@
+#!/usr/bin/python2.5
+#
+# Copyright 2009 the Melange authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+__authors__ = [
+  '"Sverre Rabbelier" <sverre@rabbelier.nl>',
+  ]
+
+
+import new
+import sys
+import unittest
+
+from google.appengine.api import memcache
+
+from django.core import urlresolvers
+
+from soc.modules import core
+
+
+MODULE_NAME = 'test_core_lazy_view'
+
+
+class View(object):
+  """Minimal view that records which of its methods were called.
+  """
+
+  def __init__(self):
+    self.calls = []
+
+  def getDjangoURLPatterns(self):
+    self.calls.append('patterns')
+    return [(r'^thing/show$', MODULE_NAME + '.show', {}, 'show'),
+            (r'^thing_other$', MODULE_NAME + '.other', {}, 'other')]
+
+  def getSidebarSkeleton(self):
+    self.calls.append('skeleton')
+    return [{'heading': 'Thing', 'group': 'Things', 'rights': object(),
+             'items': [('/thing/show', 'Show thing', 'show')]}]
+
+
+def show(request):
+  """View function of the test module.
+  """
+
+  pass
+
+
+class LazyTest(unittest.TestCase):
+  """Tests for the lazily imported views of the Core.
+  """
+
+  def setUp(self):
+    self.module = new.module(MODULE_NAME)
+    self.module.view = View()
+    self.module.show = show
+    sys.modules[MODULE_NAME] = self.module
+
+  def tearDown(self):
+    del sys.modules[MODULE_NAME]
+    core.SIDEBAR_SKELETONS.clear()
+    memcache.flush_all()
+
+  def testResolverMatchesOnlyItsPrefixes(self):
+    """Test that the view patterns are only built for matching paths.
+    """
+
+    resolver = core.LazyURLResolver(MODULE_NAME, ['', 'thing'])
+
+    self.assertEqual(None, resolver.resolve('other'))
+    self.assertEqual(None, resolver.resolve('thing_other'))
+    self.assertEqual([], self.module.view.calls)
+
+    view, args, kwargs = resolver.resolve('thing/show')
+    self.assertEqual('show', view.__name__)
+    self.assertRaises(urlresolvers.Resolver404, resolver.resolve, '')
+
+    resolver.resolve('thing/show')
+    self.assertEqual(['patterns'], self.module.view.calls)
+
+  def testLazyView(self):
+    """Test that LazyView compares by name and calls the view method.
+    """
+
+    lazy = core.LazyView(MODULE_NAME, 'getSidebarSkeleton')
+
+    self.assertEqual(lazy, core.LazyView(MODULE_NAME, 'getSidebarSkeleton'))
+    self.assertNotEqual(lazy, core.LazyView(MODULE_NAME, 'getExtraMenus'))
+    self.assertEqual(1, len(set([lazy, core.LazyView(MODULE_NAME,
+                                                     'getSidebarSkeleton')])))
+
+    menus = lazy()
+    self.assertEqual('Thing', menus[0]['heading'])
+    self.assertEqual(['skeleton'], self.module.view.calls)
+
+  def testSkeletonFromMemcache(self):
+    """Test that a new instance reads the skeleton without its rights.
+    """
+
+    the_core = core.Core()
+    the_core.services.append('registerWithSidebar')
+    the_core.registerSidebarSkeletonEntry(
+        core.LazyView(MODULE_NAME, 'getSidebarSkeleton'))
+
+    skeleton, version = the_core.getSidebarSkeleton()
+    self.assertTrue('rights' in skeleton[0][0])
+
+    # a new instance has not built any skeletons yet
+    core.SIDEBAR_SKELETONS.clear()
+
+    cached, cached_version = the_core.getSidebarSkeleton(rights=False)
+    self.assertEqual(version, cached_version)
+    self.assertFalse('rights' in cached[0][0])
+    self.assertEqual(skeleton[0][0]['items'], cached[0][0]['items'])
+    self.assertEqual(['skeleton'], self.module.view.calls)
+
+    the_core.getSidebarSkeleton()
+    self.assertEqual(['skeleton', 'skeleton'], self.module.view.calls)
@@ -20,8 +20,19 @@ __authors__ = [
   ]
 
 
+import datetime
 import unittest
 
+from google.appengine.api import memcache
+from google.appengine.api import users
+from google.appengine.ext import db
+
+from soc.cache import request_scope
+from soc.cache import rights as rights_cache
+from soc.logic.models import role as role_logic
+from soc.logic.models.host import logic as host_logic
+from soc.models.host import Host
+from soc.models.user import User
 from soc.views import out_of_band
 from soc.views.helper import access
 
@@ -46,3 +57,162 @@ class AccessTest(unittest.TestCase):
     except out_of_band.Error, e:
       self.assertEqual(e.context, self.test_context,
                        "context should pass through context")
+
+
+class RoleIndexTest(unittest.TestCase):
+  """Tests that role checks are answered from the role index.
+  """
+
+  def setUp(self):
+    request_scope.flush()
+
+    account = users.User('role_index@example.com')
+    self.user = User(key_name='role_index', link_id='role_index',
+                     account=account, name='Role Index')
+    self.user.put()
+
+    self.host = self._createHost('sponsor_a')
+    self.host.put()
+
+    self.rights = access.Checker(None)
+    self.rights.setCurrentUser(account, self.user)
+
+  def tearDown(self):
+    db.delete(Host.all().filter('user', self.user))
+    self.user.delete()
+    request_scope.flush()
+
+  def _createHost(self, scope_path):
+    """Returns a new active Host for the user in the specified scope.
+    """
+
+    return Host(key_name='%s/role_index' % scope_path,
+                link_id='role_index', scope_path=scope_path,
+                user=self.user, status='active', given_name='Role',
+                surname='Index', email='role_index@example.com',
+                res_street='Street', res_city='City',
+                res_country='United States', res_postalcode='12345',
+                phone='1234567890', birth_date=datetime.date(1980, 1, 1))
+
+  def testGetRoleForFields(self):
+    """Test that roles are matched against all fields.
+    """
+
+    fields = {'user': self.user, 'scope_path': 'sponsor_a'}
+
+    fields['status'] = 'active'
+    role = self.rights.getRoleForFields(host_logic, fields)
+    self.assertEqual(self.host.key(), role.key())
+
+    fields['status'] = ['inactive', 'active']
+    role = self.rights.getRoleForFields(host_logic, fields)
+    self.assertEqual(self.host.key(), role.key())
+
+    fields['status'] = 'inactive'
+    self.assertEqual(None, self.rights.getRoleForFields(host_logic, fields))
+
+    fields = {'user': self.user, 'scope_path': 'sponsor_b'}
+    self.assertEqual(None, self.rights.getRoleForFields(host_logic, fields))
+
+  def testRoleIndexIsKeptForRequest(self):
+    """Test that the roles are only retrieved once per request.
+    """
+
+    fields = {'user': self.user, 'scope_path': 'sponsor_b'}
+    self.assertEqual(None, self.rights.getRoleForFields(host_logic, fields))
+
+    # stored without the logic, so the index is not dropped
+    host = self._createHost('sponsor_b')
+    host.put()
+
+    self.assertEqual(None, self.rights.getRoleForFields(host_logic, fields))
+
+    role_logic.forgetRoleIndex(host)
+
+    role = self.rights.getRoleForFields(host_logic, fields)
+    self.assertEqual(host.key(), role.key())
+
+  def testOnlyRequestedKindsAreLoaded(self):
+    """Test that looking up a Host does not retrieve the other roles.
+    """
+
+    fields = {'user': self.user, 'scope_path': 'sponsor_a'}
+    self.rights.getRoleForFields(host_logic, fields)
+
+    index = role_logic.getRoleIndex(self.user, [])
+    self.assertEqual(['Host'], index.keys())
+
+
+class _CountingChecker(access.Checker):
+  """Checker with a cacheable check that counts how often it runs.
+  """
+
+  CACHEABLE_CHECKS = frozenset(['checkCounted'])
+
+  def __init__(self, params):
+    super(_CountingChecker, self).__init__(params)
+    self.count = 0
+    self.allowed = True
+
+  def checkCounted(self, django_args):
+    self.count += 1
+    if not self.allowed:
+      raise out_of_band.AccessViolation(message_fmt='denied')
+
+
+class RightsCacheTest(unittest.TestCase):
+  """Tests that the results of cacheable checks are cached.
+  """
+
+  def setUp(self):
+    self.rights = _CountingChecker(None)
+    self.rights.setCurrentUser(users.User('rights@example.com'), None)
+    self.django_args = {'scope_path': 'sponsor/program', 'link_id': 'org'}
+
+  def tearDown(self):
+    memcache.flush_all()
+
+  def testAllowedIsCached(self):
+    """Test that a passed check runs only once.
+    """
+
+    self.rights.check(False, 'checkCounted', self.django_args, [])
+    self.rights.check(False, 'checkCounted', self.django_args, [])
+
+    self.assertEqual(1, self.rights.count)
+
+  def testDeniedIsCached(self):
+    """Test that a cached failure raises the same kind of error.
+    """
+
+    self.rights.allowed = False
+
+    for _ in range(2):
+      try:
+        self.rights.check(False, 'checkCounted', self.django_args, [])
+        self.fail('checkCounted should raise AccessViolation')
+      except out_of_band.AccessViolation, exception:
+        self.assertEqual('denied', exception.message_fmt)
+
+    self.assertEqual(1, self.rights.count)
+
+  def testScopeGeneration(self):
+    """Test that bumping a scope in the path invalidates the result.
+    """
+
+    self.rights.check(False, 'checkCounted', self.django_args, [])
+    rights_cache.bumpGeneration('sponsor/program')
+    self.rights.check(False, 'checkCounted', self.django_args, [])
+
+    self.assertEqual(2, self.rights.count)
+
+  def testArgsAreKeyed(self):
+    """Test that different arguments are cached separately.
+    """
+
+    self.rights.check(False, 'checkCounted', self.django_args, [])
+
+    self.django_args['link_id'] = 'other_org'
+    self.rights.check(False, 'checkCounted', self.django_args, [])
+
+    self.assertEqual(2, self.rights.count)
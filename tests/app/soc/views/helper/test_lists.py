@@ -0,0 +1,191 @@
+#!/usr/bin/python2.5
+#
+# Copyright 2009 the Melange authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+__authors__ = [
+  '"Sverre Rabbelier" <sverre@rabbelier.nl>',
+  ]
+
+
+import os
+import unittest
+
+from google.appengine.api import apiproxy_stub_map
+from google.appengine.api import datastore_file_stub
+from google.appengine.ext import db
+from google.appengine.tools import dev_appserver_index
+
+from django import http
+
+from soc.cache import request_scope
+from soc.logic.models import base
+from soc.models.notification import Notification
+from soc.models.student_project import StudentProject
+from soc.models.student_proposal import StudentProposal
+from soc.models.user import User
+from soc.views.helper import lists
+
+
+class ListedThing(db.Model):
+  group = db.StringProperty()
+
+
+class ListedThingLogic(base.Logic):
+
+  def __init__(self):
+    super(ListedThingLogic, self).__init__(ListedThing)
+
+
+class CursorTest(unittest.TestCase):
+  """Tests for the cursors in the offset GET arg.
+  """
+
+  def testRoundTrip(self):
+    """Test that parseCursor returns what makeCursor was given.
+    """
+
+    key = db.Key.from_path('ListedThing', 'thing')
+
+    self.assertEqual((10, key, False),
+                     lists.parseCursor(lists.makeCursor(10, key)))
+    self.assertEqual((0, key, True), lists.parseCursor(
+        lists.makeCursor(0, key, backwards=True)))
+
+  def testInvalid(self):
+    """Test that invalid cursors are rejected.
+    """
+
+    self.assertEqual(None, lists.parseCursor('abc'))
+    self.assertEqual(None, lists.parseCursor('10.notakey'))
+    self.assertEqual(None, lists.parseCursor('10'))
+
+
+class KeysetPageTest(unittest.TestCase):
+  """Tests for paging through a list by key.
+  """
+
+  def setUp(self):
+    self.logic = ListedThingLogic()
+    self.filter = {'group': 'listed'}
+
+    db.put([ListedThing(key_name='thing%02d' % i, group='listed')
+            for i in range(7)])
+    ListedThing(key_name='other', group='other').put()
+
+  def tearDown(self):
+    db.delete(ListedThing.all(keys_only=True).fetch(100))
+    request_scope.flush()
+
+  def names(self, data):
+    return [i.key().name() for i in data]
+
+  def testForwardsAndBackwards(self):
+    """Test that the cursors of a page lead to its neighbours.
+    """
+
+    data, offset, next_cursor, prev_cursor = lists._getKeysetPage(
+        self.logic, self.filter, 3, 0, None, False)
+    self.assertEqual(['thing00', 'thing01', 'thing02'], self.names(data))
+    self.assertEqual(None, prev_cursor)
+
+    position, start_key, backwards = lists.parseCursor(next_cursor)
+    data, offset, next_cursor, prev_cursor = lists._getKeysetPage(
+        self.logic, self.filter, 3, position, start_key, backwards)
+    self.assertEqual(['thing03', 'thing04', 'thing05'], self.names(data))
+    self.assertEqual(3, offset)
+
+    position, start_key, backwards = lists.parseCursor(prev_cursor)
+    data, offset, next_cursor, prev_cursor = lists._getKeysetPage(
+        self.logic, self.filter, 3, position, start_key, backwards)
+    self.assertEqual(['thing00', 'thing01', 'thing02'], self.names(data))
+    self.assertEqual(0, offset)
+    self.assertEqual(None, prev_cursor)
+
+  def testEmptyPreviousPage(self):
+    """Test that an empty previous page falls back to the first page.
+    """
+
+    start_key = db.Key.from_path('ListedThing', 'thing00')
+
+    data, offset, _, prev_cursor = lists._getKeysetPage(
+        self.logic, self.filter, 3, 3, start_key, True)
+
+    self.assertEqual(['thing00', 'thing01', 'thing02'], self.names(data))
+    self.assertEqual(0, offset)
+    self.assertEqual(None, prev_cursor)
+
+  def testKeyPagingIsOptIn(self):
+    """Test that only the lists of views that opt in are paged by key.
+    """
+
+    request = http.HttpRequest()
+    request.path = '/listed/list'
+    request.GET['limit_0'] = '3'
+    params = {'logic': self.logic, 'list_params': {}}
+
+    content = lists.getListContent(request, params, self.filter)
+    self.assertTrue('offset_0=3&' in content['next'] + '&')
+
+    params['list_key_paging'] = True
+    content = lists.getListContent(request, params, self.filter)
+    self.assertTrue('offset_0=3.' in content['next'])
+
+
+class ListIndexTest(unittest.TestCase):
+  """Tests that index.yaml has the indexes needed to page lists by key.
+  """
+
+  def setUp(self):
+    root = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        '..', '..', '..', '..', '..', 'app')
+    app_id = os.environ['APPLICATION_ID']
+
+    self.apiproxy = apiproxy_stub_map.apiproxy
+    apiproxy_stub_map.apiproxy = apiproxy_stub_map.APIProxyStubMap()
+    apiproxy_stub_map.apiproxy.RegisterStub('datastore_v3',
+        datastore_file_stub.DatastoreFileStub(app_id, None, None,
+                                              require_indexes=True))
+
+    dev_appserver_index.SetupIndexes(app_id, os.path.normpath(root))
+
+  def tearDown(self):
+    apiproxy_stub_map.apiproxy = self.apiproxy
+
+  def assertPageable(self, model, **filter):
+    """Runs the queries for a next and a previous page of a list.
+    """
+
+    start_key = db.Key.from_path(model.kind(), 'start')
+
+    for operator, order in [('>', '__key__'), ('<', '-__key__')]:
+      query = db.Query(model)
+      for name, value in filter.iteritems():
+        query.filter('%s =' % name, value)
+      query.filter('__key__ %s' % operator, start_key)
+      query.order(order)
+      query.fetch(1)
+
+  def testIndexes(self):
+    """Test a few of the lists of the views that page by key.
+    """
+
+    org_key = db.Key.from_path('Organization', 'sponsor/program/org')
+    user_key = db.Key.from_path('User', 'user')
+
+    self.assertPageable(StudentProposal, org=org_key, status='new')
+    self.assertPageable(StudentProject, scope=org_key, status='accepted')
+    self.assertPageable(Notification, scope=user_key, unread=True)
+    self.assertPageable(User, is_developer=True)
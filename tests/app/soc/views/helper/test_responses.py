@@ -0,0 +1,102 @@
+#!/usr/bin/python2.5
+#
+# Copyright 2009 the Melange authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+__authors__ = [
+  '"Sverre Rabbelier" <sverre@rabbelier.nl>',
+  ]
+
+
+import unittest
+
+from django import http
+from django.template import Context
+from django.template import Template
+
+from soc.cache import request_scope
+from soc.logic import system
+from soc.modules import callback
+from soc.views.helper import responses
+
+
+class _CountingCore(object):
+  """Core that counts the sidebars it builds.
+  """
+
+  def __init__(self):
+    self.sidebars = 0
+
+  def getSidebar(self, account, user):
+    self.sidebars += 1
+    return [{'heading': 'Menu', 'group': ''}]
+
+
+class UniversalContextTest(unittest.TestCase):
+  """Tests that the universal context is computed once per request.
+  """
+
+  def setUp(self):
+    request_scope.flush()
+
+    self.request = http.HttpRequest()
+    self.request.path = '/'
+
+    self.core = callback.getCore()
+    self.counting_core = _CountingCore()
+    callback.registerCore(self.counting_core)
+
+    self.versions = 0
+    self.getMelangeVersion = system.getMelangeVersion
+
+    def countingGetAppVersion():
+      self.versions += 1
+      return self.getMelangeVersion()
+
+    system.getMelangeVersion = countingGetAppVersion
+
+  def tearDown(self):
+    system.getMelangeVersion = self.getMelangeVersion
+    callback.registerCore(self.core)
+    request_scope.flush()
+
+  def testComputedOnce(self):
+    """Test that all contexts of a request share their values.
+    """
+
+    first = responses.getUniversalContext(self.request)
+    first['page_name'] = 'First'
+    second = responses.getUniversalContext(self.request)
+
+    self.assertEqual(1, self.versions)
+    self.assertFalse('page_name' in second)
+    self.assertTrue(first['sidebar_menu_items'] is
+                    second['sidebar_menu_items'])
+
+  def testLazySidebar(self):
+    """Test that the sidebar is only built when a template reads it.
+    """
+
+    context = responses.getUniversalContext(self.request)
+    self.assertEqual(0, self.counting_core.sidebars)
+
+    template = Template('{% if sidebar_menu_items %}'
+                        '{% for item in sidebar_menu_items %}'
+                        '{{ item.heading }}{% endfor %}{% endif %}')
+
+    self.assertEqual('Menu', template.render(Context(context)))
+    self.assertEqual('Menu', template.render(Context(
+        responses.getUniversalContext(self.request))))
+    self.assertEqual(1, self.counting_core.sidebars)
@@ -0,0 +1,121 @@
+#!/usr/bin/python2.5
+#
+# Copyright 2009 the Melange authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+__authors__ = [
+  '"Sverre Rabbelier" <sverre@rabbelier.nl>',
+  ]
+
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from django.conf import settings
+from django.template import loader
+
+
+TEMPLATES = {
+    'base.html': '{% block title %}Base{% endblock %}|'
+                 '{% block body %}base body{% endblock %}',
+    'middle.html': '{% extends "base.html" %}'
+                   '{% block body %}middle {{ block.super }}{% endblock %}',
+    'page.html': '{% extends "middle.html" %}'
+                 '{% block title %}{{ title }}{% endblock %}',
+    'other.html': '{% extends "base.html" %}'
+                  '{% block body %}{% include "part.html" %}{% endblock %}',
+    'part.html': 'part {{ title }}',
+    }
+
+
+class TemplateCacheTest(unittest.TestCase):
+  """Tests for the compiled template cache in django.template.loader.
+  """
+
+  def setUp(self):
+    self.dir = tempfile.mkdtemp()
+
+    for name, source in TEMPLATES.iteritems():
+      self.write(name, source)
+
+    self.settings = (settings.TEMPLATE_DIRS, settings.TEMPLATE_CACHE,
+                     settings.TEMPLATE_CACHE_CHECK_MTIME)
+    settings.TEMPLATE_DIRS = (self.dir,)
+    settings.TEMPLATE_CACHE = True
+    settings.TEMPLATE_CACHE_CHECK_MTIME = False
+    loader.reset_template_cache()
+
+  def tearDown(self):
+    (settings.TEMPLATE_DIRS, settings.TEMPLATE_CACHE,
+     settings.TEMPLATE_CACHE_CHECK_MTIME) = self.settings
+    loader.reset_template_cache()
+    shutil.rmtree(self.dir)
+
+  def write(self, name, source, mtime=None):
+    path = os.path.join(self.dir, name)
+    template_file = open(path, 'w')
+    template_file.write(source)
+    template_file.close()
+
+    if mtime:
+      os.utime(path, (mtime, mtime))
+
+  def render(self, name, **context):
+    return loader.render_to_string(name, dictionary=context)
+
+  def testCompiledOnce(self):
+    """Test that templates are only compiled once when cached.
+    """
+
+    self.assertTrue(loader.get_template('page.html') is
+                    loader.get_template('page.html'))
+
+    settings.TEMPLATE_CACHE = False
+    self.assertFalse(loader.get_template('page.html') is
+                     loader.get_template('page.html'))
+
+  def testSharedParents(self):
+    """Test that rendering a template leaves its cached parents intact.
+    """
+
+    for _ in range(2):
+      self.assertEqual('Page|middle base body',
+                       self.render('page.html', title='Page'))
+      self.assertEqual('Base|part Other', self.render('other.html',
+                                                      title='Other'))
+      self.assertEqual('Base|middle base body', self.render('middle.html'))
+      self.assertEqual('Base|base body', self.render('base.html'))
+
+  def testCheckMtime(self):
+    """Test that changed templates are only reloaded if mtimes are checked.
+    """
+
+    self.assertEqual('part old', self.render('part.html', title='old'))
+    self.write('part.html', 'new part', mtime=1)
+
+    self.assertEqual('part old', self.render('part.html', title='old'))
+
+    settings.TEMPLATE_CACHE_CHECK_MTIME = True
+    self.assertEqual('new part', self.render('part.html'))
+
+  def testWarmTemplateCache(self):
+    """Test that warming compiles the existing templates.
+    """
+
+    loader.warm_template_cache(['page.html', 'missing.html'])
+
+    self.assertEqual(['page.html'], loader.template_cache.keys())
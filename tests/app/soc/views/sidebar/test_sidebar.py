@@ -25,6 +25,7 @@ import unittest
 from google.appengine.api import users
 from google.appengine.api import memcache
 
+from soc.views import out_of_band
 from soc.views.sitemap import sidebar
 
 
@@ -45,3 +46,72 @@ class SidebarTest(unittest.TestCase):
     """
 
     self.assertNotEqual(None, sidebar.getSidebar('id', None))
+
+
+class _Checker(object):
+  """Checker that allows only the checks in allowed and counts the calls.
+  """
+
+  def __init__(self, allowed):
+    self.allowed = allowed
+    self.rights = {'edit': ['checkIsHost'], 'list': ['checkIsDeveloper']}
+    self.calls = []
+
+  def __getitem__(self, key):
+    return [(i, []) for i in self.rights.get(key, [])]
+
+  def setCurrentUser(self, id, user):
+    self.id = id
+
+  def check(self, use_cache, checker_name, django_args, args):
+    self.calls.append((use_cache, checker_name))
+    if checker_name not in self.allowed:
+      raise out_of_band.Error('denied')
+
+
+class SidebarSkeletonTest(unittest.TestCase):
+  """Tests for merging the sidebar skeleton with a rights bitmap.
+  """
+
+  def setUp(self):
+    self.rights = _Checker(['checkIsHost'])
+    self.skeleton = [
+        {'heading': 'First', 'group': 'a', 'rights': self.rights,
+         'items': [('/first/edit', 'Edit', 'edit'),
+                   ('/first/list', 'List', 'list')]},
+        {'heading': 'Second', 'group': 'b', 'rights': self.rights,
+         'items': [('/second/list', 'List', 'list'),
+                   ('/second/edit', 'Edit', 'edit')]},
+        ]
+
+  def testRightsBitmap(self):
+    """Test that every distinct check is run only once, through the cache.
+    """
+
+    bitmap = sidebar.getRightsBitmap('id', None, self.skeleton)
+
+    self.assertEqual(0x9, bitmap)
+    self.assertEqual([(True, 'checkIsHost'), (True, 'checkIsDeveloper')],
+                     self.rights.calls)
+
+  def testMergeSkeleton(self):
+    """Test that only accessible items and non-empty menus are returned.
+    """
+
+    menus = sidebar.mergeSkeleton(self.skeleton, 0x1)
+
+    self.assertEqual([{'heading': 'First', 'group': 'a',
+                       'items': [{'url': '/first/edit', 'title': 'Edit'}]}],
+                     menus)
+
+  def testSkeletonVersion(self):
+    """Test that the version only depends on the urls and access types.
+    """
+
+    version = sidebar.getSkeletonVersion(self.skeleton)
+
+    self.skeleton[0]['heading'] = 'Changed'
+    self.assertEqual(version, sidebar.getSkeletonVersion(self.skeleton))
+
+    self.skeleton[0]['items'][0] = ('/first/edit', 'Edit', 'list')
+    self.assertNotEqual(version, sidebar.getSkeletonVersion(self.skeleton))
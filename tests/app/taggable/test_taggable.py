@@ -0,0 +1,176 @@
+#!/usr/bin/python2.5
+#
+# Copyright 2009 the Melange authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+__authors__ = [
+  '"Sverre Rabbelier" <sverre@rabbelier.nl>',
+  ]
+
+
+import unittest
+
+from google.appengine.api import memcache
+from google.appengine.ext import db
+
+from taggable import taggable
+
+
+class NoteTag(taggable.Tag):
+  pass
+
+
+class Note(taggable.Taggable, db.Model):
+  title = db.StringProperty()
+  labels = taggable.tag_property('labels')
+
+  def __init__(self, parent=None, key_name=None, app=None, **entity_values):
+    db.Model.__init__(self, parent, key_name, app, **entity_values)
+    taggable.Taggable.__init__(self, labels=NoteTag)
+
+
+class TaggableTest(unittest.TestCase):
+  """Tests for the tag membership index and the sharded tag counts.
+  """
+
+  def setUp(self):
+    self.notes = [Note(title='note%d' % i) for i in range(3)]
+    db.put(self.notes)
+
+  def tearDown(self):
+    for model in [Note, NoteTag, taggable.TagMembership,
+                  taggable.TagCounterShard]:
+      db.delete(model.all(keys_only=True).fetch(1000))
+    memcache.flush_all()
+
+  def counts(self):
+    return dict((i.tag, i.tagged_count) for i in NoteTag.all())
+
+  def testSetTags(self):
+    """Test that tags are stored as memberships and counted.
+    """
+
+    self.notes[0].labels = {'tags': 'a, b', 'scope': None}
+    self.notes[1].labels = {'tags': ['b'], 'scope': None}
+
+    self.assertEqual({'a': 1, 'b': 2}, self.counts())
+    self.assertEqual(['a', 'b'], sorted(
+        i.tag for i in NoteTag.get_tags_for_key(self.notes[0].key())))
+    self.assertEqual(0, len(NoteTag.get_by_name('b').tagged))
+
+    self.notes[0].labels = {'tags': 'b, c', 'scope': None}
+
+    self.assertEqual({'a': 0, 'b': 2, 'c': 1}, self.counts())
+    self.assertEqual(['b', 'c'], sorted(
+        i.tag for i in NoteTag.get_tags_for_key(self.notes[0].key())))
+
+    reloaded = Note.get(self.notes[0].key())
+    self.assertEqual(['b', 'c'], sorted(i.tag for i in reloaded.labels))
+
+  def testSetTagsBulk(self):
+    """Test that the tags of many entities are applied at once.
+    """
+
+    seeds = [{'tags': 'a', 'scope': None},
+             {'tags': 'a, b', 'scope': None},
+             {'tags': '', 'scope': None}]
+    taggable.set_tags_bulk(self.notes, 'labels', seeds)
+
+    self.assertEqual({'a': 2, 'b': 1}, self.counts())
+    self.assertEqual([], NoteTag.get_tags_for_key(self.notes[2].key()))
+
+    counts = taggable.TagCounterShard.count_tagged(
+        [NoteTag.get_by_name('a').key()])
+    self.assertEqual([2], counts.values())
+
+  def testRefreshCachedTags(self):
+    """Test that only the affected cached tag lists are expired.
+    """
+
+    self.notes[0].labels = {'tags': 'a, b', 'scope': None}
+    self.notes[1].labels = {'tags': 'a', 'scope': None}
+
+    self.assertEqual(['a'], [i.tag for i in NoteTag.popular_tags(limit=1)])
+    self.assertEqual(['a', 'b'], [i.tag for i in NoteTag.get_tags_by_name()])
+
+    # b does not make it to the cached popular tags, and no tag is created
+    self.notes[2].labels = {'tags': 'b', 'scope': None}
+    self.assertNotEqual(None, memcache.get('NoteTag_tags_by_name_asc'))
+
+    self.notes[2].labels = {'tags': 'b, c', 'scope': None}
+    self.assertEqual(None, memcache.get('NoteTag_tags_by_name_asc'))
+
+    self.notes[1].labels = {'tags': '', 'scope': None}
+    self.assertEqual(None, memcache.get('NoteTag_popular_tags'))
+    self.assertEqual(['b'], [i.tag for i in NoteTag.popular_tags(limit=1)])
+
+  def testMigrateTags(self):
+    """Test that tags applied before TagMemberships keep their entities.
+    """
+
+    keys = [i.key() for i in self.notes]
+    NoteTag(key_name='NoteTag_old', tag='old', tagged=keys[:2],
+            tagged_count=2).put()
+
+    self.assertEqual(['old'], [i.tag for i in
+                               NoteTag.get_tags_for_key(keys[0])])
+
+    # untagging an entity before the migration drops it from tagged
+    self.notes[1].labels = {'tags': '', 'scope': None}
+    self.notes[2].labels = {'tags': 'old', 'scope': None}
+    self.assertEqual({'old': 2}, self.counts())
+
+    self.assertEqual(None, taggable.migrate_tags(NoteTag))
+
+    tag = NoteTag.get_by_name('old')
+    self.assertTrue(tag.counted)
+    self.assertEqual([], tag.tagged)
+    self.assertEqual({'old': 2}, self.counts())
+    self.assertEqual({tag.key(): 2},
+                     taggable.TagCounterShard.count_tagged([tag.key()]))
+
+    for key, tags in [(keys[0], ['old']), (keys[1], []), (keys[2], ['old'])]:
+      self.assertEqual(tags, [i.tag for i in NoteTag.get_tags_for_key(key)])
+
+    # the migrated tag is counted in its shards from now on
+    self.notes[1].labels = {'tags': 'old', 'scope': None}
+    self.assertEqual({'old': 3}, self.counts())
+
+  def testConcurrentLegacyChanges(self):
+    """Test that changes to a legacy tag read earlier are not undone.
+    """
+
+    keys = [i.key() for i in self.notes]
+    NoteTag(key_name='NoteTag_old', tag='old', tagged=keys,
+            tagged_count=3).put()
+
+    first = NoteTag.get_by_name('old')
+    second = NoteTag.get_by_name('old')
+
+    taggable.apply_tag_changes(NoteTag, [(keys[0], [], [first])])
+    taggable.apply_tag_changes(NoteTag, [(keys[1], [], [second])])
+
+    tag = NoteTag.get_by_name('old')
+    self.assertEqual([keys[2]], tag.tagged)
+    self.assertEqual(1, tag.tagged_count)
+
+    # a tag read before it was migrated is not written back
+    stale = NoteTag.get_by_name('old')
+    taggable.migrate_tag(NoteTag.get_by_name('old'))
+    taggable.apply_tag_changes(NoteTag, [(keys[2], [], [stale])])
+
+    tag = NoteTag.get_by_name('old')
+    self.assertTrue(tag.counted)
+    self.assertEqual([], tag.tagged)
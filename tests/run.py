@@ -57,6 +57,16 @@ class AppEngineDatastoreClearPlugin(plugins.Plugin):
     if datastore is not None:
       datastore.Clear()
 
+    # tasks added by this test should not be seen by the next one
+    taskqueue = apiproxy_stub_map.apiproxy.GetStub('taskqueue')
+    if taskqueue is not None:
+      for queue in taskqueue.GetQueues():
+        taskqueue.FlushQueue(queue['name'])
+
+    # entities cached for the 'request' are gone from the datastore now
+    from soc.cache import request_scope
+    request_scope.flush()
+
 
 def main():
   sys.path = extra_paths + sys.path
@@ -73,6 +83,7 @@ def main():
   from google.appengine.api import mail_stub
   from google.appengine.api import user_service_stub
   from google.appengine.api import urlfetch_stub
+  from google.appengine.api.labs.taskqueue import taskqueue_stub
   from google.appengine.api.memcache import memcache_stub
   apiproxy_stub_map.apiproxy = apiproxy_stub_map.APIProxyStubMap()
   apiproxy_stub_map.apiproxy.RegisterStub('urlfetch',
@@ -84,6 +95,8 @@ def main():
   apiproxy_stub_map.apiproxy.RegisterStub('memcache',
     memcache_stub.MemcacheServiceStub())
   apiproxy_stub_map.apiproxy.RegisterStub('mail', mail_stub.MailServiceStub())
+  apiproxy_stub_map.apiproxy.RegisterStub('taskqueue',
+    taskqueue_stub.TaskQueueServiceStub(root_path=os.path.join(HERE, 'app')))
   import django.test.utils
   django.test.utils.setup_test_environment()
 